@@ -0,0 +1,185 @@
+from operator import itemgetter
+from sqlalchemy import select, delete, update, case, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.ability.models import SessionAbility
+from app.ability.estimator import VERDICT_SCORES
+from app.analysis.models import SessionDetails, ChatHistory
+from app.archive.dao import ArchiveDAO
+from app.archive.models import ChatArchive
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+class AbilityDAO:
+    """
+    Data Access Object (DAO) class for the per-session ability estimates and the judged turns they are computed from.
+    """
+
+    @staticmethod
+    def get_ability(db: Session, session_id: int):
+        """
+        Get the ability estimate of a session.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+
+        Returns:
+            SessionAbility: The estimate, or None if the session has no judged turn yet.
+
+        Raises:
+            Exception: If the estimate cannot be read.
+        """
+        try:
+            return db.get(SessionAbility, session_id)
+        except Exception as e:
+            logger.error(f"Error reading the ability of session ID {session_id}: {str(e)}", event_type='session_ability_error')
+            raise Exception(f"Error reading session ability: {str(e)}")
+
+    @staticmethod
+    def seed_ability(db: Session, ability: SessionAbility) -> SessionAbility:
+        """
+        Store a session's first ability estimate, or read the one a concurrent turn of the session stored first.
+
+        Args:
+            db (Session): Database session for executing queries.
+            ability (SessionAbility): The first estimate.
+
+        Returns:
+            SessionAbility: The stored estimate.
+
+        Raises:
+            Exception: If the estimate cannot be stored or read.
+        """
+        try:
+            db.add(ability)
+            db.commit()
+            return ability
+        except IntegrityError:
+            # Another turn of the session stored the first estimate
+            db.rollback()
+            return AbilityDAO.get_ability(db, ability.session_id)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing the first ability of session ID {ability.session_id}: {str(e)}", event_type='session_ability_error')
+            raise Exception(f"Error storing session ability: {str(e)}")
+
+    @staticmethod
+    def fetch_sessions(db: Session, after_session_id: int, limit: int):
+        """
+        Get the next sessions in ID order, for keyset batching, leaving out sessions archived before the
+        archive carried turn verdicts: their estimates cannot be recomputed.
+
+        Args:
+            db (Session): Database session for executing queries.
+            after_session_id (int): Only sessions with a higher ID are returned.
+            limit (int): Maximum number of sessions, left-out ones included.
+
+        Returns:
+            tuple: (session_id, learning_goal_id, student_initial_level, student_current_level) rows of the
+            sessions that can be replayed, and the highest session ID examined (None when there are no more sessions).
+
+        Raises:
+            Exception: If the sessions cannot be read.
+        """
+        try:
+            rows = db.connection().execute(
+                select(
+                    SessionDetails.id, SessionDetails.learning_goal_id,
+                    SessionDetails.student_initial_level, SessionDetails.student_current_level,
+                    ChatArchive.session_id, ChatArchive.payload_format
+                )
+                .outerjoin(ChatArchive, ChatArchive.session_id == SessionDetails.id)
+                .where(SessionDetails.id > after_session_id)
+                .order_by(SessionDetails.id)
+                .limit(limit)
+            ).all()
+            if not rows:
+                return [], None
+            return [row[:4] for row in rows if row[4] is None or row[5] is not None], rows[-1][0]
+        except Exception as e:
+            logger.error(f"Error reading sessions after ID {after_session_id}: {str(e)}", event_type='ability_sessions_error')
+            raise Exception(f"Error reading sessions: {str(e)}")
+
+    @staticmethod
+    def fetch_judged_turns(db: Session, first_session_id: int, last_session_id: int):
+        """
+        Get the score of every judged chat turn of a range of sessions, grouped by session in chronological
+        order, as a range scan of the session_id index. A session's archived turns come before its turns in
+        chat_history; turns without a judged verdict are left out.
+
+        Args:
+            db (Session): Database session for executing queries.
+            first_session_id (int): The lowest session ID of the range.
+            last_session_id (int): The highest session ID of the range.
+
+        Returns:
+            list: (session_id, score) rows.
+
+        Raises:
+            Exception: If the turns cannot be read.
+        """
+        try:
+            score = case(
+                *((ChatHistory.answer_verdict == verdict, score) for verdict, score in VERDICT_SCORES.items())
+            )
+            # Millions of plain tuples: skip the ORM result processing
+            turns = db.connection().execute(
+                select(ChatHistory.session_id, score)
+                .where(
+                    ChatHistory.session_id.between(first_session_id, last_session_id),
+                    ChatHistory.answer_verdict.in_(list(VERDICT_SCORES))
+                )
+                .order_by(ChatHistory.session_id, ChatHistory.id)
+            ).all()
+            archived = [
+                (chat.session_id, VERDICT_SCORES[chat.answer_verdict])
+                for chat in ArchiveDAO.fetch_archived_chats(db, first_session_id, last_session_id)
+                if chat.answer_verdict in VERDICT_SCORES
+            ]
+            if not archived:
+                return turns
+            # Both lists are grouped by session; a stable sort keeps archived turns first within each
+            return sorted(archived + turns, key=itemgetter(0))
+        except Exception as e:
+            logger.error(f"Error reading judged turns of sessions {first_session_id}-{last_session_id}: {str(e)}", event_type='ability_turns_error')
+            raise Exception(f"Error reading judged turns: {str(e)}")
+
+    @staticmethod
+    def replace_abilities(db: Session, first_session_id: int, last_session_id: int, abilities: list, levels: list):
+        """
+        Replace the ability estimates of a range of sessions in one transaction, and optionally their current levels.
+        The estimates of sessions archived before the archive carried turn verdicts are kept.
+
+        Args:
+            db (Session): Database session for executing queries.
+            first_session_id (int): The lowest session ID of the range.
+            last_session_id (int): The highest session ID of the range.
+            abilities (list): The new estimates, as session_abilities rows.
+            levels (list): {"session_id", "level"} entries of the sessions whose current level changes.
+
+        Raises:
+            Exception: If the estimates cannot be stored; the transaction is rolled back.
+        """
+        try:
+            db.execute(delete(SessionAbility).where(
+                SessionAbility.session_id.between(first_session_id, last_session_id),
+                SessionAbility.session_id.not_in(
+                    select(ChatArchive.session_id).where(ChatArchive.payload_format.is_(None))
+                )
+            ))
+            if abilities:
+                db.connection().execute(SessionAbility.__table__.insert(), abilities)
+            if levels:
+                db.connection().execute(
+                    update(SessionDetails.__table__)
+                    .where(SessionDetails.__table__.c.id == bindparam('session_id'))
+                    .values(student_current_level=bindparam('level')),
+                    levels
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing the abilities of sessions {first_session_id}-{last_session_id}: {str(e)}", event_type='ability_store_error')
+            raise Exception(f"Error storing session abilities: {str(e)}")
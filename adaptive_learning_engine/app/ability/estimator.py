@@ -0,0 +1,108 @@
+import numpy as np
+
+# Difficulty, on the ability scale, of the questions asked at each of STUDENT_LEVELS
+LEVEL_DIFFICULTIES = np.array([-1.0, 0.0, 1.0])
+
+# Ability between two consecutive levels, and how far past it an estimate must be to change level
+LEVEL_THRESHOLDS = np.array([-0.5, 0.5])
+LEVEL_MARGIN = 0.15
+
+# Score of each judged verdict; other verdicts ('not_applicable') leave the estimate unchanged
+VERDICT_SCORES = {"correct": 1.0, "partially_correct": 0.5, "incorrect": 0.0}
+
+# Step size of a learner's first judged turn, and the floor it decays to as judged turns accumulate
+INITIAL_STEP = 0.8
+MIN_STEP = 0.2
+
+# Estimates are kept within [-ABILITY_BOUND, ABILITY_BOUND]
+ABILITY_BOUND = 4.0
+
+
+def expected_scores(abilities, levels):
+    """
+    Return the probability of a correct answer under the Rasch (1PL IRT) model, given the learners'
+    abilities and the levels of the questions they answered.
+    """
+    return 1.0 / (1.0 + np.exp(LEVEL_DIFFICULTIES[levels] - abilities))
+
+
+def step_sizes(judged_turns):
+    """
+    Return the step size of an update after the given number of judged turns: large while little
+    is known about a learner, decaying with 1 / sqrt(n) down to MIN_STEP so the estimate keeps tracking progress.
+    """
+    return np.maximum(INITIAL_STEP / np.sqrt(1.0 + judged_turns), MIN_STEP)
+
+
+def levels_for(abilities, levels):
+    """
+    Map abilities to level indexes, keeping the current level while the ability is within
+    LEVEL_MARGIN of a threshold, so that learners do not flip between levels every turn.
+
+    Args:
+        abilities: The ability estimates (scalar or array).
+        levels: The current level indexes, of the same shape.
+
+    Returns:
+        The new level indexes.
+    """
+    abilities = np.asarray(abilities)[..., None]
+    lowest = np.sum(abilities >= LEVEL_THRESHOLDS + LEVEL_MARGIN, axis=-1)
+    highest = np.sum(abilities > LEVEL_THRESHOLDS - LEVEL_MARGIN, axis=-1)
+    return np.clip(levels, lowest, highest)
+
+
+def update_abilities(abilities, judged_turns, levels, scores) -> tuple:
+    """
+    Apply one judged turn per learner, Elo-style: move the ability by the step size times the difference
+    between the observed and the expected score. Constant time per turn; works on scalars and arrays alike.
+
+    Args:
+        abilities: The learners' current abilities.
+        judged_turns: Number of judged turns each learner had so far.
+        levels: Level indexes of the questions answered, i.e. the learners' current levels.
+        scores: Observed scores (see VERDICT_SCORES).
+
+    Returns:
+        tuple: The new abilities and level indexes.
+    """
+    abilities = np.clip(
+        abilities + step_sizes(judged_turns) * (scores - expected_scores(abilities, levels)),
+        -ABILITY_BOUND, ABILITY_BOUND
+    )
+    return abilities, levels_for(abilities, levels)
+
+
+def replay_abilities(turn_learners: np.ndarray, scores: np.ndarray, abilities: np.ndarray, levels: np.ndarray) -> tuple:
+    """
+    Replay the judged turns of many learners from their initial estimates.
+
+    Turns of one learner depend on each other, but learners are independent: the n-th turns of all
+    learners are applied in one vectorized update, so the loop runs once per turn position (the length
+    of the longest history) rather than once per turn.
+
+    Args:
+        turn_learners (np.ndarray): Learner index of each turn, grouped by learner, turns in chronological order.
+        scores (np.ndarray): Score of each turn.
+        abilities (np.ndarray): Initial ability of each learner; updated in place.
+        levels (np.ndarray): Initial level index of each learner; updated in place.
+
+    Returns:
+        tuple: The final abilities, level indexes and number of judged turns of each learner.
+    """
+    judged_turns = np.zeros(len(abilities), dtype=np.int64)
+    if len(turn_learners) == 0:
+        return abilities, levels, judged_turns
+    starts = np.flatnonzero(np.concatenate(([True], turn_learners[1:] != turn_learners[:-1])))
+    lengths = np.diff(np.concatenate((starts, [len(turn_learners)])))
+    judged_turns[turn_learners[starts]] = lengths
+    positions = np.arange(len(turn_learners)) - np.repeat(starts, lengths)
+    order = np.argsort(positions, kind='stable')
+
+    offset = 0
+    for position, count in enumerate(np.bincount(positions).tolist()):
+        turns = order[offset:offset + count]
+        offset += count
+        learners = turn_learners[turns]
+        abilities[learners], levels[learners] = update_abilities(abilities[learners], position, levels[learners], scores[turns])
+    return abilities, levels, judged_turns
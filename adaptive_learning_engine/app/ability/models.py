@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class SessionAbility(Base):
+    """
+    Represents the estimated ability of the learner of a session in its learning goal, updated after every judged turn.
+
+    Attributes:
+        session_id (int): The primary key; the ID of the session in session_details.
+        learning_goal_id (int): The session's learning goal.
+        ability (float): The ability estimate, on the scale of the level difficulties (see LEVEL_DIFFICULTIES).
+        level (str): The level the estimate maps to.
+        judged_turns (int): Number of judged turns the estimate is based on.
+        updated_at (datetime): When the estimate was last updated.
+    """
+    __tablename__ = 'session_abilities'
+
+    session_id = Column(Integer, primary_key=True, autoincrement=False)
+    learning_goal_id = Column(Integer, nullable=False, index=True)
+    ability = Column(Float, nullable=False)
+    level = Column(String, nullable=False)
+    judged_turns = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,172 @@
+import os
+import numpy as np
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.ability.dao import AbilityDAO
+from app.ability.models import SessionAbility
+from app.ability.estimator import VERDICT_SCORES, LEVEL_DIFFICULTIES, update_abilities, replay_abilities
+from app.core.constants import STUDENT_LEVELS
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Set to 'false' to let the tutor model choose the learner's level again; abilities are then still estimated
+ABILITY_LEVELS_ENABLED = os.getenv('ABILITY_LEVELS_ENABLED', 'true').lower() != 'false'
+
+
+class AbilityService:
+    """
+    Service layer that estimates each session learner's ability from the tutor's verdicts on their answers
+    and maps it to the difficulty level used in the tutor prompt. No LLM call is made.
+    """
+
+    @staticmethod
+    def _seed(session_id: int, learning_goal_id: int, initial_level: str) -> SessionAbility:
+        """
+        Build a session's estimate before its first judged turn: the difficulty of its initial level, as in `replay`.
+        """
+        level_index = STUDENT_LEVELS.index(initial_level) if initial_level in STUDENT_LEVELS else 0
+        return SessionAbility(
+            session_id=session_id,
+            learning_goal_id=learning_goal_id,
+            ability=float(LEVEL_DIFFICULTIES[level_index]),
+            level=STUDENT_LEVELS[level_index],
+            judged_turns=0
+        )
+
+    @staticmethod
+    def next_levels(db: Session, session_id: int, learning_goal_id: int, initial_level: str, level: str) -> dict:
+        """
+        Work out the level `estimate_turn` would map each judged verdict on the learner's next answer to,
+        without changing the estimate.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            learning_goal_id (int): The session's learning goal.
+            initial_level (str): The learner's initial level, which a first estimate starts from.
+            level (str): The level the question is asked at, i.e. the learner's current level.
+
+        Returns:
+            dict: The level for each verdict of VERDICT_SCORES.
+
+        Raises:
+            Exception: If the estimate cannot be read.
+        """
+        ability = AbilityDAO.get_ability(db, session_id) or AbilityService._seed(session_id, learning_goal_id, initial_level)
+        level_index = STUDENT_LEVELS.index(level) if level in STUDENT_LEVELS else 0
+        _, levels = update_abilities(
+            ability.ability, ability.judged_turns, level_index, np.array(list(VERDICT_SCORES.values()))
+        )
+        return {verdict: STUDENT_LEVELS[int(index)] for verdict, index in zip(VERDICT_SCORES, levels)}
+
+    @staticmethod
+    def estimate_turn(db: Session, session_id: int, learning_goal_id: int, initial_level: str, level: str,
+                      answer_verdict: str) -> tuple:
+        """
+        Update a session's ability estimate with the verdict on one answer, in constant time.
+
+        The estimate is changed on the database session but not committed, so that it is stored in the same
+        transaction as the chat turn. A session without an estimate starts at the difficulty of its initial
+        level, like in `replay`; that first estimate is stored right away, so that two concurrent first turns
+        of a session do not both insert it.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            learning_goal_id (int): The session's learning goal.
+            initial_level (str): The learner's initial level, which a first estimate starts from.
+            level (str): The level the answered question was asked at, i.e. the learner's current level.
+            answer_verdict (str): The tutor's verdict on the answer.
+
+        Returns:
+            tuple: The updated SessionAbility and the level it maps to, or (None, None) if the verdict is not judged.
+
+        Raises:
+            Exception: If the estimate cannot be read or the first estimate cannot be stored.
+        """
+        if answer_verdict not in VERDICT_SCORES:
+            return None, None
+        level_index = STUDENT_LEVELS.index(level) if level in STUDENT_LEVELS else 0
+        ability = AbilityDAO.get_ability(db, session_id)
+        if ability is None:
+            ability = AbilityDAO.seed_ability(db, AbilityService._seed(session_id, learning_goal_id, initial_level))
+
+        new_ability, new_level = update_abilities(
+            ability.ability, ability.judged_turns, level_index, VERDICT_SCORES[answer_verdict]
+        )
+        ability.ability = float(new_ability)
+        ability.level = STUDENT_LEVELS[int(new_level)]
+        ability.judged_turns += 1
+        ability.updated_at = datetime.utcnow()
+        return ability, ability.level
+
+    @staticmethod
+    def replay(db: Session, batch_size: int = 50000, update_levels: bool = False) -> dict:
+        """
+        Recompute the ability estimates of all sessions from their judged chat turns.
+
+        Sessions are processed in ID order in batches of `batch_size`; each batch loads its turns in one
+        range scan and replays them with vectorized updates (see `replay_abilities`), starting from the
+        difficulty of the sessions' initial levels. Archived turns are replayed too, except for sessions archived
+        before the archive carried turn verdicts, which keep their estimates.
+
+        Args:
+            db (Session): Database session for executing queries.
+            batch_size (int): Sessions per batch and transaction.
+            update_levels (bool): Also set the sessions' current levels to the recomputed ones.
+
+        Returns:
+            dict: The number of sessions and judged turns replayed, and of sessions whose level changed.
+
+        Raises:
+            Exception: If the estimates cannot be recomputed.
+        """
+        try:
+            result = {"sessions": 0, "turns": 0, "level_changes": 0}
+            after_session_id = 0
+            while True:
+                sessions, last_session_id = AbilityDAO.fetch_sessions(db, after_session_id, batch_size)
+                if last_session_id is None:
+                    break
+                first_session_id, after_session_id = after_session_id + 1, last_session_id
+                if not sessions:
+                    continue
+
+                session_ids = np.array([session[0] for session in sessions], dtype=np.int64)
+                initial_levels = np.array(
+                    [STUDENT_LEVELS.index(session[2]) if session[2] in STUDENT_LEVELS else 0 for session in sessions],
+                    dtype=np.int64
+                )
+                turns = AbilityDAO.fetch_judged_turns(db, first_session_id, last_session_id)
+                turn_sessions = np.fromiter((turn[0] for turn in turns), dtype=np.int64, count=len(turns))
+                scores = np.fromiter((turn[1] for turn in turns), dtype=np.float64, count=len(turns))
+                # Sessions left out of the replay may have had turns since; they are not replayed
+                turn_learners = np.minimum(np.searchsorted(session_ids, turn_sessions), len(session_ids) - 1)
+                replayed = session_ids[turn_learners] == turn_sessions
+                abilities, levels, judged_turns = replay_abilities(
+                    turn_learners[replayed], scores[replayed],
+                    LEVEL_DIFFICULTIES[initial_levels], initial_levels.copy()
+                )
+
+                now = datetime.utcnow()
+                rows, level_changes = [], []
+                for index in np.flatnonzero(judged_turns).tolist():
+                    session_id, learning_goal_id, _, current_level = sessions[index]
+                    level = STUDENT_LEVELS[levels[index]]
+                    rows.append({
+                        "session_id": session_id, "learning_goal_id": learning_goal_id, "ability": float(abilities[index]),
+                        "level": level, "judged_turns": int(judged_turns[index]), "updated_at": now
+                    })
+                    if update_levels and level != current_level:
+                        level_changes.append({"session_id": session_id, "level": level})
+                AbilityDAO.replace_abilities(db, first_session_id, last_session_id, rows, level_changes)
+
+                result["sessions"] += len(rows)
+                result["turns"] += int(replayed.sum())
+                result["level_changes"] += len(level_changes)
+            logger.info(f"Replayed the abilities of {result['sessions']} sessions: {result}", event_type='abilities_replayed')
+            return result
+        except Exception as e:
+            logger.error(f"Error replaying session abilities: {str(e)}", event_type='ability_replay_error')
+            raise Exception(str(e))
@@ -1,5 +1,10 @@
+from datetime import datetime
+from sqlalchemy import select, func, union_all
 from sqlalchemy.orm import Session
-from app.chatWithLearner.models import ChatHistory
+from app.analysis.models import LearningGoals, SessionDetails, ChatHistory, ChatAnalysis
+from app.analysis.schemas import AnalysisResult
+from app.archive.dao import ArchiveDAO
+from app.archive.models import ChatArchive
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
@@ -11,31 +16,263 @@ class AnalysisDAO:
     """
 
     @staticmethod
-    def fetch_chat_history(db_session: Session, session_identifier: int):
+    def store_analysis(db_session: Session, session_identifier: int, chat_history_id, result: AnalysisResult):
         """
-        Retrieves the complete chat history for a given session.
+        Persists a validated analysis result for a session.
 
         Args:
             db_session (Session): Database session for executing queries.
-            session_identifier (int): The ID of the session for which chat history is fetched.
+            session_identifier (int): The ID of the analyzed session.
+            chat_history_id (int | None): The latest ChatHistory ID covered by the analysis.
+            result (AnalysisResult): The validated analysis output.
 
         Returns:
-            list: A list of ChatHistory objects containing the session's chat records.
+            ChatAnalysis: The stored analysis record.
 
         Raises:
-            Exception: If the chat history retrieval process fails.
+            Exception: If the analysis cannot be stored.
         """
         try:
-            chat_records = (
-                db_session.query(ChatHistory)
+            analysis_record = ChatAnalysis(
+                session_id=session_identifier,
+                chat_history_id=chat_history_id,
+                total_questions_asked=result.total_questions_asked,
+                total_questions_answered_wrong=result.total_questions_answered_wrong,
+                misconceptions=result.misconceptions,
+                feedback=result.feedback
+            )
+            db_session.add(analysis_record)
+            db_session.commit()
+            db_session.refresh(analysis_record)
+            logger.info(f"Analysis stored successfully for session ID {session_identifier}.", event_type='ANALYSIS_STORED')
+            return analysis_record
+        except Exception as error:
+            db_session.rollback()
+            logger.error(f"Failed to store analysis for session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_STORE_ERROR')
+            raise Exception(f"Failed to store analysis: {str(error)}")
+
+    @staticmethod
+    def get_latest_analysis(db_session: Session, session_identifier: int):
+        """
+        Retrieves the most recent stored analysis for a session.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            ChatAnalysis: The latest analysis record, or None if the session was never analyzed.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            return (
+                db_session.query(ChatAnalysis)
+                .filter_by(session_id=session_identifier)
+                .order_by(ChatAnalysis.id.desc())
+                .first()
+            )
+        except Exception as error:
+            logger.error(f"Failed to retrieve latest analysis for session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve analysis: {str(error)}")
+
+    @staticmethod
+    def get_analysis_history(db_session: Session, session_identifier: int):
+        """
+        Retrieves all stored analyses for a session, newest first.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            list: A list of ChatAnalysis records.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            return (
+                db_session.query(ChatAnalysis)
                 .filter_by(session_id=session_identifier)
-                .order_by(ChatHistory.id.desc())
+                .order_by(ChatAnalysis.id.desc())
                 .all()
             )
-            if not chat_records:
-                logger.warning(f"No chat history found for session ID {session_identifier}.", event_type='CHAT_HISTORY_NOT_FOUND')
-            logger.info(f"Chat history successfully retrieved for session ID {session_identifier}.", event_type='CHAT_HISTORY_RETRIEVED')
-            return chat_records
         except Exception as error:
-            logger.error(f"Failed to retrieve chat history for session ID {session_identifier}: {str(error)}", event_type='CHAT_HISTORY_RETRIEVAL_ERROR')
-            raise Exception(f"Failed to retrieve chat history: {str(error)}")
\ No newline at end of file
+            logger.error(f"Failed to retrieve analysis history for session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve analysis history: {str(error)}")
+
+    @staticmethod
+    def fetch_learning_goals(db_session: Session):
+        """
+        Retrieves the learning goal catalog as (id, name) rows.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+
+        Returns:
+            list: A list of (id, learning_goal_names) rows.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            return db_session.execute(
+                select(LearningGoals.id, LearningGoals.learning_goal_names).order_by(LearningGoals.id)
+            ).all()
+        except Exception as error:
+            logger.error(f"Failed to retrieve learning goals: {str(error)}", event_type='LEARNING_GOALS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve learning goals: {str(error)}")
+
+    @staticmethod
+    def fetch_cohort_sessions(db_session: Session, learning_goal_id=None):
+        """
+        Bulk-loads the session columns needed for cohort analytics, ordered by session ID.
+        Levels are lower-cased so that differently cased values fall into the same cohort.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            learning_goal_id (int, optional): Restrict the cohort to one learning goal.
+
+        Returns:
+            list: A list of (session_id, learning_goal_id, initial_level, current_level) rows.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            query = select(
+                SessionDetails.id,
+                SessionDetails.learning_goal_id,
+                func.lower(SessionDetails.student_initial_level),
+                func.lower(SessionDetails.student_current_level)
+            ).order_by(SessionDetails.id)
+            if learning_goal_id is not None:
+                query = query.where(SessionDetails.learning_goal_id == learning_goal_id)
+            return db_session.execute(query).all()
+        except Exception as error:
+            logger.error(f"Failed to retrieve cohort sessions: {str(error)}", event_type='COHORT_SESSIONS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve cohort sessions: {str(error)}")
+
+    @staticmethod
+    def fetch_turn_counts(db_session: Session, learning_goal_id=None):
+        """
+        Counts chat turns per session, aggregated in the database over the session_id index,
+        plus the turns moved to the archive.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            learning_goal_id (int, optional): Restrict the counts to sessions of one learning goal.
+
+        Returns:
+            list: A list of (session_id, turn_count) rows.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            counts = union_all(
+                select(ChatHistory.session_id, func.count().label('turns')).group_by(ChatHistory.session_id),
+                select(ChatArchive.session_id, ChatArchive.turn_count.label('turns'))
+            ).subquery()
+            query = select(counts.c.session_id, func.sum(counts.c.turns)).group_by(counts.c.session_id)
+            if learning_goal_id is not None:
+                query = query.join(SessionDetails, SessionDetails.id == counts.c.session_id).where(
+                    SessionDetails.learning_goal_id == learning_goal_id
+                )
+            return db_session.execute(query).all()
+        except Exception as error:
+            logger.error(f"Failed to retrieve turn counts: {str(error)}", event_type='TURN_COUNTS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve turn counts: {str(error)}")
+
+    @staticmethod
+    def fetch_latest_analysis_counts(db_session: Session, learning_goal_id=None):
+        """
+        Retrieves the question counts of the latest stored analysis of every session.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            learning_goal_id (int, optional): Restrict the results to sessions of one learning goal.
+
+        Returns:
+            list: A list of (session_id, total_questions_asked, total_questions_answered_wrong) rows.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            latest_ids = select(func.max(ChatAnalysis.id)).group_by(ChatAnalysis.session_id)
+            if learning_goal_id is not None:
+                latest_ids = latest_ids.join(SessionDetails, SessionDetails.id == ChatAnalysis.session_id).where(
+                    SessionDetails.learning_goal_id == learning_goal_id
+                )
+            query = select(
+                ChatAnalysis.session_id,
+                ChatAnalysis.total_questions_asked,
+                ChatAnalysis.total_questions_answered_wrong
+            ).where(ChatAnalysis.id.in_(latest_ids))
+            return db_session.execute(query).all()
+        except Exception as error:
+            logger.error(f"Failed to retrieve analysis counts: {str(error)}", event_type='ANALYSIS_COUNTS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve analysis counts: {str(error)}")
+
+    @staticmethod
+    def fetch_turn_activity(db_session: Session, since: datetime, until: datetime):
+        """
+        Bulk-loads the chat turns stored in a time range, as a range scan of the created_at index, including
+        archived turns. Turns stored before the column existed, or archived before their timestamp was, are not included.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            since (datetime): Start of the range (inclusive, UTC).
+            until (datetime): End of the range (exclusive, UTC).
+
+        Returns:
+            list: A list of (day, session_id, llm_latency_ms) rows, day as 'YYYY-MM-DD' and latency None
+            for turns not answered by the model.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            turns = db_session.execute(
+                select(func.date(ChatHistory.created_at), ChatHistory.session_id, ChatHistory.llm_latency_ms)
+                .where(ChatHistory.created_at >= since, ChatHistory.created_at < until)
+            ).all()
+            return turns + [
+                (chat.created_at.date().isoformat(), chat.session_id, chat.llm_latency_ms)
+                for chat in ArchiveDAO.fetch_archived_chats_between(db_session, since, until)
+            ]
+        except Exception as error:
+            logger.error(f"Failed to retrieve turn activity: {str(error)}", event_type='TURN_ACTIVITY_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve turn activity: {str(error)}")
+
+    @staticmethod
+    def fetch_active_session_ids(db_session: Session, since: datetime, until: datetime = None, learning_goal_id=None):
+        """
+        Retrieves the sessions whose last activity (creation or latest chat turn) falls in a time range,
+        as a range scan of the last_activity_at index. With `until` omitted, these are the sessions active since `since`.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            since (datetime): Start of the range (inclusive, UTC).
+            until (datetime, optional): End of the range (exclusive, UTC).
+            learning_goal_id (int, optional): Restrict the results to sessions of one learning goal.
+
+        Returns:
+            list: The session IDs in ascending order.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            query = select(SessionDetails.id).where(SessionDetails.last_activity_at >= since).order_by(SessionDetails.id)
+            if until is not None:
+                query = query.where(SessionDetails.last_activity_at < until)
+            if learning_goal_id is not None:
+                query = query.where(SessionDetails.learning_goal_id == learning_goal_id)
+            return db_session.execute(query).scalars().all()
+        except Exception as error:
+            logger.error(f"Failed to retrieve active sessions: {str(error)}", event_type='ACTIVE_SESSIONS_RETRIEVAL_ERROR')
+            raise Exception(f"Failed to retrieve active sessions: {str(error)}")
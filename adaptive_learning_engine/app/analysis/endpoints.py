@@ -1,9 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from typing import List, Optional
 from app.analysis.services import AnalysisService
+from app.analysis.schemas import StoredAnalysis, CohortSummary, UsageSummary, MisconceptionReport
+from app.misconceptions.services import MisconceptionService
 from app.analysis.router import analysis
 from app.core.custom_logger import CustomLogger
+from app.core.responses import FastJSONResponse
+from app.core.etag import etag_matches, cache_headers, not_modified
+from app.core.circuit_breaker import LLMUnavailable
 
 logger = CustomLogger()
 
@@ -19,7 +25,7 @@ def analyse_chat(session_id: int, db: Session = Depends(get_db)):
         db (Session): Database session dependency to interact with the database.
 
     Returns:
-        dict: The response from the AI after processing the chat.
+        FastJSONResponse: Session ID, analysis version details and the analysis as an object in 'ai_response'.
 
     Raises:
         HTTPException: If there is an error while processing the chat request.
@@ -35,8 +41,173 @@ def analyse_chat(session_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Failed to process chat request")
         
         logger.info(f"Chat processed successfully for session ID {session_id}", event_type='chat_processed')
-        return response
+        # Returned directly so the pre-encoded analysis skips FastAPI's encoder
+        return FastJSONResponse(response)
     
+    except LLMUnavailable as unavailable:
+        if unavailable.fallback is None:
+            raise
+        return FastJSONResponse({**unavailable.fallback, "degraded": True})
     except Exception as e:
         logger.error(f"Error in analyse_chat for session ID {session_id}: {str(e)}", event_type = 'chat_endpoint_error')
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/student/{session_id}")
+def get_analysis(session_id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """
+    Cacheable, read-only variant of the analysis endpoint: serves the stored analysis of the session's current
+    transcript and never calls the LLM or stores anything. Analyses are computed with the POST endpoint.
+    The ETag changes only with the session's transcript or level; a request whose If-None-Match matches
+    is answered with 304 after one indexed lookup.
+
+    Args:
+        session_id (int): The ID of the chat session.
+        if_none_match (str, optional): ETag(s) of the client's cached copy.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        FastJSONResponse: The analysis, as returned by the POST endpoint, or an empty 304 response.
+
+    Raises:
+        HTTPException: If the session or an analysis of its current transcript is not found, or the lookup fails.
+    """
+    try:
+        etag = AnalysisService.get_analysis_etag(db, session_id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response = AnalysisService.get_current_analysis(db, session_id)
+        if response is None:
+            raise HTTPException(status_code=404, detail="No analysis of the current transcript; POST to compute it")
+        return FastJSONResponse(response, headers=cache_headers(etag))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_analysis for session ID {session_id}: {str(e)}", event_type='chat_endpoint_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/student/{session_id}/latest", response_model=StoredAnalysis)
+def get_latest_analysis(session_id: int, db: Session = Depends(get_db)):
+    """
+    Endpoint to read the most recent stored analysis of a chat session. No LLM call is made.
+
+    Args:
+        session_id (int): The ID of the chat session.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        StoredAnalysis: The latest stored analysis.
+
+    Raises:
+        HTTPException: If the session has no stored analysis or the lookup fails.
+    """
+    try:
+        stored_analysis = AnalysisService.get_latest_analysis(db, session_id)
+        if not stored_analysis:
+            raise HTTPException(status_code=404, detail="No analysis found for this session")
+        return stored_analysis
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_latest_analysis for session ID {session_id}: {str(e)}", event_type='analysis_read_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/student/{session_id}/history", response_model=List[StoredAnalysis])
+def get_analysis_history(session_id: int, db: Session = Depends(get_db)):
+    """
+    Endpoint to read every stored analysis of a chat session, newest first. No LLM call is made.
+
+    Args:
+        session_id (int): The ID of the chat session.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        List[StoredAnalysis]: The stored analyses of the session.
+
+    Raises:
+        HTTPException: If the lookup fails.
+    """
+    try:
+        return AnalysisService.get_analysis_history(db, session_id)
+    except Exception as e:
+        logger.error(f"Error in get_analysis_history for session ID {session_id}: {str(e)}", event_type='analysis_read_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/cohort", response_model=List[CohortSummary])
+def get_cohort_summary(learning_goal: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Endpoint to read aggregate performance across sessions, per learning goal and initial level.
+    Uses session details, chat history and stored analyses only; no LLM call is made.
+
+    Args:
+        learning_goal (str, optional): Restrict the summary to one learning goal name.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        List[CohortSummary]: Turn, question and error-rate distributions and level transitions per cohort.
+
+    Raises:
+        HTTPException: If the learning goal does not exist or the aggregation fails.
+    """
+    try:
+        summaries = AnalysisService.get_cohort_summary(db, learning_goal)
+        if summaries is None:
+            raise HTTPException(status_code=404, detail="Learning goal not found")
+        return summaries
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_cohort_summary: {str(e)}", event_type='cohort_summary_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/cohort/misconceptions", response_model=MisconceptionReport)
+def get_misconception_clusters(learning_goal: str, limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db)):
+    """
+    Endpoint to read the most common misconceptions of a learning goal: clusters of similar misconception
+    strings from the stored analyses, ranked by number of sessions, with example sessions.
+    The clusters are computed offline by cluster_misconceptions.py; no LLM call is made.
+
+    Args:
+        learning_goal (str): The learning goal name.
+        limit (int): Maximum number of clusters.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        MisconceptionReport: The ranked clusters and how far the analyses have been clustered.
+
+    Raises:
+        HTTPException: If the learning goal does not exist or the clusters cannot be read.
+    """
+    try:
+        report = MisconceptionService.get_report(db, learning_goal, limit)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Learning goal not found")
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_misconception_clusters: {str(e)}", event_type='misconception_report_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@analysis.get("/analytics/usage", response_model=UsageSummary)
+def get_usage(days: int = Query(7, ge=1, le=366), db: Session = Depends(get_db)):
+    """
+    Endpoint to read chat usage per UTC day: turns, active sessions and LLM latency.
+    Uses indexed time-range queries only; no LLM call is made.
+
+    Args:
+        days (int): Number of days covered, including today.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        UsageSummary: The totals over the window and one entry per day with turns.
+
+    Raises:
+        HTTPException: If the aggregation fails.
+    """
+    try:
+        return AnalysisService.get_usage(db, days)
+    except Exception as e:
+        logger.error(f"Error in get_usage: {str(e)}", event_type='usage_summary_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,9 +1,66 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+class LearningGoals(Base):
+    """
+    Represents learning goals for students.
+
+    Attributes:
+        id (int): The primary key, auto-incremented.
+        learning_goal_names (str): The name of the learning goal.
+
+    Relationships:
+        session_details (SessionDetails): One-to-many relationship with SessionDetails.
+    """
+    __tablename__ = 'learning_goals'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    learning_goal_names = Column(String, nullable=False)
+
+    # Relationship to SessionDetails
+    session_details = relationship("SessionDetails", back_populates="learning_goal")
+
+
+class SessionDetails(Base):
+    """
+    Represents session details related to learning goals.
+
+    Attributes:
+        id (int): The primary key, auto-incremented.
+        learning_goal_id (int): Foreign key linking to LearningGoals.
+        student_initial_level (str): The student's initial skill level.
+        student_current_level (str): The student's current skill level.
+        created_at (datetime): When the session was created. None for sessions older than the column.
+        last_activity_at (datetime): When the session was created or last had a chat turn stored.
+            None for sessions without activity since the column was added.
+
+    Relationships:
+        learning_goal (LearningGoals): Many-to-one relationship with LearningGoals.
+        chat_histories (ChatHistory): One-to-many relationship with ChatHistory.
+        analyses (ChatAnalysis): One-to-many relationship with ChatAnalysis.
+    """
+    __tablename__ = 'session_details'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    learning_goal_id = Column(Integer, ForeignKey('learning_goals.id'), nullable=False, index=True)
+    student_initial_level = Column(String, nullable=False)
+    student_current_level = Column(String, nullable=False)
+    # Nullable, since the columns are added to existing databases without backfilling them
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    last_activity_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
+
+    # Relationship to LearningGoals
+    learning_goal = relationship("LearningGoals", back_populates="session_details")
+    # Relationship to ChatHistory
+    chat_histories = relationship("ChatHistory", back_populates="session")
+    # Relationship to ChatAnalysis
+    analyses = relationship("ChatAnalysis", back_populates="session")
+
+
 class ChatHistory(Base):
     """
     Represents the chat history for a learning session.
@@ -13,6 +70,11 @@ class ChatHistory(Base):
         session_id (int): Foreign key linking to SessionDetails.
         llm_response (str): The response generated by the language model.
         learner_response (str): The response provided by the learner.
+        created_at (datetime): When the turn was stored. None for turns older than the column.
+        llm_latency_ms (int): How long the model took to generate the response, in milliseconds.
+            None when the response did not come from the model.
+        answer_verdict (str): The tutor's verdict on `learner_response` (see ANSWER_VERDICTS).
+            None for turns older than the column.
 
     Relationships:
         session (SessionDetails): Many-to-one relationship with SessionDetails.
@@ -20,9 +82,49 @@ class ChatHistory(Base):
     __tablename__ = 'chat_history'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(Integer, ForeignKey('session_details.id'), nullable=False)
+    session_id = Column(Integer, ForeignKey('session_details.id'), nullable=False, index=True)
     llm_response = Column(String, nullable=False)
     learner_response = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
+    llm_latency_ms = Column(Integer, nullable=True)
+    answer_verdict = Column(String, nullable=True)
+
+    # Relationship to SessionDetails
+    session = relationship("SessionDetails", back_populates="chat_histories")
+
+
+class ChatAnalysis(Base):
+    """
+    Represents a stored, validated analysis of a session transcript.
+
+    Attributes:
+        id (int): The primary key, auto-incremented.
+        session_id (int): Foreign key linking to SessionDetails.
+        chat_history_id (int): The latest ChatHistory ID covered by the analysis (transcript version).
+            None if the transcript was empty when analyzed.
+        total_questions_asked (int): Number of questions asked by the tutor.
+        total_questions_answered_wrong (int): Number of questions the learner answered incorrectly.
+        misconceptions (list): Misconceptions identified in the transcript.
+        feedback (str): Feedback summary on the learner's performance.
+        created_at (datetime): When the analysis was stored.
+
+    Relationships:
+        session (SessionDetails): Many-to-one relationship with SessionDetails.
+    """
+    __tablename__ = 'analyses'
+    __table_args__ = (
+        Index('ix_analyses_session_chat_history', 'session_id', 'chat_history_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey('session_details.id'), nullable=False)
+    # Not a foreign key: the referenced turn may have moved to the chat_archive table
+    chat_history_id = Column(Integer, nullable=True)
+    total_questions_asked = Column(Integer, nullable=False)
+    total_questions_answered_wrong = Column(Integer, nullable=False)
+    misconceptions = Column(JSON, nullable=False, default=list)
+    feedback = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationship to SessionDetails
-    session = relationship("SessionDetails", back_populates="chat_histories")
\ No newline at end of file
+    session = relationship("SessionDetails", back_populates="analyses")
@@ -1,4 +1,72 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 
 class SessionID(BaseModel):
     session_id: int
+
+class AnalysisResult(BaseModel):
+    """
+    Typed structure of the JSON returned by the transcript analysis model.
+    """
+    total_questions_asked: int = Field(ge=0)
+    total_questions_answered_wrong: int = Field(ge=0)
+    misconceptions: List[str] = []
+    feedback: str
+
+class StoredAnalysis(AnalysisResult):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    session_id: int
+    chat_history_id: Optional[int]
+    created_at: datetime
+
+class DistributionSummary(BaseModel):
+    count: int
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    max: Optional[float] = None
+
+class CohortSummary(BaseModel):
+    learning_goal_id: int
+    learning_goal: str
+    level: str
+    sessions: int
+    analyzed_sessions: int
+    turns_per_session: DistributionSummary
+    questions_asked: DistributionSummary
+    error_rate: DistributionSummary
+    level_transitions: Dict[str, int]
+
+class DailyUsage(BaseModel):
+    day: date
+    turns: int
+    active_sessions: int
+    llm_latency_ms: DistributionSummary
+
+class UsageSummary(BaseModel):
+    since: datetime
+    until: datetime
+    active_sessions: int
+    turns: int
+    llm_latency_ms: DistributionSummary
+    days: List[DailyUsage]
+
+class MisconceptionClusterSummary(BaseModel):
+    cluster_id: int
+    label: str
+    sessions: int
+    mentions: int
+    phrasings: List[str]
+    example_session_ids: List[int]
+
+class MisconceptionReport(BaseModel):
+    learning_goal_id: int
+    learning_goal: str
+    misconceptions: int
+    clustered_through_analysis_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    clusters: List[MisconceptionClusterSummary]
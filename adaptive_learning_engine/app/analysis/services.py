@@ -1,15 +1,154 @@
+import numpy as np
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.analysis.dao import AnalysisDAO
+from app.session.dao import SessionDAO
+from app.analysis.schemas import AnalysisResult, StoredAnalysis, DistributionSummary, CohortSummary, DailyUsage, UsageSummary
 from app.core.open_ai_service import OpenAIService
+from app.core.circuit_breaker import LLMUnavailable
+from app.core.model_router import TASK_ANALYSIS
+from app.core.deadline import check_deadline
+from app.core.responses import RawJSON
+from app.core.etag import session_etag
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
 
+def _group_distributions(values: np.ndarray, groups: np.ndarray, n_groups: int) -> dict:
+    """
+    Computes count, mean, min, median, 90th percentile and max of `values` per group in one pass.
+
+    Args:
+        values (np.ndarray): Float values, one per observation.
+        groups (np.ndarray): Group index of each observation, in [0, n_groups).
+        n_groups (int): Number of groups.
+
+    Returns:
+        dict: Arrays of length n_groups keyed by statistic name. Empty groups hold NaN.
+    """
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+    # Sort by group, then value, so each group's values form a sorted contiguous block
+    sorted_values = values[np.lexsort((values, groups))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    non_empty = counts > 0
+    last = np.maximum(counts - 1, 0)
+
+    def percentile(q):
+        position = starts + q * last
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        result = np.full(n_groups, np.nan)
+        if sorted_values.size:
+            lower_values = sorted_values[np.minimum(lower, sorted_values.size - 1)]
+            upper_values = sorted_values[np.minimum(upper, sorted_values.size - 1)]
+            interpolated = lower_values + (upper_values - lower_values) * (position - lower)
+            result[non_empty] = interpolated[non_empty]
+        return result
+
+    mean = np.full(n_groups, np.nan)
+    mean[non_empty] = sums[non_empty] / counts[non_empty]
+    return {
+        "count": counts,
+        "mean": mean,
+        "min": percentile(0.0),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "max": percentile(1.0),
+    }
+
+def _distribution_summary(stats: dict, group: int) -> DistributionSummary:
+    """
+    Extracts one group's statistics from the output of `_group_distributions`.
+    """
+    if not stats["count"][group]:
+        return DistributionSummary(count=0)
+    return DistributionSummary(
+        count=int(stats["count"][group]),
+        **{key: round(float(stats[key][group]), 4) for key in ("mean", "min", "p50", "p90", "max")}
+    )
+
 class AnalysisService:
     """
     Service class for handling chat interactions with the learner. 
     It retrieves session details, generates AI responses, and stores chat history.
     """
+
+    @staticmethod
+    def _to_response(analysis_record) -> dict:
+        """
+        Builds the endpoint response for a stored analysis record.
+
+        Args:
+            analysis_record (ChatAnalysis): The stored analysis.
+
+        Returns:
+            dict: Session ID, analysis version details and the analysis, already encoded as JSON by pydantic
+            so it is embedded in the response as an object without being encoded again.
+        """
+        result = AnalysisResult.model_validate(analysis_record, from_attributes=True)
+        return {
+            "session_id": analysis_record.session_id,
+            "analysis_id": analysis_record.id,
+            "chat_history_id": analysis_record.chat_history_id,
+            "ai_response": RawJSON(result.model_dump_json())
+        }
+
+    @staticmethod
+    def get_analysis_etag(db_session: Session, session_identifier: int):
+        """
+        Gets the ETag of a session's analysis, which changes only with the transcript or the level.
+        Costs one indexed lookup; neither the transcript nor the LLM is touched.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            str: The ETag, or None if the session does not exist.
+
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            version = SessionDAO.get_session_version(db_session, session_identifier)
+            if version is None:
+                return None
+            return session_etag('analysis', session_identifier, version.latest_chat_id, version.student_current_level)
+        except Exception as error:
+            logger.error(f"Failed to read the analysis version: {str(error)}", event_type='ANALYSIS_VERSION_ERROR')
+            raise Exception(str(error))
+
+    @staticmethod
+    def get_current_analysis(db_session: Session, session_identifier: int):
+        """
+        Gets the stored analysis of a session's current transcript. Read-only: no LLM call is made and
+        nothing is stored; analyses are only computed by `analyze_chat`.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            dict: The analysis, as returned by `analyze_chat`, or None if no stored analysis covers the
+            session's latest turn.
+
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            version = SessionDAO.get_session_version(db_session, session_identifier)
+            if version is None:
+                return None
+            latest_analysis = AnalysisDAO.get_latest_analysis(db_session, session_identifier)
+            # A session without chat history is analyzed with no chat_history_id
+            if latest_analysis is None or latest_analysis.chat_history_id != (version.latest_chat_id or None):
+                return None
+            return AnalysisService._to_response(latest_analysis)
+        except Exception as error:
+            logger.error(f"Failed to read the current analysis of session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_RETRIEVAL_ERROR')
+            raise Exception(str(error))
+
     @staticmethod
     def analyze_chat(db_session: Session, session_identifier: int):
         """
@@ -23,18 +162,59 @@ class AnalysisService:
             dict: AI-generated response to the learner's input.
 
         Raises:
+            LLMUnavailable: If the AI service is unavailable; carries the last stored analysis as fallback, if any.
             Exception: If any part of the process fails.
         """
         try:
             logger.info(f"Processing chat request for session ID: {session_identifier}", event_type='PROCESS_CHAT_REQUEST')
 
-            chat_history = AnalysisDAO().fetch_chat_history(db_session, session_identifier)
+            chat_history = SessionDAO.get_complete_chat_history(db_session, session_identifier)
+            latest_chat_id = chat_history[0].id if chat_history else None
+
+            latest_analysis = AnalysisDAO.get_latest_analysis(db_session, session_identifier)
 
             # Format chat history for GPT prompt
             formatted_chat_history = [
                 f"Learner: {entry.learner_response}\nAI: {entry.llm_response}"
                 for entry in chat_history
             ]
+            return AnalysisService.analyze_transcript(
+                db_session, session_identifier, formatted_chat_history, latest_chat_id, latest_analysis
+            )
+
+        except LLMUnavailable:
+            raise
+        except Exception as error:
+            logger.error(f"Error processing chat for session ID {session_identifier}: {str(error)}", event_type='CHAT_ANALYSIS_ERROR')
+            raise Exception(f"Error processing chat: {str(error)}")
+
+    @staticmethod
+    def analyze_transcript(db_session: Session, session_identifier: int, formatted_chat_history: list,
+                           latest_chat_id, latest_analysis=None):
+        """
+        Analyzes an already loaded transcript with the LLM and stores the result, so callers that also need the
+        transcript for something else load it only once.
+
+        Args:
+            db_session (Session): Database session the analysis is stored with.
+            session_identifier (int): The ID of the session.
+            formatted_chat_history (list): The transcript, newest turn first, formatted as in `analyze_chat`.
+            latest_chat_id (int | None): The latest ChatHistory ID covered by the transcript.
+            latest_analysis (ChatAnalysis, optional): The session's last stored analysis; reused if it covers
+                the same transcript, and offered as fallback if the AI service is unavailable.
+
+        Returns:
+            dict: The analysis, as returned by `analyze_chat`.
+
+        Raises:
+            LLMUnavailable: If the AI service is unavailable; carries the last stored analysis as fallback, if any.
+            Exception: If the analysis fails.
+        """
+        try:
+            # Reuse the stored analysis if the transcript has not changed since it was produced
+            if latest_analysis and latest_analysis.chat_history_id == latest_chat_id:
+                logger.info(f"Transcript unchanged for session ID {session_identifier}, serving stored analysis.", event_type='CHAT_ANALYSIS_REUSED')
+                return AnalysisService._to_response(latest_analysis)
 
             system_prompt = (
                 '''
@@ -61,16 +241,234 @@ class AnalysisService:
                 '''
             )
             openai_service = OpenAIService()
-            ai_response = openai_service.generate_response_json(system_prompt, user_prompt)
+            try:
+                ai_response = openai_service.generate_response_json(system_prompt, user_prompt, TASK_ANALYSIS)
+            except LLMUnavailable as unavailable:
+                # The last stored analysis predates the latest turns, but beats no analysis
+                if latest_analysis:
+                    logger.warning(f"AI service unavailable, offering the stored analysis for session ID {session_identifier}.", event_type='CHAT_ANALYSIS_DEGRADED')
+                    unavailable.fallback = AnalysisService._to_response(latest_analysis)
+                raise
+
+            # Validate the model output and materialize it against the transcript version it covers
+            analysis_result = AnalysisResult.model_validate_json(ai_response)
+            check_deadline()
+            analysis_record = AnalysisDAO.store_analysis(db_session, session_identifier, latest_chat_id, analysis_result)
 
             logger.info("Chat analysis completed successfully.", event_type='CHAT_ANALYSIS_SUCCESS')
 
             # Return response to the user
-            return {
-                "session_id": session_identifier,
-                "ai_response": ai_response
-            }
+            return AnalysisService._to_response(analysis_record)
 
+        except LLMUnavailable:
+            raise
         except Exception as error:
-            logger.error(f"Error processing chat for session ID {session_identifier}: {str(error)}", event_type='CHAT_ANALYSIS_ERROR')
-            raise Exception(f"Error processing chat: {str(error)}")
\ No newline at end of file
+            logger.error(f"Error analyzing the transcript of session ID {session_identifier}: {str(error)}", event_type='CHAT_ANALYSIS_ERROR')
+            raise Exception(f"Error analyzing transcript: {str(error)}")
+
+    @staticmethod
+    def get_latest_analysis(db_session: Session, session_identifier: int):
+        """
+        Returns the most recent stored analysis for a session without calling the LLM.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            StoredAnalysis: The latest stored analysis, or None if the session was never analyzed.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            analysis_record = AnalysisDAO.get_latest_analysis(db_session, session_identifier)
+            if not analysis_record:
+                logger.warning(f"No stored analysis for session ID {session_identifier}.", event_type='ANALYSIS_NOT_FOUND')
+                return None
+            return StoredAnalysis.model_validate(analysis_record)
+        except Exception as error:
+            logger.error(f"Error fetching stored analysis for session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_FETCH_ERROR')
+            raise Exception(f"Error fetching stored analysis: {str(error)}")
+
+    @staticmethod
+    def get_analysis_history(db_session: Session, session_identifier: int):
+        """
+        Returns every stored analysis for a session, newest first, without calling the LLM.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            session_identifier (int): The ID of the session.
+
+        Returns:
+            list: A list of StoredAnalysis objects.
+
+        Raises:
+            Exception: If the retrieval fails.
+        """
+        try:
+            analysis_records = AnalysisDAO.get_analysis_history(db_session, session_identifier)
+            return [StoredAnalysis.model_validate(record) for record in analysis_records]
+        except Exception as error:
+            logger.error(f"Error fetching analysis history for session ID {session_identifier}: {str(error)}", event_type='ANALYSIS_FETCH_ERROR')
+            raise Exception(f"Error fetching analysis history: {str(error)}")
+
+    @staticmethod
+    def get_cohort_summary(db_session: Session, learning_goal: str = None):
+        """
+        Aggregates performance across sessions per learning goal and initial level.
+        Session, turn and analysis columns are bulk-loaded once and aggregated with NumPy.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            learning_goal (str, optional): Restrict the summary to one learning goal name.
+
+        Returns:
+            list: A list of CohortSummary objects, or None if the learning goal does not exist.
+
+        Raises:
+            Exception: If the aggregation fails.
+        """
+        try:
+            goal_names = dict(AnalysisDAO.fetch_learning_goals(db_session))
+            learning_goal_id = None
+            if learning_goal is not None:
+                learning_goal_id = next((goal_id for goal_id, name in goal_names.items() if name == learning_goal), None)
+                if learning_goal_id is None:
+                    logger.warning(f"Learning goal '{learning_goal}' not found.", event_type='COHORT_GOAL_NOT_FOUND')
+                    return None
+
+            session_rows = AnalysisDAO.fetch_cohort_sessions(db_session, learning_goal_id)
+            if not session_rows:
+                return []
+            session_ids, goal_ids, initial_levels, current_levels = (np.array(column) for column in zip(*session_rows))
+            session_ids = session_ids.astype(np.int64)
+
+            # Cohort key: (learning goal, initial level); levels share one code table so transitions line up
+            goal_values, goal_codes = np.unique(goal_ids.astype(np.int64), return_inverse=True)
+            level_values, level_codes = np.unique(
+                np.concatenate((initial_levels, current_levels)).astype(str), return_inverse=True
+            )
+            n_levels = len(level_values)
+            initial_codes, current_codes = level_codes[:len(session_ids)], level_codes[len(session_ids):]
+            groups = goal_codes * n_levels + initial_codes
+            n_groups = len(goal_values) * n_levels
+
+            # Turns per session, aligned to the ordered session ID array
+            turns = np.zeros(len(session_ids))
+            turn_rows = AnalysisDAO.fetch_turn_counts(db_session, learning_goal_id)
+            if turn_rows:
+                turn_session_ids, turn_counts = (np.array(column, dtype=np.int64) for column in zip(*turn_rows))
+                positions = np.searchsorted(session_ids, turn_session_ids)
+                found = positions < len(session_ids)
+                found[found] = session_ids[positions[found]] == turn_session_ids[found]
+                turns[positions[found]] = turn_counts[found]
+
+            # Latest stored analysis per session, where one exists
+            analysis_rows = AnalysisDAO.fetch_latest_analysis_counts(db_session, learning_goal_id)
+            analyzed_positions = np.zeros(0, dtype=np.int64)
+            asked = wrong = np.zeros(0)
+            if analysis_rows:
+                analyzed_ids, asked, wrong = (np.array(column, dtype=np.float64) for column in zip(*analysis_rows))
+                analyzed_ids = analyzed_ids.astype(np.int64)
+                positions = np.searchsorted(session_ids, analyzed_ids)
+                found = positions < len(session_ids)
+                found[found] = session_ids[positions[found]] == analyzed_ids[found]
+                analyzed_positions, asked, wrong = positions[found], asked[found], wrong[found]
+            analyzed_groups = groups[analyzed_positions]
+            answered = asked > 0
+            error_rates = np.clip(wrong[answered] / asked[answered], 0.0, 1.0)
+
+            turn_stats = _group_distributions(turns, groups, n_groups)
+            asked_stats = _group_distributions(asked, analyzed_groups, n_groups)
+            error_stats = _group_distributions(error_rates, analyzed_groups[answered], n_groups)
+            transitions = np.bincount(groups * n_levels + current_codes, minlength=n_groups * n_levels).reshape(n_groups, n_levels)
+
+            summaries = []
+            for group in np.flatnonzero(turn_stats["count"]):
+                goal_id = int(goal_values[group // n_levels])
+                summaries.append(CohortSummary(
+                    learning_goal_id=goal_id,
+                    learning_goal=goal_names.get(goal_id, ""),
+                    level=str(level_values[group % n_levels]),
+                    sessions=int(turn_stats["count"][group]),
+                    analyzed_sessions=int(asked_stats["count"][group]),
+                    turns_per_session=_distribution_summary(turn_stats, group),
+                    questions_asked=_distribution_summary(asked_stats, group),
+                    error_rate=_distribution_summary(error_stats, group),
+                    level_transitions={
+                        str(level_values[level]): int(count)
+                        for level, count in enumerate(transitions[group]) if count
+                    }
+                ))
+
+            logger.info(f"Cohort summary computed for {len(session_ids)} sessions.", event_type='COHORT_SUMMARY_SUCCESS')
+            return summaries
+        except Exception as error:
+            logger.error(f"Error computing cohort summary: {str(error)}", event_type='COHORT_SUMMARY_ERROR')
+            raise Exception(f"Error computing cohort summary: {str(error)}")
+
+    @staticmethod
+    def get_usage(db_session: Session, days: int = 7):
+        """
+        Aggregates chat usage per UTC day over the last `days` days, including today: turns, active sessions
+        and the model's latency. The turns are read with one range scan of the created_at index and
+        aggregated with NumPy, together with archived turns; turns without a timestamp are not counted.
+
+        Args:
+            db_session (Session): Database session for executing queries.
+            days (int): Number of days covered.
+
+        Returns:
+            UsageSummary: The totals over the window and one entry per day with turns.
+
+        Raises:
+            Exception: If the aggregation fails.
+        """
+        try:
+            until = datetime.utcnow()
+            since = datetime.combine(until.date() - timedelta(days=days - 1), datetime.min.time())
+            # Sessions created or chatted in since the window started
+            active_sessions = len(AnalysisDAO.fetch_active_session_ids(db_session, since))
+
+            turn_rows = AnalysisDAO.fetch_turn_activity(db_session, since, until)
+            if not turn_rows:
+                return UsageSummary(
+                    since=since, until=until, active_sessions=active_sessions, turns=0,
+                    llm_latency_ms=DistributionSummary(count=0), days=[]
+                )
+            turn_days, session_ids, latencies = zip(*turn_rows)
+            day_values, day_codes = np.unique(np.array(turn_days, dtype=str), return_inverse=True)
+            n_days = len(day_values)
+            session_ids = np.array(session_ids, dtype=np.int64)
+            # None (turns not answered by the model) becomes NaN
+            latencies = np.array(latencies, dtype=np.float64)
+            timed = ~np.isnan(latencies)
+
+            turns = np.bincount(day_codes, minlength=n_days)
+            # Distinct sessions per day, from the distinct (day, session) pairs
+            day_sessions = np.unique(np.stack((day_codes, session_ids)), axis=1)
+            sessions_per_day = np.bincount(day_sessions[0], minlength=n_days)
+            daily_latency = _group_distributions(latencies[timed], day_codes[timed], n_days)
+            total_latency = _group_distributions(latencies[timed], np.zeros(int(timed.sum()), dtype=np.int64), 1)
+
+            logger.info(f"Usage computed for {len(turn_rows)} turns over {days} days.", event_type='USAGE_SUMMARY_SUCCESS')
+            return UsageSummary(
+                since=since,
+                until=until,
+                active_sessions=active_sessions,
+                turns=len(turn_rows),
+                llm_latency_ms=_distribution_summary(total_latency, 0),
+                days=[
+                    DailyUsage(
+                        day=day_values[day],
+                        turns=int(turns[day]),
+                        active_sessions=int(sessions_per_day[day]),
+                        llm_latency_ms=_distribution_summary(daily_latency, day)
+                    )
+                    for day in range(n_days)
+                ]
+            )
+        except Exception as error:
+            logger.error(f"Error computing usage: {str(error)}", event_type='USAGE_SUMMARY_ERROR')
+            raise Exception(f"Error computing usage: {str(error)}")
@@ -0,0 +1,343 @@
+import json
+import zlib
+from datetime import datetime
+from collections import namedtuple
+from sqlalchemy import select, delete, func, or_, exists
+from sqlalchemy.orm import Session
+from app.archive.models import ChatArchive
+from app.analysis.models import ChatHistory, SessionDetails
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Archived chat turn; exposes the same attributes as ChatHistory for formatting and serialization.
+# Turns archived before their metadata was carried have no created_at, llm_latency_ms or answer_verdict.
+ArchivedChat = namedtuple(
+    'ArchivedChat',
+    ['id', 'session_id', 'learner_response', 'llm_response', 'created_at', 'llm_latency_ms', 'answer_verdict'],
+    defaults=(None, None, None)
+)
+
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+# Payload format whose entries all carry created_at, llm_latency_ms and answer_verdict
+PAYLOAD_FORMAT_WITH_METADATA = 2
+
+
+def compress_transcript(entries: list, codec: str = CODEC_ZLIB) -> bytes:
+    """
+    Compress a transcript of [id, learner_response, llm_response, created_at, llm_latency_ms, answer_verdict]
+    entries, created_at as an ISO 8601 string.
+
+    Args:
+        entries (list): The transcript entries, oldest first.
+        codec (str): 'zlib', or 'zstd' if the optional zstandard package is installed.
+
+    Returns:
+        bytes: The compressed payload.
+    """
+    data = json.dumps(entries, separators=(',', ':')).encode('utf-8')
+    if codec == CODEC_ZSTD:
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress_transcript(payload: bytes, codec: str) -> list:
+    """
+    Decompress a payload produced by `compress_transcript`.
+    """
+    if codec == CODEC_ZSTD:
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        data = zlib.decompress(payload)
+    return json.loads(data)
+
+
+def archived_chats(session_id: int, entries: list) -> list:
+    """
+    Build the ArchivedChat turns of a decompressed transcript; entries without metadata get None for it.
+    """
+    chats = []
+    for entry in entries:
+        created_at = entry[3] if len(entry) > 3 else None
+        chats.append(ArchivedChat(
+            entry[0], session_id, entry[1], entry[2],
+            datetime.fromisoformat(created_at) if created_at else None, *entry[4:6]
+        ))
+    return chats
+
+
+class ArchiveDAO:
+    """
+    Data Access Object (DAO) class for the cold-storage archive of idle sessions' transcripts.
+    """
+
+    @staticmethod
+    def fetch_archived_chat_history(db: Session, session_id: int, after_id: int = None):
+        """
+        Get the archived transcript of a session. The transcript is only decompressed if it holds turns
+        past 'after_id', so pages beyond the archive never pay for it.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            after_id (int, optional): Only return turns with an ID greater than this cursor.
+
+        Returns:
+            list: ArchivedChat entries, oldest first; empty if the session has no archive or no archived turn
+                past the cursor.
+
+        Raises:
+            Exception: If the archive cannot be read.
+        """
+        try:
+            query = select(ChatArchive.codec, ChatArchive.payload).where(ChatArchive.session_id == session_id)
+            if after_id is not None:
+                query = query.where(ChatArchive.last_chat_id > after_id)
+            archive = db.execute(query).first()
+            if archive is None:
+                return []
+            logger.info(f"Archived chat history read for session ID {session_id}.", event_type='archived_chat_history_fetched')
+            chats = archived_chats(session_id, decompress_transcript(archive.payload, archive.codec))
+            return chats if after_id is None else [chat for chat in chats if chat.id > after_id]
+        except Exception as e:
+            logger.error(f"Error reading archived chat history for session ID {session_id}: {str(e)}", event_type='archived_chat_history_error')
+            raise Exception(f"Error reading archived chat history: {str(e)}")
+
+    @staticmethod
+    def fetch_archived_chats(db: Session, first_session_id: int, last_session_id: int):
+        """
+        Get the archived turns of a range of sessions, for archives whose turns all carry their metadata.
+
+        Args:
+            db (Session): Database session for executing queries.
+            first_session_id (int): The lowest session ID of the range.
+            last_session_id (int): The highest session ID of the range.
+
+        Returns:
+            list: ArchivedChat entries grouped by session in ID order, oldest first within a session.
+
+        Raises:
+            Exception: If the archives cannot be read.
+        """
+        try:
+            archives = db.connection().execute(
+                select(ChatArchive.session_id, ChatArchive.codec, ChatArchive.payload)
+                .where(
+                    ChatArchive.session_id.between(first_session_id, last_session_id),
+                    ChatArchive.payload_format == PAYLOAD_FORMAT_WITH_METADATA
+                )
+                .order_by(ChatArchive.session_id)
+            ).all()
+            return [
+                chat for archive in archives
+                for chat in archived_chats(archive.session_id, decompress_transcript(archive.payload, archive.codec))
+            ]
+        except Exception as e:
+            logger.error(f"Error reading the archives of sessions {first_session_id}-{last_session_id}: {str(e)}", event_type='archived_chat_history_error')
+            raise Exception(f"Error reading archived chat history: {str(e)}")
+
+    @staticmethod
+    def fetch_archived_chats_between(db: Session, since: datetime, until: datetime):
+        """
+        Get the archived turns stored in a time range. Only archives whose turns span the range are decompressed,
+        found with a range scan of the last_created_at index; turns archived without a timestamp are left out.
+
+        Args:
+            db (Session): Database session for executing queries.
+            since (datetime): Start of the range (inclusive, UTC).
+            until (datetime): End of the range (exclusive, UTC).
+
+        Returns:
+            list: ArchivedChat entries stored in the range.
+
+        Raises:
+            Exception: If the archives cannot be read.
+        """
+        try:
+            archives = db.execute(
+                select(ChatArchive.session_id, ChatArchive.codec, ChatArchive.payload)
+                .where(ChatArchive.last_created_at >= since, ChatArchive.first_created_at < until)
+            ).all()
+            return [
+                chat for archive in archives
+                for chat in archived_chats(archive.session_id, decompress_transcript(archive.payload, archive.codec))
+                if chat.created_at is not None and since <= chat.created_at < until
+            ]
+        except Exception as e:
+            logger.error(f"Error reading the archived turns stored since {since}: {str(e)}", event_type='archived_chat_history_error')
+            raise Exception(f"Error reading archived chat history: {str(e)}")
+
+    @staticmethod
+    def get_archive_turn_counts(db: Session, session_ids=None):
+        """
+        Get the number of archived turns per archived session.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_ids (list, optional): Restrict the result to these sessions.
+
+        Returns:
+            list: A list of (session_id, turn_count) rows.
+        """
+        try:
+            query = select(ChatArchive.session_id, ChatArchive.turn_count)
+            if session_ids is not None:
+                query = query.where(ChatArchive.session_id.in_(session_ids))
+            return db.execute(query).all()
+        except Exception as e:
+            logger.error(f"Error reading archive turn counts: {str(e)}", event_type='archive_turn_counts_error')
+            raise Exception(f"Error reading archive turn counts: {str(e)}")
+
+    @staticmethod
+    def get_latest_chat_id(db: Session):
+        """
+        Get the highest ChatHistory ID in the hot table.
+
+        Args:
+            db (Session): Database session for executing queries.
+
+        Returns:
+            int: The latest ChatHistory ID, or None if the table is empty.
+        """
+        try:
+            return db.execute(select(func.max(ChatHistory.id))).scalar()
+        except Exception as e:
+            logger.error(f"Error reading the latest chat ID: {str(e)}", event_type='latest_chat_id_error')
+            raise Exception(f"Error reading the latest chat ID: {str(e)}")
+
+    @staticmethod
+    def find_idle_sessions(db: Session, cutoff_chat_id: int):
+        """
+        Get the sessions whose latest hot chat turn is at or below the cutoff ChatHistory ID.
+
+        Args:
+            db (Session): Database session for executing queries.
+            cutoff_chat_id (int): Sessions with no turn above this ID are idle.
+
+        Returns:
+            list: The idle session IDs in ascending order.
+        """
+        try:
+            return db.execute(
+                select(ChatHistory.session_id)
+                .group_by(ChatHistory.session_id)
+                .having(func.max(ChatHistory.id) <= cutoff_chat_id)
+                .order_by(ChatHistory.session_id)
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error finding idle sessions: {str(e)}", event_type='idle_sessions_error')
+            raise Exception(f"Error finding idle sessions: {str(e)}")
+
+    @staticmethod
+    def find_sessions_idle_since(db: Session, cutoff_time: datetime, cutoff_chat_id: int):
+        """
+        Get the sessions with hot chat turns whose last activity is before the cutoff time, as a range scan
+        of the last_activity_at index. Sessions without a recorded last activity (none since the column was
+        added) count as idle. Sessions with a turn above the cutoff ChatHistory ID are left out.
+
+        Args:
+            db (Session): Database session for executing queries.
+            cutoff_time (datetime): Sessions without activity since this time (UTC) are idle.
+            cutoff_chat_id (int): Sessions with a turn above this ID are not idle.
+
+        Returns:
+            list: The idle session IDs in ascending order.
+        """
+        try:
+            has_hot_turns = exists().where(ChatHistory.session_id == SessionDetails.id)
+            has_recent_turns = exists().where(ChatHistory.session_id == SessionDetails.id, ChatHistory.id > cutoff_chat_id)
+            return db.execute(
+                select(SessionDetails.id)
+                .where(
+                    or_(SessionDetails.last_activity_at < cutoff_time, SessionDetails.last_activity_at.is_(None)),
+                    has_hot_turns,
+                    ~has_recent_turns
+                )
+                .order_by(SessionDetails.id)
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error finding idle sessions: {str(e)}", event_type='idle_sessions_error')
+            raise Exception(f"Error finding idle sessions: {str(e)}")
+
+    @staticmethod
+    def archive_sessions(db: Session, session_ids: list, cutoff_chat_id: int, codec: str = CODEC_ZLIB) -> int:
+        """
+        Move the hot chat turns of the given sessions into one compressed archive row per session, in one transaction.
+        Sessions that received a turn above the cutoff since they were selected are skipped. An existing archive
+        (from a session that was archived, then resumed) is extended rather than replaced.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_ids (list): The sessions to archive.
+            cutoff_chat_id (int): The idle cutoff used to select the sessions.
+            codec (str): Compression codec for new payloads.
+
+        Returns:
+            int: The number of chat turns moved to the archive.
+
+        Raises:
+            Exception: If the chunk cannot be archived; the transaction is rolled back.
+        """
+        try:
+            rows = db.execute(
+                select(
+                    ChatHistory.id, ChatHistory.session_id, ChatHistory.learner_response, ChatHistory.llm_response,
+                    ChatHistory.created_at, ChatHistory.llm_latency_ms, ChatHistory.answer_verdict
+                )
+                .where(ChatHistory.session_id.in_(session_ids))
+                .order_by(ChatHistory.session_id, ChatHistory.id)
+            ).all()
+            transcripts = {}
+            for row in rows:
+                transcripts.setdefault(row.session_id, []).append([
+                    row.id, row.learner_response, row.llm_response,
+                    row.created_at.isoformat() if row.created_at else None, row.llm_latency_ms, row.answer_verdict
+                ])
+            # Skip sessions that became active again since selection
+            transcripts = {
+                session_id: entries for session_id, entries in transcripts.items() if entries[-1][0] <= cutoff_chat_id
+            }
+            if not transcripts:
+                db.rollback()
+                return 0
+
+            existing = {
+                archive.session_id: archive
+                for archive in db.query(ChatArchive).filter(ChatArchive.session_id.in_(list(transcripts)))
+            }
+            moved = 0
+            for session_id, entries in transcripts.items():
+                # An archive started without metadata keeps its format: its older entries still lack it
+                archive = existing.get(session_id)
+                if archive is not None:
+                    entries = decompress_transcript(archive.payload, archive.codec) + entries
+                else:
+                    archive = ChatArchive(session_id=session_id, payload_format=PAYLOAD_FORMAT_WITH_METADATA)
+                    db.add(archive)
+                timestamps = [datetime.fromisoformat(entry[3]) for entry in entries if len(entry) > 3 and entry[3]]
+                moved += len(entries) - (archive.turn_count or 0)
+                archive.turn_count = len(entries)
+                archive.first_chat_id = entries[0][0]
+                archive.last_chat_id = entries[-1][0]
+                archive.codec = codec
+                archive.payload = compress_transcript(entries, codec)
+                archive.first_created_at = min(timestamps, default=None)
+                archive.last_created_at = max(timestamps, default=None)
+                archive.archived_at = datetime.utcnow()
+
+            db.execute(
+                delete(ChatHistory)
+                .where(ChatHistory.session_id.in_(list(transcripts)))
+                .where(ChatHistory.id <= cutoff_chat_id)
+            )
+            db.commit()
+            logger.info(f"Archived {moved} chat turns of {len(transcripts)} sessions.", event_type='sessions_archived')
+            return moved
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error archiving sessions: {str(e)}", event_type='archive_sessions_error')
+            raise Exception(f"Error archiving sessions: {str(e)}")
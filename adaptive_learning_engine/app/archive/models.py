@@ -0,0 +1,37 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class ChatArchive(Base):
+    """
+    Represents the compressed transcript of an archived (idle) session.
+
+    Attributes:
+        session_id (int): The primary key; the ID of the archived session in session_details.
+        turn_count (int): Number of chat turns in the archived transcript.
+        first_chat_id (int): The lowest ChatHistory ID in the archived transcript.
+        last_chat_id (int): The highest ChatHistory ID in the archived transcript.
+        codec (str): Compression codec of the payload ('zlib' or 'zstd').
+        payload (bytes): Compressed JSON list of [id, learner_response, llm_response, created_at, llm_latency_ms,
+            answer_verdict] entries, oldest first. Entries archived before the last three were carried have only the first three.
+        payload_format (int): 2 when every entry carries created_at, llm_latency_ms and answer_verdict; None for
+            transcripts (partly) archived before they were carried.
+        first_created_at (datetime): When the oldest timestamped turn in the transcript was stored, or None.
+        last_created_at (datetime): When the latest timestamped turn in the transcript was stored, or None.
+        archived_at (datetime): When the transcript was (last) archived.
+    """
+    __tablename__ = 'chat_archive'
+
+    session_id = Column(Integer, primary_key=True, autoincrement=False)
+    turn_count = Column(Integer, nullable=False)
+    first_chat_id = Column(Integer, nullable=False)
+    last_chat_id = Column(Integer, nullable=False)
+    codec = Column(String, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    # Nullable, since the columns are added to existing databases without backfilling them
+    payload_format = Column(Integer, nullable=True)
+    first_created_at = Column(DateTime, nullable=True)
+    last_created_at = Column(DateTime, nullable=True, index=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,103 @@
+import time
+from datetime import datetime
+from app.archive.dao import ArchiveDAO, CODEC_ZLIB
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# SQLite auto_vacuum mode in which freed pages can be released with PRAGMA incremental_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class ArchiveService:
+    """
+    Service layer for moving idle sessions' transcripts to cold storage and reclaiming the freed space.
+    """
+
+    @staticmethod
+    def archive_idle_sessions(session_factory, idle_turns: int = None, chunk_size: int = 200, pause: float = 0.0,
+                              codec: str = CODEC_ZLIB, idle_since: datetime = None) -> dict:
+        """
+        Archive every session that has been idle for at least `idle_turns` turns, or since `idle_since`,
+        one short transaction per chunk, so live requests only ever wait for a single chunk.
+
+        With `idle_turns`, a session is idle when at least `idle_turns` chat turns were recorded (across all
+        sessions) after its latest turn. With `idle_since`, a session is idle when its last activity is
+        before that time; sessions whose last activity was never recorded count as idle.
+
+        Args:
+            session_factory: Callable returning a new database session.
+            idle_turns (int, optional): The idle threshold, in turns recorded since the session's latest turn (at least 1).
+            chunk_size (int): Sessions archived per transaction.
+            pause (float): Seconds to sleep between chunks, leaving room for live traffic.
+            codec (str): Compression codec of the archived transcripts.
+            idle_since (datetime, optional): The idle threshold as a time (UTC); used instead of `idle_turns`.
+
+        Returns:
+            dict: The number of idle sessions found and of chat turns archived.
+
+        Raises:
+            Exception: If a chunk cannot be archived; chunks committed before it stay archived.
+        """
+        db = session_factory()
+        try:
+            latest_chat_id = ArchiveDAO.get_latest_chat_id(db)
+            if latest_chat_id is None:
+                return {"sessions": 0, "turns": 0}
+            # chat_history IDs are rowids without AUTOINCREMENT: the latest row always stays hot, so new turns
+            # never reuse an archived ID and archived turns always precede a resumed session's hot turns
+            if idle_since is not None:
+                cutoff_chat_id = latest_chat_id - 1
+                session_ids = ArchiveDAO.find_sessions_idle_since(db, idle_since, cutoff_chat_id)
+            else:
+                cutoff_chat_id = latest_chat_id - max(idle_turns, 1)
+                session_ids = ArchiveDAO.find_idle_sessions(db, cutoff_chat_id)
+            db.rollback()
+            logger.info(f"Found {len(session_ids)} idle sessions to archive.", event_type='idle_sessions_found')
+
+            turns = 0
+            for start in range(0, len(session_ids), chunk_size):
+                turns += ArchiveDAO.archive_sessions(db, session_ids[start:start + chunk_size], cutoff_chat_id, codec)
+                if pause:
+                    time.sleep(pause)
+            return {"sessions": len(session_ids), "turns": turns}
+        except Exception as e:
+            logger.error(f"Error archiving idle sessions: {str(e)}", event_type='archive_idle_sessions_error')
+            raise Exception(str(e))
+        finally:
+            db.close()
+
+    @staticmethod
+    def reclaim_space(engine, vacuum: bool = False) -> str:
+        """
+        Return the pages freed by archival to the file system. Databases in incremental auto_vacuum mode are
+        shrunk in place. Otherwise nothing is reclaimed (freed pages are reused by new rows) unless a full VACUUM
+        is requested; it rewrites the file, blocking writers while it runs, and switches the database to
+        incremental auto_vacuum mode, so later archival runs shrink it in place.
+
+        Args:
+            engine (Engine): The engine of the archived database.
+            vacuum (bool): Allow a full VACUUM.
+
+        Returns:
+            str: The reclaim method used ('incremental_vacuum', 'vacuum' or 'none').
+        """
+        connection = engine.raw_connection()
+        try:
+            # VACUUM cannot run inside a transaction; the driver connection has none open between statements
+            driver_connection = connection.driver_connection
+            auto_vacuum = driver_connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+                driver_connection.execute("PRAGMA incremental_vacuum").fetchall()
+                method = 'incremental_vacuum'
+            elif vacuum:
+                # Changing auto_vacuum from NONE only takes effect with the next VACUUM
+                driver_connection.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+                driver_connection.execute("VACUUM")
+                method = 'vacuum'
+            else:
+                method = 'none'
+            logger.info(f"Space reclaimed after archival using: {method}.", event_type='archive_space_reclaimed')
+            return method
+        finally:
+            connection.close()
@@ -1,5 +1,8 @@
+from datetime import datetime
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.chatWithLearner.models import ChatHistory, LearningGoals, SessionDetails
+from app.chatWithLearner.models import ChatHistory, LearningGoals, SessionDetails, DeferredChatTurn
+from app.archive.dao import ArchiveDAO
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
@@ -36,6 +39,27 @@ class ChatDAO:
             logger.error(f"Error fetching session with ID {session_id}: {str(e)}", event_type='session_fetch_error')
             raise Exception(f"Error fetching session: {str(e)}")
 
+    @staticmethod
+    def session_exists(db: Session, session_id: int) -> bool:
+        """
+        Check whether a session exists without loading it.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session to check.
+        
+        Returns:
+            bool: True if the session exists.
+        
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            return db.execute(select(SessionDetails.id).where(SessionDetails.id == session_id)).first() is not None
+        except Exception as e:
+            logger.error(f"Error checking session with ID {session_id}: {str(e)}", event_type='session_fetch_error')
+            raise Exception(f"Error checking session: {str(e)}")
+
     @staticmethod
     def get_learning_goal_by_session(db: Session, session_id: int):
         """
@@ -70,7 +94,7 @@ class ChatDAO:
     @staticmethod
     def get_recent_chat_history(db: Session, session_id: int, limit: int):
         """
-        Get the last 'limit' number of chat interactions for a session.
+        Get the last 'limit' number of chat interactions for a session, including archived interactions.
         
         Args:
             db (Session): Database session for executing queries.
@@ -78,7 +102,7 @@ class ChatDAO:
             limit (int): The number of recent chat messages to retrieve.
         
         Returns:
-            list: A list of ChatHistory objects.
+            list: A list of ChatHistory (or ArchivedChat) objects, newest first.
         
         Raises:
             Exception: If the chat history fetch fails.
@@ -91,6 +115,10 @@ class ChatDAO:
                 .limit(limit)
                 .all()
             )
+            if len(chat_history) < limit:
+                # Older turns of an archived (and possibly resumed) session live in the archive
+                archived = ArchiveDAO.fetch_archived_chat_history(db, session_id)
+                chat_history += archived[::-1][:limit - len(chat_history)]
             if not chat_history:
                 logger.warning(f"No chat history found for session ID {session_id}.", event_type='no_chat_history')
             logger.info(f"Recent chat history fetched successfully for session ID {session_id}.", event_type='chat_history_fetched')
@@ -100,29 +128,259 @@ class ChatDAO:
             raise Exception(f"Error fetching chat history: {str(e)}")
 
     @staticmethod
-    def store_chat_history(db: Session, session_id: int, ai_response: str, learner_response: str):
+    def store_chat_history(db: Session, session_id: int, ai_response: str, learner_response: str,
+                           student_current_level: str = None, deferred_turn_id: int = None, llm_latency_ms: int = None,
+                           answer_verdict: str = None, ability=None):
         """
-        Store a new chat entry in the database.
+        Store a new chat entry in the database and record it as the session's last activity, optionally
+        updating the session's current level and ability estimate and removing the deferred turn it answers
+        in the same transaction.
         
         Args:
             db (Session): Database session for executing queries.
             session_id (int): The ID of the session for which the chat history is stored.
             ai_response (str): The AI-generated response to be stored.
             learner_response (str): The learner's response to be stored.
+            student_current_level (str, optional): The learner's new difficulty level.
+            deferred_turn_id (int, optional): The ID of the deferred turn this entry answers.
+            llm_latency_ms (int, optional): How long the model took to generate `ai_response`, in milliseconds.
+            answer_verdict (str, optional): The tutor's verdict on `learner_response`.
+            ability (SessionAbility, optional): The session's ability estimate updated with the verdict.
         
+        Returns:
+            int: The ID of the stored chat entry.
+
         Raises:
             Exception: If the chat entry cannot be stored.
         """
         try:
+            now = datetime.utcnow()
             chat_entry = ChatHistory(
                 session_id=session_id,
                 llm_response=ai_response,
-                learner_response=learner_response
+                learner_response=learner_response,
+                created_at=now,
+                llm_latency_ms=llm_latency_ms,
+                answer_verdict=answer_verdict
             )
             db.add(chat_entry)
+            if ability is not None:
+                db.add(ability)
+            session_update = {SessionDetails.last_activity_at: now}
+            if student_current_level:
+                session_update[SessionDetails.student_current_level] = student_current_level
+            db.query(SessionDetails).filter(SessionDetails.id == session_id).update(session_update)
+            if deferred_turn_id is not None:
+                db.query(DeferredChatTurn).filter(DeferredChatTurn.id == deferred_turn_id).delete()
             db.commit()
             db.refresh(chat_entry)
             logger.info(f"Chat history stored successfully for session ID {session_id}.", event_type='chat_history_stored')
+            return chat_entry.id
         except Exception as e:
+            db.rollback()
             logger.error(f"Error storing chat history for session ID {session_id}: {str(e)}", event_type='chat_history_store_error')
-            raise Exception(f"Error storing chat history: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error storing chat history: {str(e)}")
+
+    @staticmethod
+    def get_chat_history_page(db: Session, session_id: int, after_id: int = None, limit: int = 50):
+        """
+        Get one page of a session's chat history in chronological order using keyset pagination on ChatHistory.id.
+        Archived turns are served first, from the session's archive.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session for which chat history is fetched.
+            after_id (int, optional): Only return entries with an ID greater than this cursor.
+            limit (int): The maximum number of entries to return.
+        
+        Returns:
+            tuple: (list of (id, learner_response, llm_response) rows, whether more entries follow).
+        
+        Raises:
+            Exception: If the chat history fetch fails.
+        """
+        try:
+            # Archived turns precede all hot turns of a session
+            rows = ArchiveDAO.fetch_archived_chat_history(db, session_id, after_id)[:limit + 1]
+            if len(rows) <= limit:
+                query = (
+                    select(ChatHistory.id, ChatHistory.learner_response, ChatHistory.llm_response)
+                    .where(ChatHistory.session_id == session_id)
+                    .order_by(ChatHistory.id)
+                    .limit(limit + 1 - len(rows))
+                )
+                if after_id is not None:
+                    query = query.where(ChatHistory.id > after_id)
+                rows += db.execute(query).all()
+            logger.info(f"Chat history page fetched successfully for session ID {session_id}.", event_type='chat_history_page_fetched')
+            return rows[:limit], len(rows) > limit
+        except Exception as e:
+            logger.error(f"Error fetching chat history page for session ID {session_id}: {str(e)}", event_type='chat_history_fetch_error')
+            raise Exception(f"Error fetching chat history: {str(e)}")
+
+    @staticmethod
+    def stream_chat_history(db: Session, session_id: int, batch_size: int = 500, after_id: int = None):
+        """
+        Stream a session's chat history in chronological order.
+        Archived turns come first. Hot rows are fetched from the cursor in batches of 'batch_size' so memory use
+        does not grow with the transcript.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session for which chat history is streamed.
+            batch_size (int): The number of rows buffered per fetch.
+            after_id (int, optional): Only stream entries with an ID greater than this cursor.
+        
+        Yields:
+            Row: (id, learner_response, llm_response) rows.
+        
+        Raises:
+            Exception: If the chat history stream fails.
+        """
+        try:
+            for chat in ArchiveDAO.fetch_archived_chat_history(db, session_id, after_id):
+                yield chat
+            query = (
+                select(ChatHistory.id, ChatHistory.learner_response, ChatHistory.llm_response)
+                .where(ChatHistory.session_id == session_id)
+                .order_by(ChatHistory.id)
+                .execution_options(yield_per=batch_size)
+            )
+            if after_id is not None:
+                query = query.where(ChatHistory.id > after_id)
+            for row in db.execute(query):
+                yield row
+            logger.info(f"Chat history streamed successfully for session ID {session_id}.", event_type='chat_history_streamed')
+        except Exception as e:
+            logger.error(f"Error streaming chat history for session ID {session_id}: {str(e)}", event_type='chat_history_stream_error')
+            raise Exception(f"Error streaming chat history: {str(e)}")
+
+    @staticmethod
+    def has_deferred_turns(db: Session, session_id: int) -> bool:
+        """
+        Check whether a session has learner turns waiting for the AI service.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session to check.
+        
+        Returns:
+            bool: True if the session has deferred turns.
+        
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            return db.execute(
+                select(DeferredChatTurn.id).where(DeferredChatTurn.session_id == session_id).limit(1)
+            ).first() is not None
+        except Exception as e:
+            logger.error(f"Error checking deferred turns for session ID {session_id}: {str(e)}", event_type='deferred_turn_fetch_error')
+            raise Exception(f"Error checking deferred turns: {str(e)}")
+
+    @staticmethod
+    def store_deferred_turn(db: Session, session_id: int, learner_response: str) -> int:
+        """
+        Queue a learner turn to be answered once the AI service is available again.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            learner_response (str): The learner's response.
+        
+        Returns:
+            int: The ID of the deferred turn.
+        
+        Raises:
+            Exception: If the turn cannot be stored.
+        """
+        try:
+            deferred_turn = DeferredChatTurn(session_id=session_id, learner_response=learner_response)
+            db.add(deferred_turn)
+            db.commit()
+            logger.info(f"Chat turn deferred for session ID {session_id}.", event_type='deferred_turn_stored')
+            return deferred_turn.id
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error deferring chat turn for session ID {session_id}: {str(e)}", event_type='deferred_turn_store_error')
+            raise Exception(f"Error deferring chat turn: {str(e)}")
+
+    @staticmethod
+    def get_next_deferred_turn(db: Session, session_id: int):
+        """
+        Get a session's oldest deferred turn.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+        
+        Returns:
+            DeferredChatTurn: The oldest deferred turn, or None if there is none.
+        
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            return (
+                db.query(DeferredChatTurn)
+                .filter(DeferredChatTurn.session_id == session_id)
+                .order_by(DeferredChatTurn.id)
+                .first()
+            )
+        except Exception as e:
+            logger.error(f"Error fetching deferred turns for session ID {session_id}: {str(e)}", event_type='deferred_turn_fetch_error')
+            raise Exception(f"Error fetching deferred turns: {str(e)}")
+
+    @staticmethod
+    def get_deferred_session_ids(db: Session) -> list:
+        """
+        Get the sessions with learner turns waiting for the AI service, as a scan of the session_id index.
+        
+        Args:
+            db (Session): Database session for executing queries.
+        
+        Returns:
+            list: The session IDs in ascending order.
+        
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            return db.execute(
+                select(DeferredChatTurn.session_id).distinct().order_by(DeferredChatTurn.session_id)
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error fetching the sessions with deferred turns: {str(e)}", event_type='deferred_turn_fetch_error')
+            raise Exception(f"Error fetching deferred turns: {str(e)}")
+
+    @staticmethod
+    def record_deferred_turn_failure(db: Session, deferred_turn_id: int, max_attempts: int) -> bool:
+        """
+        Count a failed attempt to answer a deferred turn, dropping the turn after `max_attempts`
+        so it does not hold back the session's later turns forever.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            deferred_turn_id (int): The ID of the deferred turn.
+            max_attempts (int): Attempts after which the turn is dropped.
+        
+        Returns:
+            bool: True if the turn was dropped.
+        
+        Raises:
+            Exception: If the attempt cannot be recorded.
+        """
+        try:
+            deferred_turn = db.query(DeferredChatTurn).filter(DeferredChatTurn.id == deferred_turn_id).first()
+            if deferred_turn is None:
+                return False
+            deferred_turn.attempts += 1
+            dropped = deferred_turn.attempts >= max_attempts
+            if dropped:
+                db.delete(deferred_turn)
+            db.commit()
+            return dropped
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error updating deferred turn {deferred_turn_id}: {str(e)}", event_type='deferred_turn_store_error')
+            raise Exception(f"Error updating deferred turn: {str(e)}")
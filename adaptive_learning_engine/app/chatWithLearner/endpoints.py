@@ -1,13 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException
+import os
+import time
+import asyncio
+import threading
+from typing import Optional
+from anyio import from_thread
+from fastapi import FastAPI, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.chatWithLearner.schemas import ChatRequest, ChatResponse
-from app.chatWithLearner.services import ChatService
+from app.core.database import get_db, open_session, UnknownTenant
+from app.core.contextvar import request_deadline_context
+from app.core.deadline import REQUEST_TIMEOUT_SECONDS
+from app.chatWithLearner.schemas import ChatRequest, ChatResponse, ChatHistoryPage, LiveChatMessage
+from app.chatWithLearner.dao import ChatDAO
+from app.chatWithLearner.services import ChatService, LiveChatSession
 from app.chatWithLearner.router import chat
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
 
+# WebSocket chats that send no learner turn for this many seconds are closed
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv('WS_IDLE_TIMEOUT_SECONDS', '300'))
+
+# A client that does not take a tutor message chunk within this many seconds is disconnected
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv('WS_SEND_TIMEOUT_SECONDS', '10'))
+
 app = FastAPI()
 
 @chat.post("/chat-with-gpt", response_model=ChatResponse)
@@ -41,4 +59,181 @@ def chat_with_gpt(chat_request: ChatRequest, db: Session = Depends(get_db)):
     
     except Exception as e:
         logger.error(f"Error in chat_with_gpt for session ID {chat_request.session_id}: {str(e)}", event_type='chat_endpoint_error')
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@chat.get("/session/{session_id}/chat-history", response_model=ChatHistoryPage)
+def get_chat_history(session_id: int, after_id: Optional[int] = None, limit: int = Query(50, ge=1, le=500),
+                     db: Session = Depends(get_db)):
+    """
+    Endpoint to read a session's chat history page by page, oldest first.
+    Pass the returned 'next_cursor' as 'after_id' to fetch the following page.
+
+    Args:
+        session_id (int): The ID of the chat session.
+        after_id (int, optional): Keyset cursor; only entries with a greater ID are returned.
+        limit (int): The maximum number of entries per page.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        ChatHistoryPage: The page of chat entries and the cursor for the next page.
+
+    Raises:
+        HTTPException: If the session is not found or the history cannot be read.
+    """
+    try:
+        page = ChatService.get_chat_history_page(db, session_id, after_id, limit)
+        if page is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return page
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_chat_history for session ID {session_id}: {str(e)}", event_type='chat_history_endpoint_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@chat.get("/session/{session_id}/chat-history/export")
+def export_chat_history(session_id: int, after_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Endpoint to export a session's complete chat history as NDJSON (application/x-ndjson).
+    Entries are streamed from a server-side cursor, so memory use stays flat regardless of transcript length.
+
+    Args:
+        session_id (int): The ID of the chat session.
+        after_id (int, optional): ID of the last entry received, to resume an interrupted export.
+        db (Session): Database session dependency to interact with the database.
+
+    Returns:
+        StreamingResponse: One JSON-encoded chat entry per line, oldest first.
+
+    Raises:
+        HTTPException: If the session is not found or the export cannot be started.
+    """
+    try:
+        if not ChatDAO.session_exists(db, session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        return StreamingResponse(ChatService.export_chat_history(session_id, after_id=after_id), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in export_chat_history for session ID {session_id}: {str(e)}", event_type='chat_history_endpoint_error')
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def load_live_chat(session_id: int) -> LiveChatSession:
+    """
+    Load a WebSocket chat's session context with a short-lived database session,
+    so open connections do not hold database sessions between turns.
+    """
+    db = open_session()
+    try:
+        return ChatService.open_live_chat(db, session_id)
+    finally:
+        db.close()
+
+def run_live_turn(live_chat: LiveChatSession, learner_response: str, send_text) -> ChatResponse:
+    """
+    Run one WebSocket chat turn in a worker thread with its own database session.
+    """
+    db = open_session()
+    try:
+        return ChatService.stream_live_turn(db, live_chat, learner_response, send_text)
+    finally:
+        db.close()
+
+@chat.websocket("/ws/session/{session_id}/chat")
+async def chat_websocket(websocket: WebSocket, session_id: int):
+    """
+    WebSocket chat bound to one session. The session context is loaded once per connection,
+    and the tutor's message is streamed while the model generates it.
+
+    Protocol:
+        - On connect: {"type": "session", "session_id", "learning_goal", "student_current_level"}
+        - Client sends: {"learner_response": "..."}, one turn at a time.
+        - Server sends: {"type": "token", "text": "..."} per piece of the tutor's message, then
+          {"type": "turn", ...ChatResponse fields}, or {"type": "error", "detail": "..."} if the turn failed.
+
+    Binary frames are rejected by closing the connection with code 1003.
+
+    Turns are read one at a time, so a client sending faster than the tutor answers is held back by the
+    socket. Connections idle for WS_IDLE_TIMEOUT_SECONDS are closed; a client that does not read its
+    messages within WS_SEND_TIMEOUT_SECONDS is disconnected and the turn is not stored.
+
+    Args:
+        websocket (WebSocket): The WebSocket connection.
+        session_id (int): The ID of the chat session.
+    """
+    try:
+        live_chat = await run_in_threadpool(load_live_chat, session_id)
+    except UnknownTenant:
+        await websocket.close(code=1008, reason="Unknown tenant")
+        return
+    except Exception as e:
+        logger.error(f"Error in chat_websocket for session ID {session_id}: {str(e)}", event_type='chat_endpoint_error')
+        await websocket.close(code=1011, reason="Internal server error")
+        return
+    if live_chat is None:
+        await websocket.close(code=1008, reason="Session not found")
+        return
+
+    await websocket.accept()
+    await websocket.send_json({
+        "type": "session",
+        "session_id": session_id,
+        "learning_goal": live_chat.learning_goal_name,
+        "student_current_level": live_chat.level
+    })
+    logger.info(f"WebSocket chat opened for session ID {session_id}", event_type='live_chat_opened')
+
+    try:
+        while True:
+            try:
+                received = await asyncio.wait_for(websocket.receive(), WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.info(f"Closing idle WebSocket chat for session ID {session_id}", event_type='live_chat_idle')
+                await websocket.close(code=1000, reason="Idle timeout")
+                return
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            text = received.get("text")
+            if text is None:
+                logger.warning(f"WebSocket chat client for session ID {session_id} sent a binary frame, disconnecting.", event_type='live_chat_unsupported_frame')
+                await websocket.close(code=1003, reason="Only text frames are supported")
+                return
+            try:
+                message = LiveChatMessage.model_validate_json(text)
+            except ValidationError:
+                await websocket.send_json({"type": "error", "detail": 'Expected {"learner_response": "..."}'})
+                continue
+
+            # Each turn gets the budget of an HTTP request; a client that stops reading cancels it
+            context = {'deadline': time.monotonic() + REQUEST_TIMEOUT_SECONDS, 'cancelled': threading.Event(), 'expired': False}
+
+            async def send_token(text: str):
+                try:
+                    await asyncio.wait_for(websocket.send_json({"type": "token", "text": text}), WS_SEND_TIMEOUT_SECONDS)
+                except BaseException as e:
+                    context['send_error'] = e
+                    context['cancelled'].set()
+                    raise
+
+            token = request_deadline_context.set(context)
+            try:
+                response = await run_in_threadpool(
+                    run_live_turn, live_chat, message.learner_response, lambda text: from_thread.run(send_token, text)
+                )
+            except Exception as e:
+                send_error = context.get('send_error')
+                if send_error is not None and not isinstance(send_error, asyncio.TimeoutError):
+                    # The client went away mid-turn
+                    raise WebSocketDisconnect()
+                if send_error is not None:
+                    logger.warning(f"WebSocket chat client for session ID {session_id} stopped reading, disconnecting.", event_type='live_chat_slow_client')
+                    await websocket.close(code=1008, reason="Client too slow")
+                    return
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            finally:
+                request_deadline_context.reset(token)
+            await websocket.send_json({"type": "turn", **response.model_dump()})
+    except WebSocketDisconnect:
+        pass
+    logger.info(f"WebSocket chat closed for session ID {session_id}", event_type='live_chat_closed')
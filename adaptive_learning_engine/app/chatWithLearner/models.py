@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -33,6 +34,9 @@ class SessionDetails(Base):
         learning_goal_id (int): Foreign key linking to LearningGoals.
         student_initial_level (str): The student's initial skill level.
         student_current_level (str): The student's current skill level.
+        created_at (datetime): When the session was created. None for sessions older than the column.
+        last_activity_at (datetime): When the session was created or last had a chat turn stored.
+            None for sessions without activity since the column was added.
 
     Relationships:
         learning_goal (LearningGoals): Many-to-one relationship with LearningGoals.
@@ -44,6 +48,9 @@ class SessionDetails(Base):
     learning_goal_id = Column(Integer, ForeignKey('learning_goals.id'), nullable=False)
     student_initial_level = Column(String, nullable=False)
     student_current_level = Column(String, nullable=False)
+    # Nullable, since the columns are added to existing databases without backfilling them
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    last_activity_at = Column(DateTime, nullable=True, default=datetime.utcnow)
 
     # Relationship to LearningGoals
     learning_goal = relationship("LearningGoals", back_populates="session_details")
@@ -60,6 +67,11 @@ class ChatHistory(Base):
         session_id (int): Foreign key linking to SessionDetails.
         llm_response (str): The response generated by the language model.
         learner_response (str): The response provided by the learner.
+        created_at (datetime): When the turn was stored. None for turns older than the column.
+        llm_latency_ms (int): How long the model took to generate the response, in milliseconds.
+            None when the response did not come from the model.
+        answer_verdict (str): The tutor's verdict on `learner_response` (see ANSWER_VERDICTS).
+            None for turns older than the column.
 
     Relationships:
         session (SessionDetails): Many-to-one relationship with SessionDetails.
@@ -70,6 +82,30 @@ class ChatHistory(Base):
     session_id = Column(Integer, ForeignKey('session_details.id'), nullable=False)
     llm_response = Column(String, nullable=False)
     learner_response = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    llm_latency_ms = Column(Integer, nullable=True)
+    answer_verdict = Column(String, nullable=True)
 
     # Relationship to SessionDetails
-    session = relationship("SessionDetails", back_populates="chat_histories")
\ No newline at end of file
+    session = relationship("SessionDetails", back_populates="chat_histories")
+
+
+class DeferredChatTurn(Base):
+    """
+    Represents a learner turn received while the AI service was unavailable, answered in the background
+    once it recovers. Later turns of the session are queued behind it to keep the transcript in order.
+
+    Attributes:
+        id (int): The primary key, auto-incremented; turns are answered in ID order.
+        session_id (int): Foreign key linking to SessionDetails.
+        learner_response (str): The learner's response waiting for the tutor.
+        attempts (int): Failed attempts to answer the turn so far.
+        created_at (datetime): When the turn was received.
+    """
+    __tablename__ = 'deferred_chat_turns'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey('session_details.id'), nullable=False, index=True)
+    learner_response = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
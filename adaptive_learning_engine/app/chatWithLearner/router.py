@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from app.core.constants import error_responses
+from app.core.profiling import ProfiledRoute
 
 chat = APIRouter(tags=["chat"],
-                 responses=error_responses
+                 responses=error_responses,
+                 route_class=ProfiledRoute
                  )
\ No newline at end of file
@@ -1,10 +1,56 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, field_validator
+from app.core.constants import STUDENT_LEVELS, ANSWER_VERDICTS
 
 class ChatRequest(BaseModel):
     session_id: int
     learner_response: str
 
+class LiveChatMessage(BaseModel):
+    """
+    A learner turn sent over the WebSocket chat.
+    """
+    learner_response: str
+
 class ChatResponse(BaseModel):
     session_id: int
     learner_input: str
     ai_response: str
+    answer_verdict: Optional[str] = None
+    student_current_level: Optional[str] = None
+    # True when the AI service was unavailable: a cached overview, or a placeholder for a deferred turn
+    degraded: bool = False
+
+class TutorTurn(BaseModel):
+    """
+    Structured JSON returned by the tutor model for one chat turn.
+    Unknown verdicts become 'not_applicable' and unknown levels become None (level unchanged).
+    """
+    tutor_message: str
+    answer_verdict: str = "not_applicable"
+    difficulty_level: Optional[str] = None
+
+    @field_validator("answer_verdict", mode="before")
+    @classmethod
+    def normalize_verdict(cls, value):
+        verdict = str(value or "").strip().lower().replace(" ", "_").replace("-", "_")
+        return verdict if verdict in ANSWER_VERDICTS else "not_applicable"
+
+    @field_validator("difficulty_level", mode="before")
+    @classmethod
+    def normalize_level(cls, value):
+        level = str(value or "").strip().lower()
+        return level if level in STUDENT_LEVELS else None
+
+class ChatHistoryEntry(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    learner_response: str
+    llm_response: str
+
+class ChatHistoryPage(BaseModel):
+    session_id: int
+    items: List[ChatHistoryEntry]
+    next_cursor: Optional[int] = None
+    has_more: bool
@@ -1,13 +1,94 @@
 import os
+import json
+import time
+import heapq
+import itertools
+import threading
 from sqlalchemy.orm import Session
 from openai import AzureOpenAI
 from app.chatWithLearner.dao import ChatDAO
-from app.chatWithLearner.schemas import ChatRequest, ChatResponse
+from app.chatWithLearner.schemas import ChatRequest, ChatResponse, ChatHistoryEntry, ChatHistoryPage, TutorTurn
+from app.summary.dao import SummaryDAO
+from app.summary.services import RECENT_TURNS, SUMMARY_BATCH_TURNS, get_summary_worker
+from app.ability.services import AbilityService, ABILITY_LEVELS_ENABLED
+from app.core.database import open_session, SessionLocal, get_engine
+from app.core.contextvar import tenant_context
+from app.core.deadline import check_deadline
 from app.core.open_ai_service import OpenAIService
+from app.core.circuit_breaker import LLMUnavailable, get_circuit_breaker
+from app.core.cache import get_cache, cache_key
+from app.core.json_stream import JSONStringFieldStream
+from app.core.model_router import TASK_CHAT_OVERVIEW, TASK_CHAT_TURN
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
 
+SYSTEM_PROMPT = "You are an educational AI tutor."
+
+# Reply to a learner turn received while the AI service is unavailable; the tutor's answer follows in the chat history
+DEFERRED_TURN_MESSAGE = "Our tutor is temporarily unavailable. We have saved your answer and will get back to you shortly in this chat."
+
+# How long the overview of a learning goal and level is kept to answer first turns during AI service outages, in seconds
+CHAT_OVERVIEW_CACHE_TTL_SECONDS = float(os.getenv('CHAT_OVERVIEW_CACHE_TTL_SECONDS', '604800'))
+
+# Failed attempts after which a deferred turn is dropped, and seconds between attempts
+DEFERRED_TURN_MAX_ATTEMPTS = int(os.getenv('DEFERRED_TURN_MAX_ATTEMPTS', '5'))
+DEFERRED_TURN_RETRY_SECONDS = float(os.getenv('DEFERRED_TURN_RETRY_SECONDS', '10'))
+
+
+class LiveChatSession:
+    """
+    Session context kept by a WebSocket chat connection between turns, so a turn does not
+    re-read the session, learning goal and chat history like a `/chat-with-gpt` request does.
+
+    Attributes:
+        session_id (int): The ID of the session.
+        learning_goal_id (int): The ID of the session's learning goal.
+        learning_goal_name (str): The session's learning goal.
+        initial_level (str): The learner's initial difficulty level.
+        level (str): The learner's current difficulty level.
+        summary (str): The session's rolling summary, or None.
+        summarized_through_id (int): The latest ChatHistory ID covered by the summary.
+        chat_history (list): The turns not covered by the summary plus the last RECENT_TURNS, newest first.
+        deferred (bool): Whether turns of this connection were deferred, so the context must be reloaded
+            once they have been answered in the background.
+    """
+
+    def __init__(self, session_id: int, learning_goal_id: int, learning_goal_name: str, initial_level: str, level: str,
+                 summary, chat_history: list):
+        self.session_id = session_id
+        self.learning_goal_id = learning_goal_id
+        self.learning_goal_name = learning_goal_name
+        self.initial_level = initial_level
+        self.level = level
+        self.chat_history = chat_history
+        self.deferred = False
+        self.set_summary(summary)
+
+    def reload(self, db: Session):
+        """
+        Re-read the level, summary and recent turns, after turns were answered outside this connection.
+        """
+        self.level = ChatDAO.get_session_by_id(db, self.session_id).student_current_level
+        self.chat_history = ChatDAO.get_recent_chat_history(db, self.session_id, limit=RECENT_TURNS + SUMMARY_BATCH_TURNS)
+        self.set_summary(SummaryDAO.get_summary(db, self.session_id))
+        self.deferred = False
+
+    def set_summary(self, summary):
+        """
+        Take over the session's latest summary and drop the turns it covers, except the last RECENT_TURNS.
+        """
+        self.summary = summary.summary if summary else None
+        self.summarized_through_id = summary.summarized_through_id if summary else 0
+        self.chat_history = ChatService.select_context_turns(summary, self.chat_history)
+
+    def unsummarized_turns(self) -> int:
+        """
+        Return the number of kept turns the summary does not cover.
+        """
+        return sum(1 for entry in self.chat_history if entry.id > self.summarized_through_id)
+
+
 class ChatService:
     """
     Service class for handling chat interactions with the learner. 
@@ -23,6 +104,10 @@ class ChatService:
             db (Session): Database session for executing queries.
             chat_request (ChatRequest): The chat request containing session ID and learner's input.
 
+        While the AI service is unavailable, a first turn is answered with the cached overview of the learning
+        goal and level; other turns are deferred and answered in the background once the service recovers.
+        Both are flagged as degraded.
+
         Returns:
             ChatResponse: AI-generated response to the learner's input.
 
@@ -44,33 +129,434 @@ class ChatService:
                 logger.error("Learning goal not found.", event_type='learning_goal_not_found')
                 raise Exception("Learning goal not found for this session.")
 
-            # Retrieve last 3 chat history messages for context
-            chat_history = ChatDAO.get_recent_chat_history(db, chat_request.session_id, limit=3)
+            # Answering now would put this turn before the ones still waiting for the AI service
+            if ChatDAO.has_deferred_turns(db, session.id):
+                return ChatService.defer_turn(db, session.id, session.student_current_level, chat_request.learner_response)
+
+            overview_key = cache_key('chat_overview', session.learning_goal_id, session.student_current_level)
+            degraded = False
+            try:
+                tutor_turn, task_type, llm_latency_ms = ChatService.generate_tutor_turn(
+                    db, session, learning_goal.learning_goal_names, chat_request.learner_response
+                )
+            except LLMUnavailable:
+                # Without the AI service only a first turn can be answered, with the cached overview
+                overview = get_cache().get(overview_key)
+                if overview is None or ChatDAO.get_recent_chat_history(db, session.id, limit=1):
+                    return ChatService.defer_turn(db, session.id, session.student_current_level, chat_request.learner_response)
+                logger.warning(f"AI service unavailable, answering session ID {session.id} with the cached overview.", event_type='chat_degraded')
+                tutor_turn, task_type, llm_latency_ms, degraded = TutorTurn(tutor_message=overview), TASK_CHAT_OVERVIEW, None, True
+
+            # Do not record a turn the learner never received
+            check_deadline()
+
+            new_level, ability = ChatService.next_level(
+                db, session.id, session.learning_goal_id, session.student_initial_level, session.student_current_level,
+                tutor_turn
+            )
+
+            # Store chat history, the learner's ability and new level in the database in one transaction
+            ChatDAO.store_chat_history(
+                db, session.id, tutor_turn.tutor_message, chat_request.learner_response, new_level,
+                llm_latency_ms=llm_latency_ms, answer_verdict=tutor_turn.answer_verdict, ability=ability
+            )
+
+            if task_type == TASK_CHAT_OVERVIEW and not degraded:
+                get_cache().set(overview_key, tutor_turn.tutor_message, CHAT_OVERVIEW_CACHE_TTL_SECONDS)
+
+            # Fold older turns into the summary off the request path
+            get_summary_worker().enqueue(session.id)
+
+            logger.info("Chat successfully processed.", event_type='chat_success')
+
+            # Return response to the user
+            return ChatResponse(
+                session_id=session.id,
+                learner_input=chat_request.learner_response,
+                ai_response=tutor_turn.tutor_message,
+                answer_verdict=tutor_turn.answer_verdict,
+                student_current_level=new_level or session.student_current_level,
+                degraded=degraded
+            )
+
+        except Exception as e:
+            logger.error(f"Error processing chat: {str(e)}", event_type='chat_processing_error')
+            raise Exception(str(e))
+
+    @staticmethod
+    def generate_tutor_turn(db: Session, session, learning_goal_name: str, learner_response: str) -> tuple:
+        """
+        Ask the tutor model for its reply to a learner turn.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session (SessionDetails): The session.
+            learning_goal_name (str): The session's learning goal.
+            learner_response (str): The learner's input.
+
+        Returns:
+            tuple: The validated TutorTurn, the task type of the call and the model's latency in milliseconds.
+
+        Raises:
+            LLMUnavailable: If the AI service is unavailable.
+        """
+        # Older turns are condensed into the session's rolling summary; the turns it does not cover yet
+        # (at least the last RECENT_TURNS, at most the summarizer's batch on top) are included verbatim
+        summary = SummaryDAO.get_summary(db, session.id)
+        chat_history = ChatDAO.get_recent_chat_history(db, session.id, limit=RECENT_TURNS + SUMMARY_BATCH_TURNS)
+        chat_history = ChatService.select_context_turns(summary, chat_history)
+
+        user_prompt = ChatService.build_tutor_prompt(
+            learning_goal_name,
+            session.student_current_level,
+            summary.summary if summary else None,
+            chat_history,
+            learner_response,
+            ChatService.next_levels(db, session.id, session.learning_goal_id, session.student_initial_level, session.student_current_level)
+        )
+
+        openai_service = OpenAIService()
+        # A first turn only needs a topic overview; later turns validate answers
+        task_type = TASK_CHAT_TURN if chat_history else TASK_CHAT_OVERVIEW
+        started = time.perf_counter()
+        ai_response = openai_service.generate_response_json(SYSTEM_PROMPT, user_prompt, task_type)
+        llm_latency_ms = round((time.perf_counter() - started) * 1000)
+        return TutorTurn.model_validate_json(ai_response), task_type, llm_latency_ms
+
+    @staticmethod
+    def next_levels(db: Session, session_id: int, learning_goal_id: int, initial_level: str, level: str):
+        """
+        Work out, before the tutor model is called, the level `next_level` will store for each verdict,
+        so the tutor can ask its next question at that level.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            learning_goal_id (int): The ID of the session's learning goal.
+            initial_level (str): The learner's initial difficulty level.
+            level (str): The learner's current difficulty level.
+
+        Returns:
+            dict: The level for each judged verdict, or None when ABILITY_LEVELS_ENABLED is off.
+        """
+        if not ABILITY_LEVELS_ENABLED:
+            return None
+        return AbilityService.next_levels(db, session_id, learning_goal_id, initial_level, level)
+
+    @staticmethod
+    def next_level(db: Session, session_id: int, learning_goal_id: int, initial_level: str, level: str,
+                   tutor_turn: TutorTurn) -> tuple:
+        """
+        Update the learner's ability estimate with the tutor's verdict and work out the level of the next question:
+        the level the estimate maps to, or the level chosen by the tutor model when ABILITY_LEVELS_ENABLED is off.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            learning_goal_id (int): The ID of the session's learning goal.
+            initial_level (str): The learner's initial difficulty level, which a first estimate starts from.
+            level (str): The learner's current difficulty level.
+            tutor_turn (TutorTurn): The tutor's reply to the learner's answer.
+
+        Returns:
+            tuple: The new level (None when unchanged) and the updated SessionAbility to store with the turn
+            (None when the answer was not judged).
+        """
+        ability, new_level = AbilityService.estimate_turn(
+            db, session_id, learning_goal_id, initial_level, level, tutor_turn.answer_verdict
+        )
+        if not ABILITY_LEVELS_ENABLED:
+            new_level = tutor_turn.difficulty_level
+        return (new_level if new_level != level else None), ability
+
+    @staticmethod
+    def defer_turn(db: Session, session_id: int, level: str, learner_response: str) -> ChatResponse:
+        """
+        Queue a learner turn for the background worker and tell the learner the answer will follow.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            level (str): The learner's current difficulty level.
+            learner_response (str): The learner's input.
+
+        Returns:
+            ChatResponse: The degraded placeholder response.
+        """
+        ChatDAO.store_deferred_turn(db, session_id, learner_response)
+        get_deferred_turn_worker().enqueue(session_id)
+        logger.warning(f"Chat turn for session ID {session_id} deferred until the AI service is available.", event_type='chat_deferred')
+        return ChatResponse(
+            session_id=session_id,
+            learner_input=learner_response,
+            ai_response=DEFERRED_TURN_MESSAGE,
+            student_current_level=level,
+            degraded=True
+        )
+
+    @staticmethod
+    def answer_deferred_turns(db: Session, session_id: int) -> bool:
+        """
+        Answer a session's deferred turns in order and store them as regular chat turns.
+
+        Every failure to answer a turn is counted against it, and the turn is dropped after
+        DEFERRED_TURN_MAX_ATTEMPTS attempts so that it does not hold back the session's later turns.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+
+        Returns:
+            bool: True if no deferred turn is left, False if a turn failed and is kept for another attempt.
+
+        Raises:
+            LLMUnavailable: If the AI service is unavailable again; the remaining turns stay queued.
+            Exception: If the deferred turns cannot be read or a failure cannot be recorded.
+        """
+        while True:
+            deferred_turn = ChatDAO.get_next_deferred_turn(db, session_id)
+            if deferred_turn is None:
+                return True
+            deferred_turn_id = deferred_turn.id
+            try:
+                session = ChatDAO.get_session_by_id(db, session_id)
+                if session is None:
+                    raise Exception("Session not found.")
+                learning_goal = ChatDAO.get_learning_goal_by_session(db, session_id)
+                if learning_goal is None:
+                    raise Exception("Learning goal not found for the session.")
+                tutor_turn, _, llm_latency_ms = ChatService.generate_tutor_turn(
+                    db, session, learning_goal.learning_goal_names, deferred_turn.learner_response
+                )
+                new_level, ability = ChatService.next_level(
+                    db, session_id, session.learning_goal_id, session.student_initial_level, session.student_current_level,
+                    tutor_turn
+                )
+                ChatDAO.store_chat_history(
+                    db, session_id, tutor_turn.tutor_message, deferred_turn.learner_response, new_level, deferred_turn_id,
+                    llm_latency_ms, tutor_turn.answer_verdict, ability
+                )
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                db.rollback()
+                if not ChatDAO.record_deferred_turn_failure(db, deferred_turn_id, DEFERRED_TURN_MAX_ATTEMPTS):
+                    logger.warning(f"Answering deferred turn {deferred_turn_id} of session ID {session_id} failed: {str(e)}", event_type='deferred_turn_failed')
+                    return False
+                logger.error(f"Dropped deferred turn {deferred_turn_id} of session ID {session_id} after {DEFERRED_TURN_MAX_ATTEMPTS} attempts: {str(e)}", event_type='deferred_turn_dropped')
+                continue
+            get_summary_worker().enqueue(session_id)
+            logger.info(f"Deferred turn {deferred_turn_id} of session ID {session_id} answered.", event_type='deferred_turn_answered')
+
+    @staticmethod
+    def open_live_chat(db: Session, session_id: int) -> LiveChatSession:
+        """
+        Load the context of a session for a WebSocket chat connection.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
 
-            # Format chat history for GPT prompt
-            formatted_chat_history = [
-                f"Learner: {entry.learner_response}\nAI: {entry.llm_response}"
-                for entry in chat_history
-            ]
+        Returns:
+            LiveChatSession: The session context, or None if the session does not exist.
 
-            user_prompt = (
+        Raises:
+            Exception: If the session context cannot be loaded.
+        """
+        try:
+            if not ChatDAO.session_exists(db, session_id):
+                logger.warning(f"Session with ID {session_id} not found.", event_type='session_not_found')
+                return None
+            session = ChatDAO.get_session_by_id(db, session_id)
+            learning_goal = ChatDAO.get_learning_goal_by_session(db, session_id)
+            if not learning_goal:
+                logger.error("Learning goal not found.", event_type='learning_goal_not_found')
+                raise Exception("Learning goal not found for this session.")
+            return LiveChatSession(
+                session_id,
+                session.learning_goal_id,
+                learning_goal.learning_goal_names,
+                session.student_initial_level,
+                session.student_current_level,
+                SummaryDAO.get_summary(db, session_id),
+                ChatDAO.get_recent_chat_history(db, session_id, limit=RECENT_TURNS + SUMMARY_BATCH_TURNS)
+            )
+        except Exception as e:
+            logger.error(f"Error opening live chat for session ID {session_id}: {str(e)}", event_type='live_chat_open_error')
+            raise Exception(str(e))
+
+    @staticmethod
+    def stream_live_turn(db: Session, live_chat: LiveChatSession, learner_response: str, send_text) -> ChatResponse:
+        """
+        Process one turn of a WebSocket chat, passing the tutor's message to `send_text` piece by piece
+        as the model generates it, and update the connection's session context.
+
+        Args:
+            db (Session): Database session for executing queries.
+            live_chat (LiveChatSession): The connection's session context.
+            learner_response (str): The learner's input.
+            send_text (callable): Called with each new piece of the tutor's message; blocks while the client is behind.
+
+        Returns:
+            ChatResponse: The completed turn.
+
+        While the AI service is unavailable the turn is deferred like in `process_chat`, and so are the
+        connection's later turns until the deferred ones have been answered.
+
+        Raises:
+            Exception: If any part of the turn fails; the turn is then not stored.
+        """
+        try:
+            if live_chat.deferred:
+                if ChatDAO.has_deferred_turns(db, live_chat.session_id):
+                    return ChatService.defer_live_turn(db, live_chat, learner_response, send_text)
+                # The deferred turns were answered in the background
+                live_chat.reload(db)
+                db.rollback()
+
+            # Older turns have been folded into the summary by now; pick up the new summary
+            if live_chat.unsummarized_turns() >= RECENT_TURNS + SUMMARY_BATCH_TURNS:
+                live_chat.set_summary(SummaryDAO.get_summary(db, live_chat.session_id))
+                db.rollback()
+
+            user_prompt = ChatService.build_tutor_prompt(
+                live_chat.learning_goal_name,
+                live_chat.level,
+                live_chat.summary,
+                live_chat.chat_history,
+                learner_response,
+                ChatService.next_levels(db, live_chat.session_id, live_chat.learning_goal_id, live_chat.initial_level, live_chat.level)
+            )
+            db.rollback()  # Do not hold a read transaction during the LLM call
+            task_type = TASK_CHAT_TURN if live_chat.chat_history else TASK_CHAT_OVERVIEW
+            tutor_message = JSONStringFieldStream('tutor_message')
+            deltas = []
+            started = time.perf_counter()
+            try:
+                for delta in OpenAIService().stream_response_json(SYSTEM_PROMPT, user_prompt, task_type):
+                    deltas.append(delta)
+                    text = tutor_message.feed(delta)
+                    if text:
+                        send_text(text)
+            except LLMUnavailable:
+                return ChatService.defer_live_turn(db, live_chat, learner_response, send_text)
+            llm_latency_ms = round((time.perf_counter() - started) * 1000)
+            tutor_turn = TutorTurn.model_validate_json(''.join(deltas))
+
+            # Do not record a turn the learner never received
+            check_deadline()
+
+            new_level, ability = ChatService.next_level(
+                db, live_chat.session_id, live_chat.learning_goal_id, live_chat.initial_level, live_chat.level, tutor_turn
+            )
+            chat_id = ChatDAO.store_chat_history(
+                db, live_chat.session_id, tutor_turn.tutor_message, learner_response, new_level,
+                llm_latency_ms=llm_latency_ms, answer_verdict=tutor_turn.answer_verdict, ability=ability
+            )
+            get_summary_worker().enqueue(live_chat.session_id)
+
+            live_chat.level = new_level or live_chat.level
+            live_chat.chat_history.insert(0, ChatHistoryEntry(
+                id=chat_id, learner_response=learner_response, llm_response=tutor_turn.tutor_message
+            ))
+            # Same window as `process_chat`, in case the summary falls behind
+            del live_chat.chat_history[RECENT_TURNS + SUMMARY_BATCH_TURNS:]
+
+            logger.info("Live chat turn successfully processed.", event_type='chat_success')
+            return ChatResponse(
+                session_id=live_chat.session_id,
+                learner_input=learner_response,
+                ai_response=tutor_turn.tutor_message,
+                answer_verdict=tutor_turn.answer_verdict,
+                student_current_level=live_chat.level
+            )
+        except Exception as e:
+            logger.error(f"Error processing live chat turn: {str(e)}", event_type='chat_processing_error')
+            raise Exception(str(e))
+
+    @staticmethod
+    def defer_live_turn(db: Session, live_chat: LiveChatSession, learner_response: str, send_text) -> ChatResponse:
+        """
+        Defer a WebSocket chat turn and send the placeholder message as the tutor's message.
+        """
+        response = ChatService.defer_turn(db, live_chat.session_id, live_chat.level, learner_response)
+        live_chat.deferred = True
+        send_text(DEFERRED_TURN_MESSAGE)
+        return response
+
+    @staticmethod
+    def select_context_turns(summary, chat_history: list) -> list:
+        """
+        Pick the turns the tutor prompt includes verbatim: the last RECENT_TURNS, plus any older
+        turns the session's rolling summary does not cover yet.
+
+        Args:
+            summary (SessionSummary): The session's summary, or None.
+            chat_history (list): Recent chat turns, newest first.
+
+        Returns:
+            list: The selected turns, newest first.
+        """
+        if not summary:
+            return chat_history
+        return chat_history[:RECENT_TURNS] + [
+            entry for entry in chat_history[RECENT_TURNS:] if entry.id > summary.summarized_through_id
+        ]
+
+    @staticmethod
+    def build_tutor_prompt(learning_goal_name: str, level: str, summary: str, chat_history: list, learner_response: str,
+                           next_levels: dict = None) -> str:
+        """
+        Build the tutor prompt for one chat turn.
+
+        Args:
+            learning_goal_name (str): The session's learning goal.
+            level (str): The learner's current difficulty level.
+            summary (str): The rolling summary of earlier turns, or None.
+            chat_history (list): The turns to include verbatim, newest first.
+            learner_response (str): The learner's latest response.
+            next_levels (dict, optional): The level of the next question for each judged verdict, as worked out
+                by the ability estimator. Without it the model chooses the level and returns it as 'difficulty_level'.
+
+        Returns:
+            str: The user prompt for the tutor model.
+        """
+        # Format chat history for GPT prompt
+        formatted_chat_history = [
+            f"Learner: {entry.learner_response}\nAI: {entry.llm_response}"
+            for entry in chat_history
+        ]
+
+        if next_levels is None:
+            next_level_instructions = ""
+            difficulty_level_format = ',\n"difficulty_level": "<beginner | intermediate | advanced: the level for the next question>"'
+        else:
+            # The stored level is the estimator's, so the next question must be asked at it
+            next_level_instructions = "\n- Ask the next question at the level that matches your answer_verdict:\n" + "\n".join(
+                f"  - {verdict}: {next_level}" for verdict, next_level in next_levels.items()
+            ) + f"\n  - not_applicable: {level}"
+            difficulty_level_format = ""
+
+        return (
 f'''
 You are an intelligent tutor AI designed to validate user answers and adjust question difficulty dynamically based on the question-answer history of the learner.
 ### Instructions:
 
-1. **Learning Goal:** {learning_goal.learning_goal_names}  
-2. **Current Difficulty Level:** {session.student_current_level}  
-3. **Chat History:** 
+1. **Learning Goal:** {learning_goal_name}  
+2. **Current Difficulty Level:** {level}  
+3. **Summary of Earlier Conversation:** 
+   - {summary or "(none)"}
+   **Chat History:** 
    - {formatted_chat_history}
 4. **Latest Learner Response:** 
-   - {chat_request.learner_response}
+   - {learner_response}
 
 ---
 
 ### Adaptive Learning Flow:
 
 - **If this is the first conversation (empty chat history or learner response):**  
-  - Provide an overview of the topic "{learning_goal.learning_goal_names}" to help the learner get started.  
+  - Provide an overview of the topic "{learning_goal_name}" to help the learner get started.  
   - Avoid asking direct questions initially; instead, explain key concepts and fundamentals.
 
 - **If there is existing chat history:**  
@@ -144,26 +630,194 @@ _Output:_
 ---
 
 ### **Generating the Next Question:**  
-- Based on the student's performance, formulate an appropriate follow-up question that gradually builds understanding without overwhelming the learner.
+- Based on the student's performance, formulate an appropriate follow-up question that gradually builds understanding without overwhelming the learner.{next_level_instructions}
+
+---
+
+### **Response Format:**  
+Return **strictly valid JSON** with exactly these keys (the example outputs above are the "tutor_message"):
+{{
+"tutor_message": "<your reply to the learner, including the next question>",
+"answer_verdict": "<correct | partially_correct | incorrect | not_applicable (first conversation or no answer given)>"{difficulty_level_format}
+}}
 '''
-            )
+        )
 
-            system_prompt = "You are an educational AI tutor."
-            openai_service = OpenAIService()
-            ai_response = openai_service.generate_response(system_prompt, user_prompt)
+    @staticmethod
+    def get_chat_history_page(db: Session, session_id: int, after_id: int = None, limit: int = 50) -> ChatHistoryPage:
+        """
+        Read one page of a session's chat history, oldest first.
 
-            # Store chat history in the database
-            ChatDAO.store_chat_history(db, session.id, ai_response, chat_request.learner_response)
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            after_id (int, optional): Cursor returned as 'next_cursor' by the previous page.
+            limit (int): The maximum number of entries in the page.
 
-            logger.info("Chat successfully processed.", event_type='chat_success')
+        Returns:
+            ChatHistoryPage: The page of entries, or None if the session does not exist.
 
-            # Return response to the user
-            return ChatResponse(
-                session_id=session.id,
-                learner_input=chat_request.learner_response,
-                ai_response=ai_response
+        Raises:
+            Exception: If the chat history cannot be read.
+        """
+        try:
+            if not ChatDAO.session_exists(db, session_id):
+                logger.warning(f"Session with ID {session_id} not found.", event_type='session_not_found')
+                return None
+            rows, has_more = ChatDAO.get_chat_history_page(db, session_id, after_id, limit)
+            return ChatHistoryPage(
+                session_id=session_id,
+                items=[ChatHistoryEntry.model_validate(row) for row in rows],
+                next_cursor=rows[-1].id if rows else after_id,
+                has_more=has_more
             )
-
         except Exception as e:
-            logger.error(f"Error processing chat: {str(e)}", event_type='chat_processing_error')
-            raise Exception(str(e))
\ No newline at end of file
+            logger.error(f"Error reading chat history: {str(e)}", event_type='chat_history_read_error')
+            raise Exception(str(e))
+
+    @staticmethod
+    def export_chat_history(session_id: int, batch_size: int = 500, after_id: int = None):
+        """
+        Export a session's complete chat history as NDJSON, one entry per line, oldest first.
+        The export owns its database session because it outlives the request's session.
+
+        Args:
+            session_id (int): The ID of the session.
+            batch_size (int): The number of rows buffered per database fetch.
+            after_id (int, optional): Only export entries with an ID greater than this cursor.
+
+        Yields:
+            str: One JSON-encoded chat entry followed by a newline.
+        """
+        db = open_session()
+        try:
+            for row in ChatDAO.stream_chat_history(db, session_id, batch_size, after_id):
+                yield json.dumps({
+                    "id": row.id,
+                    "learner_response": row.learner_response,
+                    "llm_response": row.llm_response
+                }) + "\n"
+        finally:
+            db.close()
+
+
+class DeferredTurnWorker:
+    """
+    Background thread that answers deferred chat turns once the AI service is available again.
+    Sessions are queued when one of their turns is deferred; a session queued several times before the
+    worker reaches it is processed once. Retries are scheduled rather than waited for, so a failing session
+    does not hold back the others. Deferred turns outlive restarts in the database: `resume` queues the
+    sessions that have some, and each session is queued again with its next learner turn.
+    """
+
+    def __init__(self):
+        """
+        Initialize the worker; the thread starts with the first queued session.
+        """
+        # (due time, sequence, key) entries; the sequence keeps sessions due at the same time in order
+        self._scheduled = []
+        self._sequence = itertools.count()
+        self._pending = set()
+        self._failures = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def enqueue(self, session_id: int, tenant_id: str = None, delay: float = 0.0):
+        """
+        Queue a session for its deferred turns to be answered.
+
+        Args:
+            session_id (int): The ID of the session with deferred turns, or None to queue every such session.
+            tenant_id (str, optional): The session's tenant. Defaults to the current request's tenant.
+            delay (float): Seconds to wait before processing the session.
+        """
+        key = (tenant_id or tenant_context.get().get('tenant_id'), session_id)
+        with self._condition:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            heapq.heappush(self._scheduled, (time.monotonic() + delay, next(self._sequence), key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='deferred-turn-worker', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def resume(self, tenant_id: str = None):
+        """
+        Queue every session of a tenant with deferred turns, e.g. turns deferred before a restart.
+        The database is read by the worker thread, so the caller is not held up.
+
+        Args:
+            tenant_id (str, optional): The tenant. Defaults to the current request's tenant.
+        """
+        self.enqueue(None, tenant_id)
+
+    def _next(self) -> tuple:
+        """
+        Wait for the next session that is due and take it off the schedule.
+        """
+        with self._condition:
+            while True:
+                timeout = None
+                if self._scheduled:
+                    timeout = self._scheduled[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        key = heapq.heappop(self._scheduled)[2]
+                        self._pending.discard(key)
+                        return key
+                self._condition.wait(timeout)
+
+    def _run(self):
+        """
+        Answer queued sessions' deferred turns until the process exits, waiting while the circuit breaker is open.
+        """
+        while True:
+            tenant_id, session_id = key = self._next()
+            breaker = get_circuit_breaker()
+            while breaker is not None and not breaker.allows_calls():
+                time.sleep(max(breaker.retry_after(), 1.0))
+            # Route the database session and log lines to the session's tenant
+            token = tenant_context.set({'tenant_id': tenant_id} if tenant_id else {})
+            db = None
+            try:
+                db = SessionLocal(bind=get_engine(tenant_id))
+                if session_id is None:
+                    session_ids = ChatDAO.get_deferred_session_ids(db)
+                    for deferred_session_id in session_ids:
+                        self.enqueue(deferred_session_id, tenant_id)
+                    logger.info(f"Resumed {len(session_ids)} sessions with deferred turns.", event_type='deferred_turns_resumed')
+                elif not ChatService.answer_deferred_turns(db, session_id):
+                    # The failure was counted against the turn, which is dropped after DEFERRED_TURN_MAX_ATTEMPTS
+                    self.enqueue(session_id, tenant_id, DEFERRED_TURN_RETRY_SECONDS)
+                self._failures.pop(key, None)
+            except LLMUnavailable:
+                self.enqueue(session_id, tenant_id, DEFERRED_TURN_RETRY_SECONDS)
+            except Exception as e:
+                failures = self._failures.pop(key, 0) + 1
+                if failures >= DEFERRED_TURN_MAX_ATTEMPTS:
+                    logger.error(f"Giving up on the deferred turns of session ID {session_id} after {failures} failed attempts, until the session is queued again: {str(e)}", event_type='deferred_turn_worker_gave_up')
+                else:
+                    self._failures[key] = failures
+                    logger.warning(f"Answering deferred turns of session ID {session_id} failed, retrying: {str(e)}", event_type='deferred_turn_worker_error')
+                    self.enqueue(session_id, tenant_id, DEFERRED_TURN_RETRY_SECONDS)
+            finally:
+                if db is not None:
+                    db.close()
+                tenant_context.reset(token)
+
+
+deferred_turn_worker = None
+deferred_turn_worker_lock = threading.Lock()
+
+def get_deferred_turn_worker() -> DeferredTurnWorker:
+    """
+    Get or create the process-wide deferred turn worker.
+
+    Returns:
+        DeferredTurnWorker: The deferred turn worker instance.
+    """
+    global deferred_turn_worker
+    with deferred_turn_worker_lock:
+        if deferred_turn_worker is None:
+            deferred_turn_worker = DeferredTurnWorker()
+    return deferred_turn_worker
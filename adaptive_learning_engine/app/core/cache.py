@@ -0,0 +1,328 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from app.core.contextvar import tenant_context
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Cache backend: 'memory' (per worker), 'sqlite' (shared by the workers on a host) or 'none'.
+# Only 'sqlite' lets invalidations from other processes (e.g. generate_data.py reseeding goals) reach running workers.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+
+# File of the shared SQLite cache
+CACHE_PATH = os.getenv('CACHE_PATH', './cache.db')
+
+# Maximum number of cached entries; the least recently used (memory) or oldest (sqlite) are evicted
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+
+# Time to live of entries stored without an explicit TTL, in seconds
+CACHE_DEFAULT_TTL_SECONDS = float(os.getenv('CACHE_DEFAULT_TTL_SECONDS', '3600'))
+
+# Entries of the shared cache also kept in each worker's memory (0 disables the near cache)
+CACHE_NEAR_ENTRIES = int(os.getenv('CACHE_NEAR_ENTRIES', '1024'))
+
+# How often a worker applies other workers' invalidations to its near cache, in seconds
+CACHE_INVALIDATION_POLL_SECONDS = float(os.getenv('CACHE_INVALIDATION_POLL_SECONDS', '1'))
+
+# Invalidations kept in the shared log; workers that fall further behind drop their whole near cache
+INVALIDATION_LOG_SECONDS = 600
+
+# Number of writes between eviction passes of the shared cache
+MAINTENANCE_INTERVAL = 100
+
+
+def cache_key(namespace: str, *parts) -> str:
+    """
+    Build a cache key scoped to the current tenant, since tenants share the cache.
+
+    Args:
+        namespace (str): The kind of cached value, e.g. 'recommendation'.
+        *parts: The values identifying the entry.
+
+    Returns:
+        str: The cache key.
+    """
+    tenant_id = tenant_context.get().get('tenant_id') or ''
+    return ':'.join([tenant_id, namespace, *(str(part) for part in parts)])
+
+
+class NullCache:
+    """
+    Cache backend that stores nothing. Also the interface every backend implements.
+    None values are never cached, since `get` returns None for misses.
+    """
+
+    def get(self, key: str):
+        """
+        Return the cached value of a key, or None on a miss.
+        """
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Cache a value for `ttl` seconds (CACHE_DEFAULT_TTL_SECONDS by default).
+        """
+
+    def delete(self, key: str):
+        """
+        Invalidate one key.
+        """
+
+    def delete_prefix(self, prefix: str):
+        """
+        Invalidate every key starting with a prefix.
+        """
+
+
+class MemoryCache(NullCache):
+    """
+    Size-bounded LRU cache with TTLs in the worker's memory. Cached objects are shared by reference,
+    so callers must not modify them.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Number of entries after which the least recently used are evicted.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        if value is None:
+            return
+        expires_at = time.monotonic() + (CACHE_DEFAULT_TTL_SECONDS if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(NullCache):
+    """
+    Cache shared by all workers on a host through a SQLite file in WAL mode. Values are pickled.
+
+    Each worker keeps the entries it used recently in a near cache in memory. Invalidations are appended
+    to a log in the same file, which workers poll every CACHE_INVALIDATION_POLL_SECONDS to drop stale
+    near-cache entries, so an invalidation reaches every worker within the poll interval. Overwriting a key
+    with `set` is not logged, so values that change in place must be invalidated with `delete`.
+
+    Cache failures (e.g. a locked file) are logged and treated as misses; they never fail a request.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 near_entries: int = CACHE_NEAR_ENTRIES, poll_interval: float = CACHE_INVALIDATION_POLL_SECONDS):
+        """
+        Initialize the cache and create its tables.
+
+        Args:
+            path (str): The SQLite file.
+            max_entries (int): Number of entries after which the oldest are evicted.
+            near_entries (int): Size of this worker's near cache; 0 disables it.
+            poll_interval (float): Seconds between polls of the invalidation log.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.poll_interval = poll_interval
+        self.near = MemoryCache(near_entries) if near_entries > 0 else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._last_poll = time.monotonic()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_stored_at ON cache_entries (stored_at)")
+        # AUTOINCREMENT keeps IDs increasing after the log is trimmed, so workers can detect gaps
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, is_prefix INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._last_invalidation = connection.execute("SELECT coalesce(max(id), 0) FROM cache_invalidations").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection to the cache file.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _poll_invalidations(self):
+        """
+        Apply the invalidations logged by other workers to the near cache, at most once per poll interval.
+        """
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+        with self._lock:
+            if now - self._last_poll < self.poll_interval:
+                return
+            self._last_poll = now
+            rows = self._connection().execute(
+                "SELECT id, key, is_prefix FROM cache_invalidations WHERE id > ? ORDER BY id", (self._last_invalidation,)
+            ).fetchall()
+            if not rows:
+                return
+            if rows[0][0] > self._last_invalidation + 1:
+                # Part of the log was trimmed before this worker read it
+                self.near.clear()
+            else:
+                for _, key, is_prefix in rows:
+                    if is_prefix:
+                        self.near.delete_prefix(key)
+                    else:
+                        self.near.delete(key)
+            self._last_invalidation = rows[-1][0]
+
+    def _log_invalidation(self, connection: sqlite3.Connection, key: str, is_prefix: bool):
+        """
+        Append an invalidation to the shared log for the other workers' near caches.
+        """
+        if self.near is not None:
+            connection.execute(
+                "INSERT INTO cache_invalidations (key, is_prefix, created_at) VALUES (?, ?, ?)",
+                (key, int(is_prefix), time.time())
+            )
+
+    def _maintain(self, connection: sqlite3.Connection):
+        """
+        Remove expired entries, evict the oldest entries beyond `max_entries` and trim the invalidation log.
+        """
+        now = time.time()
+        connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        excess = connection.execute("SELECT count(*) FROM cache_entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY stored_at LIMIT ?)",
+                (excess,)
+            )
+        connection.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (now - INVALIDATION_LOG_SECONDS,))
+
+    def get(self, key: str):
+        try:
+            if self.near is not None:
+                self._poll_invalidations()
+                value = self.near.get(key)
+                if value is not None:
+                    return value
+            now = time.time()
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            value = pickle.loads(row[0])
+            if self.near is not None:
+                self.near.set(key, value, row[1] - now)
+            return value
+        except Exception as e:
+            logger.warning(f"Cache read failed for '{key}': {str(e)}", event_type='cache_error')
+            return None
+
+    def set(self, key: str, value, ttl: float = None):
+        if value is None:
+            return
+        ttl = CACHE_DEFAULT_TTL_SECONDS if ttl is None else ttl
+        try:
+            now = time.time()
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+            )
+            if self.near is not None:
+                self.near.set(key, value, ttl)
+            with self._lock:
+                self._writes += 1
+                maintain = self._writes % MAINTENANCE_INTERVAL == 0
+            if maintain:
+                self._maintain(connection)
+        except Exception as e:
+            logger.warning(f"Cache write failed for '{key}': {str(e)}", event_type='cache_error')
+
+    def delete(self, key: str):
+        try:
+            connection = self._connection()
+            connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._log_invalidation(connection, key, False)
+            if self.near is not None:
+                self.near.delete(key)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for '{key}': {str(e)}", event_type='cache_error')
+
+    def delete_prefix(self, prefix: str):
+        try:
+            connection = self._connection()
+            connection.execute("DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            self._log_invalidation(connection, prefix, True)
+            if self.near is not None:
+                self.near.delete_prefix(prefix)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for prefix '{prefix}': {str(e)}", event_type='cache_error')
+
+
+cache = None
+cache_lock = threading.Lock()
+
+def get_cache() -> NullCache:
+    """
+    Get or create the process-wide cache configured by CACHE_BACKEND.
+
+    Returns:
+        NullCache: The cache backend.
+    """
+    global cache
+    if cache is None:
+        with cache_lock:
+            if cache is None:
+                if CACHE_BACKEND == 'sqlite':
+                    cache = SQLiteCache()
+                elif CACHE_BACKEND == 'none':
+                    cache = NullCache()
+                else:
+                    cache = MemoryCache()
+                logger.info(f"Using the '{CACHE_BACKEND}' cache backend.", event_type='cache_init')
+    return cache
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# 'record' captures LLM calls into the cassette, 'replay' serves them from it; unset calls the LLM normally
+LLM_CASSETTE_MODE = os.getenv('LLM_CASSETTE_MODE')
+
+# JSON Lines file holding the recorded calls
+LLM_CASSETTE_PATH = os.getenv('LLM_CASSETTE_PATH', './cassettes/llm.jsonl')
+
+# Replay latency: 'none' answers immediately, 'recorded' waits as long as the recorded call took
+LLM_REPLAY_LATENCY = os.getenv('LLM_REPLAY_LATENCY', 'none')
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+
+class CassetteMiss(Exception):
+    """
+    Raised in replay mode for a call that was not recorded, e.g. because a prompt changed.
+    """
+
+
+def request_key(system_prompt: str, user_prompt: str, task_type: str, options: dict) -> str:
+    """
+    Identify an LLM request by its prompts, task type and call options.
+    """
+    payload = json.dumps([system_prompt, user_prompt, task_type, options], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded LLM request/response pairs, for deterministic offline runs and benchmarks.
+
+    In record mode every call is appended to the cassette file together with its latency.
+    In replay mode calls are answered from the file; identical requests recorded several times are
+    answered with their recorded responses in order, repeating the last one once exhausted.
+    """
+
+    def __init__(self, path: str, mode: str, replay_latency: str = LLM_REPLAY_LATENCY):
+        """
+        Initialize the cassette, loading the recorded calls in replay mode.
+
+        Args:
+            path (str): The cassette file.
+            mode (str): MODE_RECORD or MODE_REPLAY.
+            replay_latency (str): 'none' or 'recorded'.
+        """
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._positions = {}
+        if mode == MODE_REPLAY:
+            with open(path, encoding='utf-8') as cassette_file:
+                for line in cassette_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry['key'], []).append(entry)
+            logger.info(f"Loaded {sum(map(len, self._entries.values()))} recorded LLM calls from {path}.", event_type='cassette_loaded')
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def rewind(self):
+        """
+        Replay every request's recorded responses from the first one again.
+        """
+        with self._lock:
+            self._positions.clear()
+
+    def record(self, system_prompt: str, user_prompt: str, task_type: str, options: dict, response, latency: float):
+        """
+        Append a call to the cassette.
+
+        Args:
+            system_prompt (str): The system prompt.
+            user_prompt (str): The user prompt.
+            task_type (str): The task type of the call.
+            options (dict): Extra arguments of the chat completions call.
+            response: The response text, or the list of deltas of a streamed response.
+            latency (float): Seconds the call took.
+        """
+        entry = {
+            'key': request_key(system_prompt, user_prompt, task_type, options),
+            'task_type': task_type,
+            'options': options,
+            'system_prompt': system_prompt,
+            'user_prompt': user_prompt,
+            'response': response,
+            'latency_seconds': round(latency, 4)
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as cassette_file:
+                cassette_file.write(line)
+
+    def replay(self, system_prompt: str, user_prompt: str, task_type: str, options: dict):
+        """
+        Look up the recorded response of a call.
+
+        Args:
+            system_prompt (str): The system prompt.
+            user_prompt (str): The user prompt.
+            task_type (str): The task type of the call.
+            options (dict): Extra arguments of the chat completions call.
+
+        Returns:
+            tuple: The recorded response and the seconds to wait before answering.
+
+        Raises:
+            CassetteMiss: If the call was not recorded.
+        """
+        key = request_key(system_prompt, user_prompt, task_type, options)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded LLM response for this {task_type} request in {self.path}.")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            entry = entries[min(position, len(entries) - 1)]
+        latency = entry['latency_seconds'] if self.replay_latency == 'recorded' else 0.0
+        return entry['response'], latency
+
+
+cassette = None
+cassette_lock = threading.Lock()
+
+def get_cassette() -> Cassette:
+    """
+    Get the process-wide cassette configured by LLM_CASSETTE_MODE.
+
+    Returns:
+        Cassette: The cassette, or None when LLM calls are not recorded or replayed.
+    """
+    global cassette
+    if cassette is None and LLM_CASSETTE_MODE in (MODE_RECORD, MODE_REPLAY):
+        with cassette_lock:
+            if cassette is None:
+                cassette = Cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE)
+    return cassette
+
+def install_cassette(path: str, mode: str, replay_latency: str = LLM_REPLAY_LATENCY) -> Cassette:
+    """
+    Record or replay LLM calls with the given cassette, regardless of LLM_CASSETTE_MODE (used by scripts).
+
+    Returns:
+        Cassette: The installed cassette.
+    """
+    global cassette
+    with cassette_lock:
+        cassette = Cassette(path, mode, replay_latency)
+    return cassette
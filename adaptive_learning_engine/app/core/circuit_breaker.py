@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Fail LLM calls fast while the LLM is failing; disable to always wait for the client timeout
+LLM_BREAKER_ENABLED = os.getenv('LLM_BREAKER_ENABLED', 'true').lower() != 'false'
+
+# Consecutive failed (or slow) LLM calls after which the breaker opens
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))
+
+# LLM calls taking longer than this many seconds (to the first token, when streaming) count as failures
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('LLM_BREAKER_SLOW_CALL_SECONDS', '30'))
+
+# How long the breaker stays open before probe calls are let through, in seconds
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', '30'))
+
+# Probe calls let through at once while half-open
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv('LLM_BREAKER_HALF_OPEN_PROBES', '1'))
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class LLMUnavailable(Exception):
+    """
+    Raised instead of calling the LLM while the circuit breaker is open.
+
+    Services that can still answer without the LLM attach a degraded answer as `fallback`, e.g. the last
+    stored analysis; endpoints serve it marked as degraded, or answer 503 when there is none.
+
+    Attributes:
+        retry_after (float): Seconds until the breaker lets probe calls through.
+        fallback: A degraded answer to serve instead, or None.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.fallback = None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around the LLM calls of a process.
+
+    - Closed: calls go through. LLM_BREAKER_FAILURE_THRESHOLD consecutive failures open the breaker;
+      a call slower than LLM_BREAKER_SLOW_CALL_SECONDS counts as a failure even if it succeeded.
+    - Open: calls fail immediately with LLMUnavailable for LLM_BREAKER_OPEN_SECONDS, so requests do not
+      pile up waiting for the client timeout.
+    - Half-open: up to LLM_BREAKER_HALF_OPEN_PROBES calls probe the LLM. A successful probe closes the
+      breaker, a failed one opens it again; other calls keep failing fast meanwhile.
+
+    Callers report every admitted call with `record_success`, `record_failure` or `release`.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD, slow_call_seconds: float = LLM_BREAKER_SLOW_CALL_SECONDS,
+                 open_seconds: float = LLM_BREAKER_OPEN_SECONDS, half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            slow_call_seconds (float): Latency above which a call counts as failed.
+            open_seconds (float): Seconds the breaker stays open.
+            half_open_probes (int): Concurrent probe calls while half-open.
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """
+        Return the seconds until the open breaker lets probe calls through (0 if it is not open).
+        """
+        return max(self.opened_until - time.monotonic(), 0.0) if self.state == STATE_OPEN else 0.0
+
+    def allows_calls(self) -> bool:
+        """
+        Check, without taking a probe slot, whether a call would currently be let through.
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN:
+                return time.monotonic() >= self.opened_until
+            return self.probes < self.half_open_probes
+
+    def before_call(self):
+        """
+        Admit a call, or fail fast.
+
+        Raises:
+            LLMUnavailable: If the breaker is open, or half-open with all probe slots taken.
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == STATE_OPEN:
+                if now < self.opened_until:
+                    raise LLMUnavailable("The AI service is temporarily unavailable.", self.opened_until - now)
+                self.state = STATE_HALF_OPEN
+                self.probes = 0
+                logger.info("LLM circuit breaker half-open, probing.", event_type='circuit_breaker_half_open')
+            if self.probes >= self.half_open_probes:
+                raise LLMUnavailable("The AI service is recovering; please retry shortly.", 1.0)
+            self.probes += 1
+
+    def _open(self):
+        """
+        Open the breaker. Called with the lock held.
+        """
+        self.state = STATE_OPEN
+        self.opened_until = time.monotonic() + self.open_seconds
+        self.probes = 0
+        logger.error(f"LLM circuit breaker opened after {self.consecutive_failures} consecutive failures; failing fast for {self.open_seconds:.0f}s.", event_type='circuit_breaker_open')
+
+    def record_success(self, seconds: float):
+        """
+        Report an admitted call that got an answer after `seconds`.
+        """
+        if seconds >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == STATE_HALF_OPEN:
+                self.state = STATE_CLOSED
+                self.probes = 0
+                logger.info("LLM circuit breaker closed.", event_type='circuit_breaker_closed')
+
+    def record_failure(self):
+        """
+        Report an admitted call that failed or was too slow.
+        """
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN or (self.state == STATE_CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._open()
+
+    def release(self):
+        """
+        Report an admitted call that says nothing about the LLM's health, e.g. one cancelled by its client.
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+
+circuit_breaker = None
+circuit_breaker_lock = threading.Lock()
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Get or create the process-wide LLM circuit breaker.
+
+    Returns:
+        CircuitBreaker: The circuit breaker, or None when LLM_BREAKER_ENABLED is false.
+    """
+    global circuit_breaker
+    if circuit_breaker is None and LLM_BREAKER_ENABLED:
+        with circuit_breaker_lock:
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker()
+    return circuit_breaker
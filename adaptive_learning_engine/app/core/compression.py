@@ -0,0 +1,162 @@
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional; only gzip is offered without it
+    brotli = None
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv('COMPRESSION_MINIMUM_SIZE', '1024'))
+
+# Compression effort; the defaults favour CPU time, since bodies are compressed per request
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = (b'application/json', b'application/x-ndjson', b'text/')
+
+# gzip container around the deflate stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def negotiate_encoding(accept_encoding: str):
+    """
+    Pick the response encoding from an Accept-Encoding header, preferring brotli over gzip.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header value.
+
+    Returns:
+        str: 'br', 'gzip', or None if neither is acceptable.
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, parameters = part.strip().partition(';')
+        weight = 1.0
+        parameter, _, value = parameters.strip().partition('=')
+        if parameter.strip() == 'q':
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding.strip()] = weight
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    for coding in supported:
+        if weights.get(coding, weights.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+class Compressor:
+    """
+    Incremental gzip or brotli compressor with the same interface for both encodings.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """
+        Compress a chunk; with `flush`, everything written so far is emitted so the client can decode it.
+        """
+        if self.encoding == 'br':
+            output = self._compressor.process(data)
+            return output + self._compressor.flush() if flush else output
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+    def finish(self) -> bytes:
+        """
+        End the stream.
+        """
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses JSON and text responses with brotli (when installed) or gzip,
+    as negotiated with the client's Accept-Encoding header.
+
+    - Complete responses smaller than COMPRESSION_MINIMUM_SIZE are sent unchanged.
+    - Streamed responses (e.g. the NDJSON export) are compressed chunk by chunk and flushed per chunk.
+    - Responses that already carry a Content-Encoding are left alone.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size (int): Smallest complete response body that is compressed, in bytes.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ''
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message['type'] == 'http.response.start':
+                headers = dict(message.get('headers', []))
+                content_type = headers.get(b'content-type', b'')
+                if b'content-encoding' in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    await send(message)
+                    return
+                # Hold the start until the first body chunk shows whether compression pays off
+                start_message = message
+                return
+            if message['type'] != 'http.response.body' or start_message is None:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers = [
+                    (name, value) for name, value in start_message.get('headers', []) if name != b'content-length'
+                ]
+                headers += [(b'content-encoding', encoding.encode()), (b'vary', b'Accept-Encoding')]
+                if more_body:
+                    await send({**start_message, 'headers': headers})
+                else:
+                    compressed = compressor.compress(body) + compressor.finish()
+                    headers.append((b'content-length', str(len(compressed)).encode()))
+                    await send({**start_message, 'headers': headers})
+                    await send({'type': 'http.response.body', 'body': compressed})
+                    return
+            if more_body:
+                await send({'type': 'http.response.body', 'body': compressor.compress(body, flush=True), 'more_body': True})
+            else:
+                await send({'type': 'http.response.body', 'body': compressor.compress(body) + compressor.finish()})
+
+        await self.app(scope, receive, send_compressed)
@@ -2,4 +2,10 @@ error_responses = {
     404: {
         "description": "Not found"
     }
-}
\ No newline at end of file
+}
+
+# Difficulty levels used for sessions and tutor prompts, lowest first
+STUDENT_LEVELS = ["beginner", "intermediate", "advanced"]
+
+# Verdicts the tutor can give on a learner's latest answer
+ANSWER_VERDICTS = ["correct", "partially_correct", "incorrect", "not_applicable"]
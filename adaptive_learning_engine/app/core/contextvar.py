@@ -1,4 +1,12 @@
 from contextvars import ContextVar
 
 # Define a ContextVar to hold tenant configuration
-tenant_context: ContextVar[dict] = ContextVar("tenant_context", default={})
\ No newline at end of file
+tenant_context: ContextVar[dict] = ContextVar("tenant_context", default={})
+
+# Define a ContextVar to hold the current request's deadline and cancellation state
+# Keys: 'deadline' (time.monotonic() value or None), 'cancelled' (threading.Event), 'expired' (bool)
+request_deadline_context: ContextVar[dict] = ContextVar("request_deadline_context", default={})
+
+# Define a ContextVar to hold the profile of the current request, or None when it is not profiled
+# Keys: 'profilers' (cProfile.Profile list), 'cpu_seconds' (float)
+request_profile_context: ContextVar[dict] = ContextVar("request_profile_context", default=None)
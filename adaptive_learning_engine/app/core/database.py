@@ -1,14 +1,184 @@
-from sqlalchemy import create_engine
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import create_engine, event, make_url, inspect
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core.contextvar import tenant_context
+from app.core.custom_logger import CustomLogger
+from app.core.deadline import sqlite_progress_handler
+
+logger = CustomLogger()
 
 DATABASE_URL = "sqlite:///./AdaptiveLearning.db"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Database URL of each tenant; '{tenant_id}' is replaced by the tenant's ID
+TENANT_DATABASE_URL = os.getenv('TENANT_DATABASE_URL', "sqlite:///./tenants/{tenant_id}.db")
+
+# Maximum number of tenant engines (and their connection pools) kept open at once
+TENANT_ENGINE_CACHE_SIZE = int(os.getenv('TENANT_ENGINE_CACHE_SIZE', '32'))
+
+# Number of SQLite virtual machine instructions between request deadline checks
+DEADLINE_CHECK_INTERVAL = 10000
+
+
+class UnknownTenant(Exception):
+    """
+    Raised when the current request's tenant has no provisioned database.
+    """
+
+
+def install_deadline_handler(dbapi_connection, connection_record):
+    # Interrupt running statements once the current request is cancelled or past its deadline
+    dbapi_connection.set_progress_handler(sqlite_progress_handler, DEADLINE_CHECK_INTERVAL)
+
+def _create_engine(url: str):
+    """
+    Create an engine with the application's connection settings.
+    """
+    new_engine = create_engine(url, connect_args={"check_same_thread": False})
+    event.listen(new_engine, "connect", install_deadline_handler)
+    return new_engine
+
+engine = _create_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Table metadata created on the default database and on every tenant database when first used
+schema_metadata = []
+
+# Callbacks run with the tenant ID whenever a tenant's engine is created
+tenant_engine_listeners = []
+
+tenant_engines = OrderedDict()
+tenant_engines_lock = threading.Lock()
+
+def tenant_database_url(tenant_id: str) -> str:
+    """
+    Return the database URL of a tenant.
+    """
+    return TENANT_DATABASE_URL.format(tenant_id=tenant_id)
+
+def get_engine(tenant_id: str = None):
+    """
+    Get the engine of a tenant, or of the current request's tenant when no ID is given.
+    Requests without a tenant use the default database. Tenant engines are kept in a bounded
+    least-recently-used cache; evicted engines are disposed, which closes their idle connections
+    (connections still checked out are closed when returned). The callbacks registered with
+    `on_tenant_engine_created` run after a tenant's engine is created.
+
+    Args:
+        tenant_id (str, optional): The tenant ID. Defaults to the tenant in `tenant_context`.
+
+    Returns:
+        Engine: The tenant's engine.
+
+    Raises:
+        UnknownTenant: If the tenant's SQLite database file does not exist.
+    """
+    tenant_id = tenant_id or tenant_context.get().get('tenant_id')
+    if not tenant_id:
+        return engine
+    with tenant_engines_lock:
+        tenant_engine = tenant_engines.get(tenant_id)
+        if tenant_engine is not None:
+            tenant_engines.move_to_end(tenant_id)
+            return tenant_engine
+
+        url = make_url(tenant_database_url(tenant_id))
+        if url.get_backend_name() == 'sqlite' and not os.path.exists(url.database or ''):
+            # Tenants are provisioned explicitly, so a mistyped ID cannot create a database
+            raise UnknownTenant(f"Unknown tenant '{tenant_id}'.")
+        tenant_engine = _create_engine(url)
+        for metadata in schema_metadata:
+            create_tables(metadata, bind=tenant_engine)
+        tenant_engines[tenant_id] = tenant_engine
+        if len(tenant_engines) > TENANT_ENGINE_CACHE_SIZE:
+            evicted_id, evicted_engine = tenant_engines.popitem(last=False)
+            evicted_engine.dispose()
+            logger.info(f"Tenant engine for '{evicted_id}' evicted from the cache.", event_type='tenant_engine_evicted')
+        logger.info(f"Tenant engine for '{tenant_id}' created.", event_type='tenant_engine_created')
+    for listener in tenant_engine_listeners:
+        listener(tenant_id)
+    return tenant_engine
+
+def add_missing_columns(metadata, bind):
+    """
+    Add the columns of `metadata` that existing tables do not have yet, since `create_all` leaves existing
+    tables untouched. Only nullable columns without server defaults can be added this way; the existing
+    rows hold NULL in them.
+
+    Args:
+        metadata (MetaData): The metadata of the declarative base.
+        bind (Engine): The engine to alter the tables on.
+    """
+    inspector = inspect(bind)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            try:
+                with bind.begin() as connection:
+                    connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            except OperationalError as error:
+                # Another worker starting at the same time added it first
+                if 'duplicate column' not in str(error):
+                    raise
+            logger.info(f"Column {table.name}.{column.name} added.", event_type='column_added')
+
+def create_tables(metadata, bind=None):
+    """
+    Create the tables and indexes of `metadata` that do not exist yet, and add new columns to existing tables.
+
+    Args:
+        metadata (MetaData): The metadata of the declarative base to create.
+        bind (Engine, optional): The engine to create them on. Defaults to the application engine.
+    """
+    bind = bind or engine
+    metadata.create_all(bind=bind)
+    add_missing_columns(metadata, bind)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def register_schema(metadata):
+    """
+    Create the tables of `metadata` on the default database, and on each tenant database when it is first used.
+    Registering the same metadata again only creates its tables.
+
+    Args:
+        metadata (MetaData): The metadata of the declarative base to create.
+    """
+    create_tables(metadata)
+    if metadata not in schema_metadata:
+        schema_metadata.append(metadata)
+
+def on_tenant_engine_created(listener):
+    """
+    Register a callback run with the tenant ID each time a tenant's engine is created, outside the engine
+    cache lock, e.g. to resume background work stored in the tenant's database. It must not block.
+
+    Args:
+        listener (callable): The callback.
+    """
+    tenant_engine_listeners.append(listener)
+
+def open_session():
+    """
+    Open a database session on the current request's tenant database.
+
+    Returns:
+        Session: A new database session.
+    """
+    return SessionLocal(bind=get_engine())
+
 def get_db():
-    db = SessionLocal()
+    db = open_session()
     try:
         print("Session created")
         yield db
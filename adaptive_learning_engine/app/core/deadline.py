@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from app.core.contextvar import request_deadline_context
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Default end-to-end budget of a request, in seconds
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('REQUEST_TIMEOUT_SECONDS', '60'))
+
+# Header clients can use to ask for a shorter budget, in seconds
+REQUEST_TIMEOUT_HEADER = b'x-request-timeout'
+
+
+class RequestAborted(Exception):
+    """
+    Base of the errors raised when work for the current request stops because the request ended.
+
+    Services and DAOs wrap the errors they catch in their own exceptions, which keeps the original in the
+    exception chain; the endpoint layer's exception handlers find it there with `aborted_error`, so aborts
+    need no special handling in between.
+    """
+
+
+class DeadlineExceeded(RequestAborted):
+    """
+    Raised when the current request's deadline has passed.
+    """
+
+
+class RequestCancelled(RequestAborted):
+    """
+    Raised when the client of the current request has disconnected.
+    """
+
+
+def aborted_error(error: BaseException):
+    """
+    Find the abort an error was raised for, following its chain of causes and handled exceptions.
+
+    Args:
+        error (BaseException): The error.
+
+    Returns:
+        RequestAborted: The abort, or None if the error is an ordinary failure.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, RequestAborted):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def remaining_time():
+    """
+    Get the time left before the current request's deadline.
+
+    Returns:
+        float: Seconds left (never negative), or None outside a request or once the response has started.
+    """
+    deadline = request_deadline_context.get().get('deadline')
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def is_aborted() -> bool:
+    """
+    Check whether the current request was cancelled or ran past its deadline, without raising.
+    A passed deadline is remembered so the response can be reported as a timeout.
+
+    Returns:
+        bool: True if work for the current request should stop.
+    """
+    context = request_deadline_context.get()
+    if not context:
+        return False
+    if context['cancelled'].is_set():
+        return True
+    deadline = context.get('deadline')
+    if deadline is not None and time.monotonic() >= deadline:
+        context['expired'] = True
+        return True
+    return False
+
+
+def check_deadline():
+    """
+    Stop work for the current request if the client disconnected or the deadline passed.
+
+    Raises:
+        RequestCancelled: If the client disconnected.
+        DeadlineExceeded: If the deadline passed.
+    """
+    if not is_aborted():
+        return
+    if request_deadline_context.get()['cancelled'].is_set():
+        raise RequestCancelled("Client disconnected.")
+    raise DeadlineExceeded("Request deadline exceeded.")
+
+
+def sqlite_progress_handler() -> int:
+    """
+    SQLite progress handler that interrupts the running statement once the current request is aborted.
+
+    Returns:
+        int: Non-zero to interrupt the statement.
+    """
+    return 1 if is_aborted() else 0
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that gives every HTTP request a deadline and a cancellation flag in
+    `request_deadline_context`, so the service, LLM and DAO layers can bound their work.
+
+    - The budget is REQUEST_TIMEOUT_SECONDS, or the shorter X-Request-Timeout header value.
+    - When the client disconnects, the cancellation flag is set and work stops at the next check.
+    - If the deadline passes before the response starts, a 504 is returned. Errors raised after
+      the deadline passed are also reported as 504 instead of 500.
+    - Once the response has started (e.g. a streamed export), only disconnects stop the work.
+
+    The request body is read up front so disconnects can be watched without competing with the app for messages.
+    """
+
+    def __init__(self, app, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            timeout (float): Default request budget in seconds.
+        """
+        self.app = app
+        self.timeout = timeout
+
+    def _request_timeout(self, scope) -> float:
+        """
+        Return the budget for a request, honouring a shorter X-Request-Timeout header.
+        """
+        for name, value in scope.get('headers', []):
+            if name == REQUEST_TIMEOUT_HEADER:
+                try:
+                    return min(max(float(value), 0.0), self.timeout)
+                except ValueError:
+                    break
+        return self.timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Read the request body so the original receive channel can be watched for disconnects
+        body_messages = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body_messages.append(message)
+            if not message.get('more_body', False):
+                break
+
+        timeout = self._request_timeout(scope)
+        context = {'deadline': time.monotonic() + timeout, 'cancelled': threading.Event(), 'expired': False}
+        disconnected = asyncio.Event()
+        response_started = False
+        response_complete = False
+
+        async def replay_receive():
+            if body_messages:
+                return body_messages.pop(0)
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    if response_complete:
+                        # Servers report a disconnect once the response has been sent; nothing to cancel
+                        return
+                    context['cancelled'].set()
+                    logger.warning(f"Client disconnected from {scope.get('path')}, cancelling request.", event_type='request_cancelled')
+                    return
+
+        async def send_with_deadline(message):
+            nonlocal response_started, response_complete
+            if context.get('timed_out'):
+                # A 504 has already been sent in place of the app's response
+                return
+            if message['type'] == 'http.response.start':
+                response_started = True
+                # Work after the response started (streaming) is bounded by disconnects only
+                context['deadline'] = None
+                if context['expired'] and message['status'] >= 500:
+                    context['timed_out'] = True
+                    await self._send_timeout(send)
+                    return
+            elif message['type'] == 'http.response.body' and not message.get('more_body', False):
+                response_complete = True
+            await send(message)
+
+        token = request_deadline_context.set(context)
+        watcher = asyncio.create_task(watch_disconnect())
+        app_task = asyncio.create_task(self.app(scope, replay_receive, send_with_deadline))
+        try:
+            done, _ = await asyncio.wait({app_task}, timeout=timeout)
+            if app_task in done:
+                app_task.result()
+            elif response_started:
+                await app_task
+            else:
+                context['expired'] = True
+                context['timed_out'] = True
+                logger.error(f"Request to {scope.get('path')} exceeded its {timeout:.1f}s deadline.", event_type='request_deadline_exceeded')
+                # Worker threads stop at their next deadline check; their late result is discarded
+                app_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                app_task.cancel()
+                await self._send_timeout(send)
+        finally:
+            watcher.cancel()
+            request_deadline_context.reset(token)
+
+    @staticmethod
+    async def _send_timeout(send):
+        """
+        Send a 504 response reporting the exceeded deadline.
+        """
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 504,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from openai import AzureOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from app.core.custom_logger import CustomLogger
+from app.core.deadline import check_deadline, is_aborted, remaining_time
+
+logger = CustomLogger()
+
+# Errors after which another endpoint is tried
+RETRIABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+DEFAULT_API_VERSION = "2024-02-01"
+
+# Seconds between deadline checks while waiting for hedged calls
+WAIT_CHECK_SECONDS = 0.1
+
+
+class PoolEndpoint:
+    """
+    One Azure OpenAI endpoint of the pool, with its client and observed health.
+
+    Attributes:
+        name (str): Display name used in logs.
+        deployments (dict): Optional tier to deployment name mapping for this endpoint.
+        client (AzureOpenAI): Client bound to the endpoint.
+    """
+
+    # Number of recent latencies kept for averages and percentiles
+    LATENCY_WINDOW = 100
+    # Smoothing factor of the exponentially weighted error rate
+    ERROR_SMOOTHING = 0.2
+
+    def __init__(self, name: str, endpoint: str, api_key: str, api_version: str = DEFAULT_API_VERSION,
+                 deployments: dict = None):
+        """
+        Initialize the endpoint and its client.
+        """
+        self.name = name
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.api_version = api_version
+        self.deployments = deployments or {}
+        self.client = self._create_client()
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.error_rate = 0.0
+        self.remaining_requests = None
+        self.avoid_until = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _create_client(self) -> AzureOpenAI:
+        """
+        Get an instance of the Azure OpenAI client for this endpoint.
+
+        Returns:
+            AzureOpenAI: Configured OpenAI client instance.
+        """
+        try:
+            client = AzureOpenAI(
+                api_key=self.api_key,
+                api_version=self.api_version,
+                azure_endpoint=self.endpoint
+            )
+            logger.info(f"Successfully initialized OpenAI client for endpoint '{self.name}'.", event_type='openai_client_init')
+            return client
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI client for endpoint '{self.name}': {str(e)}", event_type='openai_client_error')
+            raise Exception("Error connecting to AI service. Please try again later.")
+
+    def latency_percentile(self, q: float):
+        """
+        Return the q-quantile (0-1) of recent latencies, or None without samples.
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def score(self, now: float) -> float:
+        """
+        Lower is better. Combines average latency, error rate, remaining quota and current load.
+        Endpoints without latency samples score 0 so they get probed.
+        """
+        with self._lock:
+            if not self.latencies:
+                return 0.0
+            latency = sum(self.latencies) / len(self.latencies)
+            quota_factor = 1.0 if self.remaining_requests is None else 1.0 + 10.0 / (1 + self.remaining_requests)
+            score = latency * (1 + 4 * self.error_rate) * quota_factor * (1 + self.in_flight)
+        # Endpoints in a throttle cooldown rank after all others
+        return score + (1e6 if self.avoid_until > now else 0.0)
+
+    def record_success(self, seconds: float, headers):
+        """
+        Record a successful call's latency and the remaining quota reported in the response headers.
+        """
+        remaining = headers.get('x-ratelimit-remaining-requests') if headers is not None else None
+        with self._lock:
+            self.latencies.append(seconds)
+            self.error_rate *= (1 - self.ERROR_SMOOTHING)
+            if remaining is not None and str(remaining).isdigit():
+                self.remaining_requests = int(remaining)
+
+    def record_failure(self, error: Exception, cooldown: float):
+        """
+        Record a failed call. Throttled endpoints are avoided for the Retry-After period or the cooldown.
+        """
+        with self._lock:
+            self.error_rate = self.ERROR_SMOOTHING + (1 - self.ERROR_SMOOTHING) * self.error_rate
+            if isinstance(error, RateLimitError):
+                retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+                delay = float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else cooldown
+                self.avoid_until = time.monotonic() + delay
+                self.remaining_requests = 0
+
+
+class EndpointPool:
+    """
+    Balances chat completion calls across Azure OpenAI endpoints using observed latency, error rate and
+    remaining quota, failing over to the next endpoint on throttling or transient errors.
+
+    When hedging is enabled, a duplicate request is sent to the next-best endpoint once the first call
+    exceeds its endpoint's latency percentile; whichever returns first wins. A loser that has not started
+    yet is cancelled; a loser already in flight cannot be interrupted by the synchronous client, so its
+    result is discarded (its latency is still recorded).
+
+    Configuration (environment variables):
+        AZURE_OPENAI_ENDPOINTS: JSON list of endpoints, each with 'endpoint', 'api_key' and optional 'name',
+            'api_version' and 'deployments' ({"fast": ..., "large": ...}). Defaults to the single
+            AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY endpoint.
+        AZURE_OPENAI_HEDGE_PERCENTILE: Latency percentile (0-1) after which a hedged request is sent. Unset disables hedging.
+        AZURE_OPENAI_HEDGE_MIN_SAMPLES: Latency samples an endpoint needs before it is hedged. Defaults to 20.
+        AZURE_OPENAI_THROTTLE_COOLDOWN_SECONDS: Cooldown for throttled endpoints without Retry-After. Defaults to 30.
+    """
+
+    def __init__(self, endpoints: list, hedge_percentile: float = None, hedge_min_samples: int = 20,
+                 cooldown: float = 30.0):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints (list): The PoolEndpoint instances.
+            hedge_percentile (float, optional): Latency percentile that triggers a hedged request.
+            hedge_min_samples (int): Latency samples required before hedging an endpoint.
+            cooldown (float): Default throttle cooldown in seconds.
+        """
+        if not endpoints:
+            raise Exception("At least one Azure OpenAI endpoint must be configured.")
+        self.endpoints = endpoints
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.cooldown = cooldown
+        self._executor = ThreadPoolExecutor(thread_name_prefix='openai-hedge') if hedge_percentile and len(endpoints) > 1 else None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the pool from environment variables.
+
+        Returns:
+            EndpointPool: The configured pool.
+        """
+        api_version = os.getenv('AZURE_OPENAI_API_VERSION', DEFAULT_API_VERSION)
+        configured = os.getenv('AZURE_OPENAI_ENDPOINTS')
+        if configured:
+            endpoints = [
+                PoolEndpoint(
+                    name=entry.get('name') or entry['endpoint'],
+                    endpoint=entry['endpoint'],
+                    api_key=entry['api_key'],
+                    api_version=entry.get('api_version', api_version),
+                    deployments=entry.get('deployments')
+                )
+                for entry in json.loads(configured)
+            ]
+        else:
+            endpoints = [PoolEndpoint(
+                name='default',
+                endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                api_version=api_version
+            )]
+        hedge_percentile = os.getenv('AZURE_OPENAI_HEDGE_PERCENTILE')
+        return cls(
+            endpoints,
+            hedge_percentile=float(hedge_percentile) if hedge_percentile else None,
+            hedge_min_samples=int(os.getenv('AZURE_OPENAI_HEDGE_MIN_SAMPLES', '20')),
+            cooldown=float(os.getenv('AZURE_OPENAI_THROTTLE_COOLDOWN_SECONDS', '30'))
+        )
+
+    def ranked_endpoints(self) -> list:
+        """
+        Return the endpoints ordered from best to worst score.
+        """
+        now = time.monotonic()
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.score(now))
+
+    def _call(self, endpoint: PoolEndpoint, deployment: str, messages: list, options: dict) -> str:
+        """
+        Make one chat completion call on an endpoint and record its outcome.
+        The call is bounded by the time left before the current request's deadline.
+        """
+        check_deadline()
+        client = endpoint.client
+        timeout = remaining_time()
+        if timeout is not None:
+            client = client.with_options(timeout=timeout, max_retries=0)
+        with endpoint._lock:
+            endpoint.in_flight += 1
+        started = time.monotonic()
+        try:
+            raw_response = client.chat.completions.with_raw_response.create(
+                model=deployment,
+                messages=messages,
+                **options
+            )
+            response = raw_response.parse()
+            endpoint.record_success(time.monotonic() - started, raw_response.headers)
+            return response.choices[0].message.content
+        except Exception as e:
+            # Timeouts caused by the request's own deadline say nothing about the endpoint's health
+            if not is_aborted():
+                endpoint.record_failure(e, self.cooldown)
+            raise
+        finally:
+            with endpoint._lock:
+                endpoint.in_flight -= 1
+
+    def _submit(self, endpoint: PoolEndpoint, deployment: str, messages: list, options: dict):
+        """
+        Start a call on the hedge executor, in a copy of the current context so it keeps the request's
+        deadline and cancellation flag.
+        """
+        return self._executor.submit(contextvars.copy_context().run, self._call, endpoint, deployment, messages, options)
+
+    @staticmethod
+    def _wait_first(futures: set, timeout: float = None) -> tuple:
+        """
+        Wait until one of the calls completes or `timeout` seconds passed, checking the current request's
+        deadline while waiting. Calls not started yet are cancelled when the request ends.
+
+        Returns:
+            tuple: The completed and the pending futures.
+
+        Raises:
+            DeadlineExceeded, RequestCancelled: If the request ends while waiting.
+        """
+        wait_until = None if timeout is None else time.monotonic() + timeout
+        while True:
+            interval = WAIT_CHECK_SECONDS
+            if wait_until is not None:
+                interval = min(interval, max(wait_until - time.monotonic(), 0.0))
+            left = remaining_time()
+            if left is not None:
+                interval = min(interval, left)
+            done, pending = wait(futures, timeout=interval, return_when=FIRST_COMPLETED)
+            if done or (wait_until is not None and time.monotonic() >= wait_until):
+                return done, pending
+            try:
+                check_deadline()
+            except Exception:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def _hedged_call(self, primary: PoolEndpoint, secondary: PoolEndpoint, deployments: tuple,
+                     messages: list, options: dict, hedge_delay: float) -> str:
+        """
+        Call the primary endpoint and, if it has not answered within 'hedge_delay', the secondary too.
+        Returns the first successful result. Waiting stops when the current request ends; calls still in
+        flight then run until their own deadline timeout and their results are discarded.
+        """
+        primary_future = self._submit(primary, deployments[0], messages, options)
+        done, _ = self._wait_first({primary_future}, hedge_delay)
+        if done:
+            try:
+                return primary_future.result()
+            except RETRIABLE_ERRORS as e:
+                check_deadline()
+                logger.warning(f"Endpoint '{primary.name}' failed, failing over to '{secondary.name}': {str(e)}", event_type='gpt_call_failover')
+                return self._call(secondary, deployments[1], messages, options)
+
+        logger.info(f"Endpoint '{primary.name}' exceeded {hedge_delay:.2f}s, hedging on '{secondary.name}'.", event_type='gpt_call_hedged')
+        secondary_future = self._submit(secondary, deployments[1], messages, options)
+        pending = {primary_future, secondary_future}
+        last_error = None
+        while pending:
+            done, pending = self._wait_first(pending)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                last_error = future.exception()
+        check_deadline()
+        raise last_error
+
+    def complete(self, tier: str, default_deployment: str, messages: list, **options) -> str:
+        """
+        Run a chat completion on the best endpoint, hedging or failing over as configured.
+
+        Args:
+            tier (str): The deployment tier, used to look up per-endpoint deployment names.
+            default_deployment (str): Deployment name for endpoints without a mapping for the tier.
+            messages (list): The chat messages.
+            **options: Extra arguments for the chat completions call.
+
+        Returns:
+            str: The AI-generated response.
+
+        Raises:
+            Exception: The last error if every endpoint failed.
+        """
+        ranked = self.ranked_endpoints()
+        deployments = [endpoint.deployments.get(tier, default_deployment) for endpoint in ranked]
+
+        if self._executor is not None:
+            primary = ranked[0]
+            hedge_delay = primary.latency_percentile(self.hedge_percentile)
+            if hedge_delay is not None and len(primary.latencies) >= self.hedge_min_samples:
+                try:
+                    return self._hedged_call(primary, ranked[1], (deployments[0], deployments[1]), messages, options, hedge_delay)
+                except RETRIABLE_ERRORS as e:
+                    check_deadline()
+                    logger.warning(f"Hedged call failed, failing over: {str(e)}", event_type='gpt_call_failover')
+                    ranked, deployments = ranked[2:], deployments[2:]
+                    if not ranked:
+                        raise
+
+        last_error = None
+        for endpoint, deployment in zip(ranked, deployments):
+            try:
+                return self._call(endpoint, deployment, messages, options)
+            except RETRIABLE_ERRORS as e:
+                check_deadline()
+                last_error = e
+                logger.warning(f"Endpoint '{endpoint.name}' failed, failing over: {str(e)}", event_type='gpt_call_failover')
+        raise last_error
+
+    def stream(self, tier: str, default_deployment: str, messages: list, **options):
+        """
+        Stream a chat completion from the best endpoint. Streams are not hedged, and an endpoint
+        is only failed over before it produced any content.
+
+        Args:
+            tier (str): The deployment tier, used to look up per-endpoint deployment names.
+            default_deployment (str): Deployment name for endpoints without a mapping for the tier.
+            messages (list): The chat messages.
+            **options: Extra arguments for the chat completions call.
+
+        Yields:
+            str: The content deltas of the response.
+
+        Raises:
+            Exception: The last error if every endpoint failed.
+        """
+        last_error = None
+        for endpoint in self.ranked_endpoints():
+            check_deadline()
+            client = endpoint.client
+            timeout = remaining_time()
+            if timeout is not None:
+                client = client.with_options(timeout=timeout, max_retries=0)
+            yielded = False
+            with endpoint._lock:
+                endpoint.in_flight += 1
+            started = time.monotonic()
+            try:
+                raw_response = client.chat.completions.with_raw_response.create(
+                    model=endpoint.deployments.get(tier, default_deployment),
+                    messages=messages,
+                    stream=True,
+                    **options
+                )
+                with raw_response.parse() as chunks:
+                    for chunk in chunks:
+                        # Azure sends content filter results as chunks without choices
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yielded = True
+                            yield chunk.choices[0].delta.content
+                            check_deadline()
+                endpoint.record_success(time.monotonic() - started, raw_response.headers)
+                return
+            except RETRIABLE_ERRORS as e:
+                if not is_aborted():
+                    endpoint.record_failure(e, self.cooldown)
+                if yielded:
+                    raise
+                check_deadline()
+                last_error = e
+                logger.warning(f"Endpoint '{endpoint.name}' failed, failing over: {str(e)}", event_type='gpt_call_failover')
+            finally:
+                with endpoint._lock:
+                    endpoint.in_flight -= 1
+        raise last_error
+
+
+endpoint_pool = None
+endpoint_pool_lock = threading.Lock()
+
+def get_endpoint_pool() -> EndpointPool:
+    """
+    Get or create the process-wide endpoint pool, so clients and health state are shared by all requests.
+
+    Returns:
+        EndpointPool: The endpoint pool instance.
+    """
+    global endpoint_pool
+    if endpoint_pool is None:
+        with endpoint_pool_lock:
+            if endpoint_pool is None:
+                endpoint_pool = EndpointPool.from_env()
+    return endpoint_pool
@@ -0,0 +1,62 @@
+import os
+import hashlib
+from fastapi import Response
+
+# Cache-Control of session-derived GET responses; caches may store them but must revalidate with the ETag
+CACHE_CONTROL = os.getenv('CACHE_CONTROL', 'private, no-cache')
+
+# The same URL returns different data per tenant
+VARY = 'X-Tenant-ID'
+
+
+def session_etag(kind: str, session_id: int, latest_chat_id: int, level: str) -> str:
+    """
+    Build the ETag of a response derived from a session's transcript and level.
+    It is weak because compression may change the bytes of an unchanged result.
+
+    Args:
+        kind (str): The kind of response, e.g. 'recommendation'.
+        session_id (int): The ID of the session.
+        latest_chat_id (int): The session's latest ChatHistory ID (0 without chat history).
+        level (str): The session's current level.
+
+    Returns:
+        str: The ETag header value.
+    """
+    version = hashlib.sha1(f"{kind}:{session_id}:{latest_chat_id}:{level}".encode('utf-8')).hexdigest()[:20]
+    return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison.
+
+    Args:
+        if_none_match (str): The If-None-Match header value, or None.
+        etag (str): The current ETag.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix('W/')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == opaque_tag:
+            return True
+    return False
+
+
+def cache_headers(etag: str) -> dict:
+    """
+    Return the caching headers of a session-derived response.
+    """
+    return {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Vary': VARY}
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Return a 304 response confirming the client's cached copy.
+    """
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from app.core.custom_logger import CustomLogger
+from app.core.database import engine, SessionLocal
+from app.core.cassette import get_cassette
+
+logger = CustomLogger()
+
+# Run the warm-up when the server starts; when disabled the server is ready as soon as the database answers
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() != 'false'
+
+# Pooled database connections opened during the warm-up (0 opens as many as the pool keeps)
+WARMUP_DB_CONNECTIONS = int(os.getenv('WARMUP_DB_CONNECTIONS', '0'))
+
+# Open the connections to the Azure OpenAI endpoints during the warm-up
+WARMUP_LLM_ENABLED = os.getenv('WARMUP_LLM_ENABLED', 'true').lower() != 'false'
+
+# Timeout of the warm-up request sent to each Azure OpenAI endpoint, in seconds
+WARMUP_LLM_TIMEOUT_SECONDS = float(os.getenv('WARMUP_LLM_TIMEOUT_SECONDS', '10'))
+
+# Seconds between warm-up attempts while a required step fails
+WARMUP_RETRY_SECONDS = float(os.getenv('WARMUP_RETRY_SECONDS', '5'))
+
+STEP_OK = 'ok'
+STEP_FAILED = 'failed'
+STEP_SKIPPED = 'skipped'
+
+
+def warm_up_mappers():
+    """
+    Configure every SQLAlchemy mapper now instead of on the first query.
+    """
+    configure_mappers()
+
+def warm_up_database():
+    """
+    Fill the default database's connection pool, so the first requests do not open connections.
+    """
+    size = WARMUP_DB_CONNECTIONS or (engine.pool.size() if hasattr(engine.pool, 'size') else 1)
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+def warm_up_caches():
+    """
+    Load the learning goal catalog of the default database into the cache.
+    """
+    # Imported here since the session module is not needed to check the server's health
+    from app.session.services import SessionService
+    db = SessionLocal()
+    try:
+        SessionService.get_learning_goal_ids(db)
+    finally:
+        db.close()
+
+def warm_up_llm():
+    """
+    Create the Azure OpenAI clients and open their connections with a request that uses no tokens.
+    The connections stay in the clients' pools for the first completions.
+
+    Returns:
+        str: STEP_SKIPPED when LLM calls are replayed or the LLM warm-up is disabled.
+    """
+    cassette = get_cassette()
+    if not WARMUP_LLM_ENABLED or (cassette is not None and cassette.replaying):
+        return STEP_SKIPPED
+    from app.core.endpoint_pool import get_endpoint_pool
+    from app.core.model_router import get_model_router
+    get_model_router()
+    for endpoint in get_endpoint_pool().endpoints:
+        # Shares the endpoint client's connection pool
+        endpoint.client.with_options(timeout=WARMUP_LLM_TIMEOUT_SECONDS, max_retries=0).models.list()
+
+
+class WarmUp:
+    """
+    Runs the start-up warm-up in a background thread and tracks whether the server is ready for traffic.
+
+    The mappers, database and cache steps are required: while one of them fails the warm-up is retried every
+    WARMUP_RETRY_SECONDS and the server stays not ready. The LLM step is best effort, since an LLM outage
+    should not take every replica out of rotation; its failure is only reported.
+    """
+
+    # Step name, function and whether the server can serve traffic without it
+    STEPS = (
+        ('mappers', warm_up_mappers, True),
+        ('database', warm_up_database, True),
+        ('caches', warm_up_caches, True),
+        ('llm', warm_up_llm, False),
+    )
+
+    def __init__(self):
+        """
+        Initialize the warm-up state; nothing runs until `start` is called.
+        """
+        self.steps = {}
+        self.complete = not WARMUP_ENABLED
+        self.duration = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the warm-up thread, unless the warm-up is disabled or already started.
+        """
+        with self._lock:
+            if self.complete or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='warm-up', daemon=True)
+            self._thread.start()
+
+    def _run_step(self, name: str, step) -> bool:
+        """
+        Run one step and record its status and duration.
+
+        Returns:
+            bool: Whether the step did not fail.
+        """
+        started = time.monotonic()
+        try:
+            status, error = step() or STEP_OK, None
+        except Exception as e:
+            status, error = STEP_FAILED, str(e)
+        result = {'status': status, 'ms': round((time.monotonic() - started) * 1000, 1)}
+        if error is not None:
+            result['error'] = error
+            logger.warning(f"Warm-up step '{name}' failed: {error}", event_type='warmup_step_error')
+        self.steps[name] = result
+        return status != STEP_FAILED
+
+    def _run(self):
+        """
+        Run the steps, retrying the failed required ones until they succeed.
+        """
+        started = time.monotonic()
+        pending = list(self.STEPS)
+        while pending:
+            pending = [(name, step, required) for name, step, required in pending
+                       if not self._run_step(name, step) and required]
+            if pending:
+                time.sleep(WARMUP_RETRY_SECONDS)
+        self.duration = time.monotonic() - started
+        self.complete = True
+        logger.info(f"Warm-up completed in {self.duration * 1000:.0f} ms: {self.steps}", event_type='warmup_complete')
+
+    def readiness(self) -> dict:
+        """
+        Check whether the server can take traffic: the warm-up is complete and the default database answers.
+
+        Returns:
+            dict: 'ready' (bool), 'status', 'warmup_seconds' (None until complete) and 'checks' with the
+            warm-up steps and the live database check.
+        """
+        checks = dict(self.steps)
+        started = time.monotonic()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            checks['database_ping'] = {'status': STEP_OK, 'ms': round((time.monotonic() - started) * 1000, 1)}
+        except Exception as e:
+            checks['database_ping'] = {'status': STEP_FAILED, 'error': str(e)}
+        ready = self.complete and checks['database_ping']['status'] == STEP_OK
+        return {
+            'ready': ready,
+            'status': 'ready' if ready else ('unavailable' if self.complete else 'warming_up'),
+            'warmup_seconds': round(self.duration, 3) if self.duration is not None else None,
+            'checks': checks
+        }
+
+
+warm_up = None
+warm_up_lock = threading.Lock()
+
+def get_warm_up() -> WarmUp:
+    """
+    Get or create the process-wide warm-up state.
+
+    Returns:
+        WarmUp: The warm-up instance.
+    """
+    global warm_up
+    with warm_up_lock:
+        if warm_up is None:
+            warm_up = WarmUp()
+    return warm_up
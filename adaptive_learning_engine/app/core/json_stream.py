@@ -0,0 +1,94 @@
+import re
+import json
+
+
+def complete_prefix_length(raw: str) -> int:
+    """
+    Return the length of the longest prefix of a raw JSON string body that does not end inside an
+    escape sequence, so it can be decoded on its own. A \\uXXXX high surrogate is kept together with
+    the low surrogate that follows it.
+    """
+    index = complete = 0
+    while index < len(raw):
+        if raw[index] != '\\':
+            index += 1
+        elif index + 1 >= len(raw):
+            break
+        elif raw[index + 1] != 'u':
+            index += 2
+        elif index + 6 > len(raw):
+            break
+        elif raw[index + 2:index + 4].lower() in ('d8', 'd9', 'da', 'db'):
+            if index + 12 > len(raw) and raw[index + 6:index + 8] in ('\\u', '\\', ''):
+                break
+            index += 12 if raw[index + 6:index + 8] == '\\u' else 6
+        else:
+            index += 6
+        complete = index
+    return complete
+
+
+class JSONStringFieldStream:
+    """
+    Extracts the value of one top-level string field from a JSON object while the object is
+    still being streamed, so its text can be forwarded as it arrives.
+
+    Example:
+        stream = JSONStringFieldStream('tutor_message')
+        for delta in deltas:
+            text = stream.feed(delta)
+    """
+
+    def __init__(self, field: str):
+        """
+        Initialize the extractor.
+
+        Args:
+            field (str): The name of the string field to extract.
+        """
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ''
+        self._start = None   # Index of the value's first character in the buffer
+        self._emitted = None  # Index up to which the value has been decoded
+        self._scanned = None  # Index up to which the value has been scanned for its closing quote
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a chunk of the JSON document.
+
+        Args:
+            chunk (str): The next piece of the document.
+
+        Returns:
+            str: The newly decoded text of the field, possibly empty.
+        """
+        if self.complete:
+            return ''
+        self._buffer += chunk
+        if self._start is None:
+            match = self._key.search(self._buffer)
+            if match is None:
+                return ''
+            self._start = self._emitted = self._scanned = match.end()
+
+        end = len(self._buffer)
+        for index in range(self._scanned, len(self._buffer)):
+            character = self._buffer[index]
+            if self._escaped:
+                self._escaped = False
+            elif character == '\\':
+                self._escaped = True
+            elif character == '"':
+                end = index
+                self.complete = True
+                break
+        self._scanned = end
+
+        raw = self._buffer[self._emitted:end]
+        if not self.complete:
+            # Hold back escapes that the next chunk completes
+            raw = raw[:complete_prefix_length(raw)]
+        self._emitted += len(raw)
+        return json.loads(f'"{raw}"', strict=False) if raw else ''
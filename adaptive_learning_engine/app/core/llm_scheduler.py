@@ -0,0 +1,247 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from app.core.custom_logger import CustomLogger
+from app.core.deadline import check_deadline
+from app.core.circuit_breaker import LLMUnavailable
+from app.core.model_router import TASK_CHAT_OVERVIEW, TASK_CHAT_TURN, TASK_ANALYSIS, TASK_RECOMMENDATION, TASK_SUMMARY
+
+logger = CustomLogger()
+
+# Priority classes, most urgent first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_REPORT = "report"
+PRIORITY_BATCH = "batch"
+PRIORITY_CLASSES = [PRIORITY_INTERACTIVE, PRIORITY_REPORT, PRIORITY_BATCH]
+
+# Priority class per task type; learners wait for chat turns, nobody waits for summaries
+DEFAULT_PRIORITIES = {
+    TASK_CHAT_OVERVIEW: PRIORITY_INTERACTIVE,
+    TASK_CHAT_TURN: PRIORITY_INTERACTIVE,
+    TASK_ANALYSIS: PRIORITY_REPORT,
+    TASK_RECOMMENDATION: PRIORITY_REPORT,
+    TASK_SUMMARY: PRIORITY_BATCH,
+}
+
+# Schedule LLM calls by priority; disable to let every call through immediately
+LLM_SCHEDULER_ENABLED = os.getenv('LLM_SCHEDULER_ENABLED', 'true').lower() != 'false'
+
+# Concurrent LLM calls per process
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+
+# Call slots only a class (or a more urgent one) may use, so less urgent calls never take all of them
+LLM_RESERVED_INTERACTIVE = int(os.getenv('LLM_RESERVED_INTERACTIVE', '4'))
+LLM_RESERVED_REPORT = int(os.getenv('LLM_RESERVED_REPORT', '2'))
+
+# A waiting batch call is served as a report call, reserved slots included, after this many seconds (never as an interactive one)
+LLM_AGING_SECONDS = float(os.getenv('LLM_AGING_SECONDS', '10'))
+
+# Report calls allowed to wait at once; more are turned away, so waiting requests cannot fill the worker thread pool
+LLM_MAX_QUEUED_REPORTS = int(os.getenv('LLM_MAX_QUEUED_REPORTS', '16'))
+
+# Seconds clients turned away by a full queue are asked to wait before retrying
+LLM_BUSY_RETRY_SECONDS = 5.0
+
+# Seconds between deadline checks of a waiting call
+WAIT_CHECK_SECONDS = 0.1
+
+
+class LLMBusy(LLMUnavailable):
+    """
+    Raised instead of queueing an LLM call when too many calls of its class are already waiting.
+    Handled like an open circuit breaker: a degraded answer, or 503 with Retry-After.
+    """
+
+
+class _Waiter:
+    """
+    An LLM call waiting for a slot.
+    """
+
+    def __init__(self, rank: int):
+        self.rank = rank
+        self.enqueued_at = time.monotonic()
+        self.granted = threading.Event()
+
+
+class LLMScheduler:
+    """
+    Admits a process's LLM calls in priority order, so that interactive chat turns are not slowed down
+    by report and batch calls competing for the same Azure OpenAI quota.
+
+    - At most LLM_MAX_CONCURRENCY calls run at once; the others wait for a slot.
+    - Reservations: LLM_RESERVED_INTERACTIVE slots can only be used by interactive calls, and
+      LLM_RESERVED_REPORT more only by interactive and report calls. A learner's turn thus finds a free
+      slot even while reports and batch jobs keep the rest busy.
+    - Freed slots go to the most urgent waiting call, first come first served within a class.
+    - Starvation protection: a waiting batch call counts as a report call once it has waited
+      LLM_AGING_SECONDS, for its place in line and for the reserved slots it may use, so a steady stream
+      of reports cannot hold back batch calls indefinitely. Aging never makes a call as urgent as an
+      interactive one: interactive calls always go first and keep their reserved slots, so learner-facing
+      latency does not grow with a report backlog.
+    - At most LLM_MAX_QUEUED_REPORTS report calls wait at once; further ones fail fast with LLMBusy.
+
+    Callers hold a slot for the duration of a call with `slot`.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, reserved: dict = None,
+                 aging_seconds: float = LLM_AGING_SECONDS, max_queued: dict = None):
+        """
+        Initialize the scheduler with no call running.
+
+        Args:
+            max_concurrency (int): Concurrent calls.
+            reserved (dict, optional): Reserved slots per priority class.
+            aging_seconds (float): Waiting time after which a batch call counts as a report call; 0 disables aging.
+            max_queued (dict, optional): Maximum waiting calls per priority class; unbounded when missing.
+        """
+        self.max_concurrency = max(max_concurrency, 1)
+        reserved = reserved if reserved is not None else {
+            PRIORITY_INTERACTIVE: LLM_RESERVED_INTERACTIVE, PRIORITY_REPORT: LLM_RESERVED_REPORT
+        }
+        max_queued = max_queued if max_queued is not None else {PRIORITY_REPORT: LLM_MAX_QUEUED_REPORTS}
+        self.reserved = [max(reserved.get(priority, 0), 0) for priority in PRIORITY_CLASSES]
+        self.max_queued = [max_queued.get(priority) for priority in PRIORITY_CLASSES]
+        self.aging_seconds = aging_seconds
+        self.running = [0] * len(PRIORITY_CLASSES)
+        self._waiters = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def priority_for(task_type: str) -> str:
+        """
+        Return the priority class of a task type; unknown task types are treated as reports.
+        """
+        return DEFAULT_PRIORITIES.get(task_type, PRIORITY_REPORT)
+
+    def _admissible(self, rank: int) -> bool:
+        """
+        Check whether a call of the given class may start now: the slots reserved for more urgent
+        classes and not used by them must stay free. Called with the lock held.
+        """
+        held_back = sum(max(self.reserved[more_urgent] - self.running[more_urgent], 0) for more_urgent in range(rank))
+        return sum(self.running) < self.max_concurrency - held_back
+
+    def _dispatch(self):
+        """
+        Grant free slots to the waiting calls, most urgent (after aging) first. Called with the lock held.
+        """
+        if not self._waiters:
+            return
+        now = time.monotonic()
+
+        def aged_rank(waiter):
+            if waiter.rank == 0 or self.aging_seconds <= 0:
+                return waiter.rank
+            # Aging stops short of the interactive class
+            return max(waiter.rank - int((now - waiter.enqueued_at) / self.aging_seconds), 1)
+
+        ranked = sorted(((aged_rank(waiter), waiter) for waiter in self._waiters), key=lambda item: (item[0], item[1].enqueued_at))
+        for rank, waiter in ranked:
+            if sum(self.running) >= self.max_concurrency:
+                break
+            # A call held back by a reservation does not block less restricted calls behind it
+            if self._admissible(rank):
+                self._waiters.remove(waiter)
+                self.running[waiter.rank] += 1
+                waiter.granted.set()
+
+    def acquire(self, priority: str) -> float:
+        """
+        Wait for a call slot, checking the current request's deadline while waiting.
+
+        Args:
+            priority (str): The call's priority class.
+
+        Returns:
+            float: Seconds waited.
+
+        Raises:
+            LLMBusy: If the class's queue is full.
+            DeadlineExceeded, RequestCancelled: If the request ends while waiting.
+        """
+        rank = PRIORITY_CLASSES.index(priority)
+        with self._lock:
+            limit = self.max_queued[rank]
+            if limit is not None and sum(1 for waiter in self._waiters if waiter.rank == rank) >= limit:
+                raise LLMBusy(f"Too many {priority} requests are waiting for the AI service; please retry shortly.", LLM_BUSY_RETRY_SECONDS)
+            waiter = _Waiter(rank)
+            self._waiters.append(waiter)
+            self._dispatch()
+        if waiter.granted.is_set():
+            return 0.0
+
+        try:
+            while not waiter.granted.wait(WAIT_CHECK_SECONDS):
+                check_deadline()
+                if self.aging_seconds > 0:
+                    # Waiting calls age without any other call starting or finishing
+                    with self._lock:
+                        self._dispatch()
+        except BaseException:
+            with self._lock:
+                if waiter.granted.is_set():
+                    self.running[rank] -= 1
+                    self._dispatch()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        return time.monotonic() - waiter.enqueued_at
+
+    def release(self, priority: str):
+        """
+        Free the slot of a finished call and hand it to the next waiting call.
+        """
+        with self._lock:
+            self.running[PRIORITY_CLASSES.index(priority)] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, task_type: str):
+        """
+        Hold a call slot for a task type while the block runs.
+
+        Args:
+            task_type (str): The task type of the call, which determines its priority class.
+
+        Raises:
+            LLMBusy: If the class's queue is full.
+            DeadlineExceeded, RequestCancelled: If the request ends while waiting.
+        """
+        priority = self.priority_for(task_type)
+        waited = self.acquire(priority)
+        if waited >= WAIT_CHECK_SECONDS:
+            logger.info(f"LLM call for {task_type} ({priority}) waited {waited:.2f}s for a slot.", event_type='llm_call_queued')
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def snapshot(self) -> dict:
+        """
+        Return the running and waiting calls per priority class.
+        """
+        with self._lock:
+            return {
+                priority: {"running": self.running[rank], "waiting": sum(1 for waiter in self._waiters if waiter.rank == rank)}
+                for rank, priority in enumerate(PRIORITY_CLASSES)
+            }
+
+
+llm_scheduler = None
+llm_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    Get or create the process-wide LLM scheduler.
+
+    Returns:
+        LLMScheduler: The scheduler, or None when LLM_SCHEDULER_ENABLED is false.
+    """
+    global llm_scheduler
+    if llm_scheduler is None and LLM_SCHEDULER_ENABLED:
+        with llm_scheduler_lock:
+            if llm_scheduler is None:
+                llm_scheduler = LLMScheduler()
+    return llm_scheduler
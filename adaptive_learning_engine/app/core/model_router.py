@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Task types routed by the ModelRouter
+TASK_CHAT_OVERVIEW = "chat_overview"
+TASK_CHAT_TURN = "chat_turn"
+TASK_ANALYSIS = "analysis"
+TASK_RECOMMENDATION = "recommendation"
+TASK_SUMMARY = "summary"
+
+# Deployment tiers
+TIER_FAST = "fast"
+TIER_LARGE = "large"
+
+# Default tier per task type; cheap interactive turns go to the fast tier
+DEFAULT_ROUTES = {
+    TASK_CHAT_OVERVIEW: TIER_FAST,
+    TASK_CHAT_TURN: TIER_FAST,
+    TASK_ANALYSIS: TIER_LARGE,
+    TASK_RECOMMENDATION: TIER_LARGE,
+    TASK_SUMMARY: TIER_FAST,
+}
+
+
+class ModelRouter:
+    """
+    Maps task types to Azure OpenAI deployment tiers and falls back to the other tier
+    when the preferred one is slow or throttled.
+
+    Configuration (environment variables):
+        AZURE_OPENAI_FAST_MODEL_NAME: Deployment for the fast tier. Defaults to AZURE_OPENAI_MODEL_NAME.
+        AZURE_OPENAI_LARGE_MODEL_NAME: Deployment for the large tier. Defaults to AZURE_OPENAI_MODEL_NAME.
+        AZURE_OPENAI_ROUTES: Per-route overrides as comma-separated 'task=tier' pairs, e.g. 'analysis=fast'.
+        AZURE_OPENAI_SLOW_THRESHOLD_SECONDS: Average latency above which a tier counts as slow. Defaults to 20.
+        AZURE_OPENAI_THROTTLE_COOLDOWN_SECONDS: How long a slow or throttled tier is avoided. Defaults to 30.
+    """
+
+    # Smoothing factor of the exponentially weighted latency average
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self):
+        """
+        Initialize the router from the environment.
+        """
+        default_model = os.getenv('AZURE_OPENAI_MODEL_NAME')
+        self.deployments = {
+            TIER_FAST: os.getenv('AZURE_OPENAI_FAST_MODEL_NAME') or default_model,
+            TIER_LARGE: os.getenv('AZURE_OPENAI_LARGE_MODEL_NAME') or default_model,
+        }
+        self.routes = {**DEFAULT_ROUTES, **self._parse_routes(os.getenv('AZURE_OPENAI_ROUTES', ''))}
+        self.slow_threshold = float(os.getenv('AZURE_OPENAI_SLOW_THRESHOLD_SECONDS', '20'))
+        self.throttle_cooldown = float(os.getenv('AZURE_OPENAI_THROTTLE_COOLDOWN_SECONDS', '30'))
+        self._latency = {}
+        self._avoid_until = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_routes(value: str) -> dict:
+        """
+        Parse 'task=tier' overrides, ignoring malformed entries and unknown tiers.
+
+        Args:
+            value (str): Comma-separated 'task=tier' pairs.
+
+        Returns:
+            dict: Task type to tier.
+        """
+        routes = {}
+        for pair in value.split(','):
+            task_type, _, tier = pair.partition('=')
+            task_type, tier = task_type.strip(), tier.strip().lower()
+            if task_type and tier in (TIER_FAST, TIER_LARGE):
+                routes[task_type] = tier
+            elif pair.strip():
+                logger.warning(f"Ignoring invalid model route '{pair.strip()}'.", event_type='model_route_invalid')
+        return routes
+
+    @staticmethod
+    def other_tier(tier: str) -> str:
+        """
+        Return the alternative tier.
+        """
+        return TIER_LARGE if tier == TIER_FAST else TIER_FAST
+
+    def _is_healthy(self, tier: str, now: float) -> bool:
+        """
+        A tier is healthy unless it is in the cooldown that follows a throttle or a slow latency average.
+        """
+        return self._avoid_until.get(tier, 0) <= now
+
+    def select_tier(self, task_type: str = None) -> str:
+        """
+        Select the tier for a task type, falling back to the other tier if the preferred one is unhealthy
+        and the other one is not.
+
+        Args:
+            task_type (str, optional): The task type. Unknown or missing task types use the large tier.
+
+        Returns:
+            str: The selected tier.
+        """
+        preferred = self.routes.get(task_type, TIER_LARGE)
+        alternative = self.other_tier(preferred)
+        if self.deployments[preferred] == self.deployments[alternative]:
+            return preferred
+        now = time.monotonic()
+        with self._lock:
+            if not self._is_healthy(preferred, now) and self._is_healthy(alternative, now):
+                logger.warning(f"Tier '{preferred}' is slow or throttled, routing {task_type} to '{alternative}'.", event_type='model_route_fallback')
+                return alternative
+        return preferred
+
+    def deployment_for(self, tier: str) -> str:
+        """
+        Return the deployment name configured for a tier.
+        """
+        return self.deployments[tier]
+
+    def record_latency(self, tier: str, seconds: float):
+        """
+        Fold a successful call's latency into the tier's moving average. A tier whose average exceeds the
+        threshold is avoided for the cooldown and its average restarts, so it is re-probed afterwards.
+        """
+        with self._lock:
+            previous = self._latency.get(tier)
+            average = seconds if previous is None else (
+                self.LATENCY_SMOOTHING * seconds + (1 - self.LATENCY_SMOOTHING) * previous
+            )
+            if average > self.slow_threshold:
+                self._avoid_until[tier] = time.monotonic() + self.throttle_cooldown
+                self._latency.pop(tier, None)
+            else:
+                self._latency[tier] = average
+
+    def record_throttle(self, tier: str):
+        """
+        Mark a tier as throttled (or timed out) for the cooldown period.
+        """
+        with self._lock:
+            self._avoid_until[tier] = time.monotonic() + self.throttle_cooldown
+
+
+model_router = None
+
+def get_model_router() -> ModelRouter:
+    """
+    Get or create the process-wide model router, so latency and throttle state is shared by all requests.
+
+    Returns:
+        ModelRouter: The model router instance.
+    """
+    global model_router
+    if model_router is None:
+        model_router = ModelRouter()
+    return model_router
@@ -1,6 +1,13 @@
-import os
-from openai import AzureOpenAI
+import time
+from contextlib import nullcontext
+from openai import RateLimitError, APITimeoutError
 from app.core.custom_logger import CustomLogger
+from app.core.model_router import get_model_router
+from app.core.endpoint_pool import get_endpoint_pool, RETRIABLE_ERRORS
+from app.core.deadline import check_deadline, RequestAborted
+from app.core.cassette import get_cassette
+from app.core.circuit_breaker import get_circuit_breaker, LLMUnavailable
+from app.core.llm_scheduler import get_llm_scheduler
 
 logger = CustomLogger()
 
@@ -11,80 +18,239 @@ class OpenAIService:
 
     def __init__(self):
         """
-        Initialize the OpenAIService and set up logging.
+        Initialize the OpenAIService with the shared endpoint pool and model router.
+        Replayed runs need no endpoint configuration.
         """
-        self.client = self._get_openai_client()
+        cassette = get_cassette()
+        self.pool = None if cassette is not None and cassette.replaying else get_endpoint_pool()
+        self.router = get_model_router()
 
-    def _get_openai_client(self) -> AzureOpenAI:
+    @staticmethod
+    def _record_outcome(breaker, seconds: float, error: Exception = None):
         """
-        Get an instance of the Azure OpenAI client.
+        Report an LLM call admitted by the circuit breaker. Throttling, timeouts, connection and server errors
+        count as failures; calls the client cancelled only count if they were already slow. Any other error
+        means the LLM did answer.
+        """
+        if breaker is None:
+            return
+        if isinstance(error, RETRIABLE_ERRORS):
+            breaker.record_failure()
+        elif isinstance(error, RequestAborted) and seconds < breaker.slow_call_seconds:
+            breaker.release()
+        else:
+            breaker.record_success(seconds)
+
+    def _create_completion(self, system_prompt: str, user_prompt: str, task_type: str = None, **options) -> str:
+        """
+        Call the deployment routed for the task type through the endpoint pool, retrying once on the
+        other tier if every endpoint is throttled or times out. The call first waits for a slot of the
+        LLM scheduler, in the priority order of its task type.
+
+        Args:
+            system_prompt (str): The system-level instruction to guide the AI behavior.
+            user_prompt (str): The user's input question or request.
+            task_type (str, optional): The task type used for model routing.
+            **options: Extra arguments for the chat completions call.
 
         Returns:
-            AzureOpenAI: Configured OpenAI client instance.
+            str: The AI-generated response.
+
+        Raises:
+            LLMUnavailable: If the circuit breaker is open, or too many calls of the same priority are waiting (LLMBusy).
         """
-        try:
-            client = AzureOpenAI(
-                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-                api_version="2024-02-01",
-                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-            )
-            logger.info("Successfully initialized OpenAI client.", event_type='openai_client_init')
-            return client
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client: {str(e)}", event_type='openai_client_error')
-            raise Exception("Error connecting to AI service. Please try again later.")
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            ai_response, latency = cassette.replay(system_prompt, user_prompt, task_type, options)
+            time.sleep(latency)
+            return ai_response
+        scheduler = get_llm_scheduler()
+        with scheduler.slot(task_type) if scheduler is not None else nullcontext():
+            # Fails fast with LLMUnavailable while the LLM is down
+            breaker = get_circuit_breaker()
+            if breaker is not None:
+                breaker.before_call()
+            recording_started = time.monotonic()
+            try:
+                ai_response = self._call_tiers(system_prompt, user_prompt, task_type, options)
+            except Exception as e:
+                self._record_outcome(breaker, time.monotonic() - recording_started, e)
+                raise
+            self._record_outcome(breaker, time.monotonic() - recording_started)
+        if cassette is not None:
+            cassette.record(system_prompt, user_prompt, task_type, options, ai_response, time.monotonic() - recording_started)
+        return ai_response
 
-    def generate_response(self, system_prompt: str, user_prompt: str) -> str:
+    def _call_tiers(self, system_prompt: str, user_prompt: str, task_type: str, options: dict) -> str:
+        """
+        Call the tier routed for the task type, then the other tier if the first is throttled or times out.
+        """
+        tier = self.router.select_tier(task_type)
+        tiers = [tier]
+        if self.router.deployment_for(self.router.other_tier(tier)) != self.router.deployment_for(tier):
+            tiers.append(self.router.other_tier(tier))
+
+        for attempt, tier in enumerate(tiers):
+            started = time.monotonic()
+            try:
+                ai_response = self.pool.complete(
+                    tier,
+                    self.router.deployment_for(tier),
+                    [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    **options
+                )
+            except (RateLimitError, APITimeoutError) as e:
+                check_deadline()
+                self.router.record_throttle(tier)
+                if attempt == len(tiers) - 1:
+                    raise
+                logger.warning(f"Tier '{tier}' throttled or timed out for {task_type}, retrying on the other tier: {str(e)}", event_type='gpt_call_fallback')
+                continue
+            self.router.record_latency(tier, time.monotonic() - started)
+            return ai_response
+
+    def generate_response(self, system_prompt: str, user_prompt: str, task_type: str = None) -> str:
         """
         Generate a response from the Azure OpenAI GPT model.
 
         Args:
             system_prompt (str): The system-level instruction to guide the AI behavior.
             user_prompt (str): The user's input question or request.
+            task_type (str, optional): The task type used to pick the deployment tier.
 
         Returns:
             str: The AI-generated response.
         """
         try:
             logger.info("Calling OpenAI GPT model...", event_type='gpt_call')
-            response = self.client.chat.completions.create(
-                model=os.getenv('AZURE_OPENAI_MODEL_NAME'),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            ai_response = response.choices[0].message.content
+            ai_response = self._create_completion(system_prompt, user_prompt, task_type)
             logger.info("Received response from OpenAI GPT model.", event_type='gpt_response_success')
             return ai_response
+        except (LLMUnavailable, RequestAborted):
+            raise
         except Exception as e:
             logger.error(f"Error during GPT call: {str(e)}", event_type='gpt_call_error')
             raise Exception("AI response generation failed. Please try again later.")
         
-    def generate_response_json(self, system_prompt: str, user_prompt: str) -> str:
+    def generate_response_json(self, system_prompt: str, user_prompt: str, task_type: str = None) -> str:
         """
         Generate a response from the Azure OpenAI GPT model in JSON format.
 
         Args:
             system_prompt (str): The system-level instruction to guide the AI behavior.
             user_prompt (str): The user's input question or request.
+            task_type (str, optional): The task type used to pick the deployment tier.
 
         Returns:
             str: The AI-generated response.
         """
         try:
             logger.info("Calling OpenAI GPT model...", event_type='gpt_call')
-            response = self.client.chat.completions.create(
-                model=os.getenv('AZURE_OPENAI_MODEL_NAME'),
-                response_format={ "type": "json_object" },
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
+            ai_response = self._create_completion(
+                system_prompt, user_prompt, task_type, response_format={ "type": "json_object" }
             )
-            ai_response = response.choices[0].message.content
             logger.info("Received response from OpenAI GPT model.", event_type='gpt_response_success')
             return ai_response
+        except (LLMUnavailable, RequestAborted):
+            raise
         except Exception as e:
             logger.error(f"Error during GPT call: {str(e)}", event_type='gpt_call_error')
-            raise Exception("AI response generation failed. Please try again later.")
\ No newline at end of file
+            raise Exception("AI response generation failed. Please try again later.")
+
+    def stream_response_json(self, system_prompt: str, user_prompt: str, task_type: str = None):
+        """
+        Stream a JSON-format response from the Azure OpenAI GPT model. The other tier is only tried
+        if the routed one is throttled or times out before producing any content. The stream holds a
+        slot of the LLM scheduler until it is exhausted or closed.
+
+        Args:
+            system_prompt (str): The system-level instruction to guide the AI behavior.
+            user_prompt (str): The user's input question or request.
+            task_type (str, optional): The task type used to pick the deployment tier.
+
+        Yields:
+            str: The content deltas of the AI-generated response.
+
+        Raises:
+            LLMUnavailable: If the circuit breaker is open, or too many calls of the same priority are waiting (LLMBusy).
+        """
+        options = {"response_format": { "type": "json_object" }}
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            deltas, latency = cassette.replay(system_prompt, user_prompt, task_type, {**options, "stream": True})
+            for delta in deltas:
+                time.sleep(latency / len(deltas))
+                yield delta
+            return
+        scheduler = get_llm_scheduler()
+        with scheduler.slot(task_type) if scheduler is not None else nullcontext():
+            yield from self._stream_tiers(system_prompt, user_prompt, task_type, options, cassette)
+
+    def _stream_tiers(self, system_prompt: str, user_prompt: str, task_type: str, options: dict, cassette):
+        """
+        Stream from the tier routed for the task type, then from the other tier if the first is throttled
+        or times out before producing any content, reporting the outcome to the circuit breaker.
+        """
+        breaker = get_circuit_breaker()
+        if breaker is not None:
+            breaker.before_call()
+        recording_started = time.monotonic()
+        recorded_deltas = []
+        # The breaker learns the outcome at the first token; later errors do not tell it more
+        reported = False
+
+        tier = self.router.select_tier(task_type)
+        tiers = [tier]
+        if self.router.deployment_for(self.router.other_tier(tier)) != self.router.deployment_for(tier):
+            tiers.append(self.router.other_tier(tier))
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        try:
+            logger.info("Streaming from OpenAI GPT model...", event_type='gpt_call')
+            for attempt, tier in enumerate(tiers):
+                started = time.monotonic()
+                yielded = False
+                try:
+                    for delta in self.pool.stream(tier, self.router.deployment_for(tier), messages, **options):
+                        if not yielded:
+                            # Time to first token is what the learner waits for
+                            self.router.record_latency(tier, time.monotonic() - started)
+                            yielded = True
+                            if not reported:
+                                self._record_outcome(breaker, time.monotonic() - recording_started)
+                                reported = True
+                        recorded_deltas.append(delta)
+                        yield delta
+                except (RateLimitError, APITimeoutError) as e:
+                    check_deadline()
+                    self.router.record_throttle(tier)
+                    if yielded or attempt == len(tiers) - 1:
+                        raise
+                    logger.warning(f"Tier '{tier}' throttled or timed out for {task_type}, retrying on the other tier: {str(e)}", event_type='gpt_call_fallback')
+                    continue
+                logger.info("Received response from OpenAI GPT model.", event_type='gpt_response_success')
+                if not reported:
+                    self._record_outcome(breaker, time.monotonic() - recording_started)
+                    reported = True
+                if cassette is not None:
+                    cassette.record(system_prompt, user_prompt, task_type, {**options, "stream": True},
+                                    recorded_deltas, time.monotonic() - recording_started)
+                return
+        except Exception as e:
+            if not reported:
+                self._record_outcome(breaker, time.monotonic() - recording_started, e)
+                reported = True
+            if isinstance(e, RequestAborted):
+                raise
+            logger.error(f"Error during GPT call: {str(e)}", event_type='gpt_call_error')
+            raise Exception("AI response generation failed. Please try again later.")
+        finally:
+            if not reported and breaker is not None:
+                # Closed by the caller before the first token
+                breaker.release()
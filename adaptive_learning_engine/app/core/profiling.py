@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import random
+import pstats
+import cProfile
+import functools
+import asyncio
+from datetime import datetime
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from app.core.contextvar import request_profile_context
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Profiling is only wired in when enabled; otherwise neither the middleware nor the endpoint wrappers exist
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+
+# Requests carrying an X-Profile header with this value are profiled (unset disables the header trigger)
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+
+# Fraction of requests profiled at random, e.g. 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+
+# Profile timer: 'wall' (time including waits on the LLM and the database) or 'cpu' (time spent computing)
+PROFILE_TIMER = os.getenv('PROFILE_TIMER', 'wall')
+
+# Directory the profiles are written to, and how many are kept there
+PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '100'))
+
+PROFILE_HEADER = b'x-profile'
+
+
+def profiled(endpoint):
+    """
+    Wrap a synchronous endpoint so it runs under cProfile when the current request is being profiled.
+    The endpoint runs in a worker thread, which is the thread the profiler has to be enabled in.
+    Requests that are not profiled only pay for one context variable lookup.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = request_profile_context.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile(time.thread_time if PROFILE_TIMER == 'cpu' else time.perf_counter)
+        cpu_started = time.thread_time()
+        profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile['cpu_seconds'] += time.thread_time() - cpu_started
+            profile['profilers'].append(profiler)
+    wrapper.is_profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    API route whose synchronous endpoint can be profiled per request by ProfilingMiddleware.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # Routes are copied with their wrapped endpoint when routers are included in other routers
+        if PROFILING_ENABLED and not asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, 'is_profiled', False):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests triggered by the X-Profile header (matching PROFILE_TOKEN)
+    or sampled at PROFILE_SAMPLE_RATE, and writes each profile to PROFILE_DIR:
+
+    - `<id>.prof`: cProfile statistics of the endpoint, including the DAO and formatting frames
+      (read with `python -m pstats` or snakeviz).
+    - `<id>.json`: method, path, status, wall time of the whole request and CPU time of the endpoint.
+
+    Only the newest PROFILE_MAX_FILES profiles are kept. Profiled responses carry an X-Profile-Id header.
+    """
+
+    def __init__(self, app):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+        """
+        self.app = app
+
+    @staticmethod
+    def _triggered(scope) -> bool:
+        """
+        Decide whether a request is profiled.
+        """
+        if PROFILE_TOKEN:
+            for name, value in scope.get('headers', []):
+                if name == PROFILE_HEADER:
+                    return value.decode('latin-1') == PROFILE_TOKEN
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self._triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{random.getrandbits(32):08x}"
+        profile = {'profilers': [], 'cpu_seconds': 0.0}
+        status = None
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message = {**message, 'headers': [*message.get('headers', []), (b'x-profile-id', profile_id.encode())]}
+            await send(message)
+
+        token = request_profile_context.set(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            wall_seconds = time.perf_counter() - started
+            request_profile_context.reset(token)
+            summary = {
+                'id': profile_id,
+                'method': scope.get('method'),
+                'path': scope.get('path'),
+                'status': status,
+                'timer': PROFILE_TIMER,
+                'wall_ms': round(wall_seconds * 1000, 3),
+                'endpoint_cpu_ms': round(profile['cpu_seconds'] * 1000, 3)
+            }
+            try:
+                await run_in_threadpool(self._write, profile_id, profile['profilers'], summary)
+            except Exception as e:
+                logger.error(f"Failed to write profile {profile_id}: {str(e)}", event_type='profile_write_error')
+
+    @staticmethod
+    def _write(profile_id: str, profilers: list, summary: dict):
+        """
+        Write a request's profile and summary, then remove the oldest profiles beyond PROFILE_MAX_FILES.
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if profilers:
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), 'w') as summary_file:
+            json.dump(summary, summary_file)
+        logger.info(f"Profile {profile_id} written for {summary['method']} {summary['path']} ({summary['wall_ms']} ms).", event_type='profile_written')
+
+        # IDs start with the timestamp, so name order is age order
+        profile_ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(PROFILE_DIR) if name.endswith(('.prof', '.json'))})
+        for old_id in profile_ids[:max(len(profile_ids) - PROFILE_MAX_FILES, 0)]:
+            for extension in ('.prof', '.json'):
+                path = os.path.join(PROFILE_DIR, old_id + extension)
+                if os.path.exists(path):
+                    os.remove(path)
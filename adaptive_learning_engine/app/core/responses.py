@@ -0,0 +1,63 @@
+import json
+import uuid
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used instead
+    orjson = None
+
+# Placeholder prefix for RawJSON values while the surrounding document is encoded
+RAW_JSON_MARKER = f"__raw_json_{uuid.uuid4().hex}_"
+
+
+class RawJSON:
+    """
+    A JSON document that is already encoded (e.g. a pydantic model's `model_dump_json()` output).
+    Embedded as-is by `FastJSONResponse` instead of being encoded again as a string.
+    """
+    __slots__ = ('json',)
+
+    def __init__(self, json_text):
+        """
+        Args:
+            json_text (str | bytes): A valid JSON document.
+        """
+        self.json = json_text.encode('utf-8') if isinstance(json_text, str) else json_text
+
+
+def dumps(content) -> bytes:
+    """
+    Encode content as compact UTF-8 JSON, with orjson when it is installed.
+    RawJSON values are spliced into the output unchanged.
+
+    Args:
+        content: The JSON-compatible content.
+
+    Returns:
+        bytes: The encoded document.
+    """
+    fragments = []
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.json)
+            return f"{RAW_JSON_MARKER}{len(fragments) - 1}"
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    if orjson is not None:
+        body = orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        body = json.dumps(content, default=default, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    for index, fragment in enumerate(fragments):
+        body = body.replace(f'"{RAW_JSON_MARKER}{index}"'.encode(), fragment, 1)
+    return body
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson (falling back to the standard library), supporting RawJSON values.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter
 from app.core.constants import error_responses
+from app.core.responses import FastJSONResponse
 from app.session.endpoints import session_router
 from app.chatWithLearner.endpoints import chat
 from app.analysis.endpoints import analysis
 
 core_router = APIRouter(prefix="",
-                        responses=error_responses
+                        responses=error_responses,
+                        default_response_class=FastJSONResponse
                         )
 
 core_router.include_router(session_router)
@@ -0,0 +1,79 @@
+import re
+import json
+from app.core.contextvar import tenant_context
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Headers identifying the tenant (school) and the user of a request
+TENANT_HEADER = b'x-tenant-id'
+EMAIL_HEADER = b'x-user-email'
+
+# Tenant IDs become part of database file names, so only simple identifiers are accepted
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+
+class TenantMiddleware:
+    """
+    ASGI middleware that resolves the tenant of every HTTP and WebSocket request from the X-Tenant-ID header
+    and populates `tenant_context`, which routes database sessions to the tenant's database and tags log lines.
+
+    Requests without the header use the default database. Requests with a malformed tenant ID are rejected with 400.
+    """
+
+    def __init__(self, app):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+        """
+        self.app = app
+
+    @staticmethod
+    def _resolve(scope) -> dict:
+        """
+        Read the tenant and user from the request headers.
+        """
+        context = {}
+        for name, value in scope.get('headers', []):
+            if name == TENANT_HEADER:
+                context['tenant_id'] = value.decode('latin-1').strip()
+            elif name == EMAIL_HEADER:
+                context['email_id'] = value.decode('latin-1').strip()
+        return context
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            await self.app(scope, receive, send)
+            return
+
+        context = self._resolve(scope)
+        tenant_id = context.get('tenant_id')
+        if tenant_id is not None and not TENANT_ID_PATTERN.match(tenant_id):
+            logger.warning(f"Rejected request to {scope.get('path')} with invalid tenant ID.", event_type='tenant_invalid')
+            await self._reject(scope, send)
+            return
+
+        token = tenant_context.set(context)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            tenant_context.reset(token)
+
+    @staticmethod
+    async def _reject(scope, send):
+        """
+        Reject a request with a malformed tenant ID.
+        """
+        if scope['type'] == 'websocket':
+            # Policy violation; the handshake is refused
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        body = json.dumps({"detail": "Invalid tenant ID"}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 400,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
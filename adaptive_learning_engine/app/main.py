@@ -1,15 +1,104 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.exception_handlers import http_exception_handler
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.core.custom_logger import CustomLogger
 from app.core.routers import core_router
+from app.core.database import register_schema, on_tenant_engine_created, UnknownTenant
+from app.analysis.models import Base as AnalysisBase
+from app.archive.models import Base as ArchiveBase
+from app.summary.models import Base as SummaryBase
+from app.chatWithLearner.models import Base as ChatBase
+from app.misconceptions.models import Base as MisconceptionBase
+from app.ability.models import Base as AbilityBase
+from app.core.deadline import DeadlineMiddleware, DeadlineExceeded, RequestAborted, aborted_error
+from app.core.tenant import TenantMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.profiling import ProfilingMiddleware, PROFILING_ENABLED
+from app.core.health import get_warm_up
+from app.core.circuit_breaker import LLMUnavailable
+from app.chatWithLearner.services import get_deferred_turn_worker
 
 logger = CustomLogger()
 
+# Table metadata of the application; the tables and indexes introduced after the initial schema are created
+# (existing tables are left untouched) on the default database at start-up and on each tenant database when first used
+APPLICATION_SCHEMAS = (
+    AnalysisBase.metadata, ArchiveBase.metadata, SummaryBase.metadata,
+    ChatBase.metadata, MisconceptionBase.metadata, AbilityBase.metadata
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for metadata in APPLICATION_SCHEMAS:
+        register_schema(metadata)
+    # Warm up in the background; the readiness endpoint reports 503 until it completes
+    get_warm_up().start()
+    # Answer the turns deferred before the restart; tenant databases are resumed when first used
+    get_deferred_turn_worker().resume()
+    yield
+
 # Initialize FastAPI app
-app = FastAPI(title="Adaptive Learning Engine", version="1.0")
+app = FastAPI(title="Adaptive Learning Engine", version="1.0", lifespan=lifespan)
+
+# Compress large JSON and NDJSON responses with brotli or gzip, as negotiated with the client
+app.add_middleware(CompressionMiddleware)
+
+# Bound every request by a deadline and cancel its work when the client disconnects
+app.add_middleware(DeadlineMiddleware)
+
+# Resolve the tenant of every request; database sessions are routed to the tenant's database
+app.add_middleware(TenantMiddleware)
+
+# Profile requests selected by the X-Profile header or sampling; not installed at all unless enabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+def request_aborted_response(exc: RequestAborted) -> JSONResponse:
+    if isinstance(exc, DeadlineExceeded):
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    # The client is gone; the status is only visible in access logs
+    return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+
+@app.exception_handler(RequestAborted)
+def request_aborted_handler(request: Request, exc: RequestAborted):
+    return request_aborted_response(exc)
+
+@app.exception_handler(StarletteHTTPException)
+async def http_error_handler(request: Request, exc: StarletteHTTPException):
+    # Endpoints turn the errors they catch into 500s; one raised because the request ended is reported as such
+    aborted = aborted_error(exc) if exc.status_code >= 500 else None
+    if aborted is not None:
+        return request_aborted_response(aborted)
+    return await http_exception_handler(request, exc)
+
+@app.exception_handler(UnknownTenant)
+def unknown_tenant_handler(request: Request, exc: UnknownTenant):
+    return JSONResponse(status_code=404, content={"detail": "Unknown tenant"})
+
+@app.exception_handler(LLMUnavailable)
+def llm_unavailable_handler(request: Request, exc: LLMUnavailable):
+    # Raised by the LLM circuit breaker without waiting for the AI service
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(int(exc.retry_after + 0.999), 1))})
+
+on_tenant_engine_created(lambda tenant_id: get_deferred_turn_worker().resume(tenant_id))
 
 @app.get("/")
 def root():
     """Root endpoint to check API health."""
     return {"message": "Adaptive Learning Engine API is running"}
 
+@app.get("/health/live")
+def liveness():
+    """Liveness endpoint: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    """Readiness endpoint: 200 once the start-up warm-up completed and the database answers, 503 otherwise."""
+    result = get_warm_up().readiness()
+    return JSONResponse(status_code=200 if result.pop('ready') else 503, content=result)
+
 app.include_router(core_router)
\ No newline at end of file
@@ -0,0 +1,272 @@
+import re
+import zlib
+import itertools
+import numpy as np
+
+# Size of the hashed feature space; changing it requires rebuilding the clusters
+HASH_DIMENSIONS = 2 ** 14
+
+# Minimum cosine similarity between a misconception and a cluster centroid for the misconception to join it
+SIMILARITY_THRESHOLD = 0.45
+
+# Maximum number of clusters per learning goal; once reached, misconceptions join the most similar cluster
+MAX_CLUSTERS = 300
+
+# Features kept per stored centroid, by weight
+CENTROID_FEATURES = 512
+
+# Upper bound on the entries of the cluster-by-feature products computed at once
+SIMILARITY_CHUNK_ENTRIES = 4_000_000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset((
+    "a an the of to and or in on at for with by from as is are was were be been being it its this that these those "
+    "their they he she his her learner student students user seems seem may might not no does do did doesn don t s "
+    "when while which who what how about into than then there some any all can could would should has have had "
+    "instead between because so such also only just very more most other same e g eg ie etc"
+).split())
+
+
+class SparseRows:
+    """
+    Rows of L2-normalized sparse vectors in compressed sparse row layout: the features of row i are
+    `indices[indptr[i]:indptr[i + 1]]` with weights `data[indptr[i]:indptr[i + 1]]`, in ascending feature order.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row_ids(self) -> np.ndarray:
+        """
+        Return the row of every stored feature.
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+
+class MisconceptionVectorizer:
+    """
+    Hashing TF-IDF vectorizer for short misconception strings.
+
+    Unigrams and bigrams (without stop words) are hashed with CRC32 into HASH_DIMENSIONS features, so no
+    vocabulary has to be kept and the vectors of different runs are comparable. Document frequencies are
+    accumulated across runs, making the IDF weights incremental.
+    """
+
+    def __init__(self, dimensions: int = HASH_DIMENSIONS, document_frequencies: np.ndarray = None, documents: int = 0):
+        """
+        Initialize the vectorizer, optionally with the statistics of earlier runs.
+
+        Args:
+            dimensions (int): Size of the hashed feature space.
+            document_frequencies (np.ndarray, optional): Number of strings containing each feature so far.
+            documents (int): Number of strings vectorized so far.
+        """
+        self.dimensions = dimensions
+        self.document_frequencies = (
+            np.zeros(dimensions, dtype=np.int64) if document_frequencies is None else document_frequencies
+        )
+        self.documents = documents
+        self._feature_cache = {}
+
+    def features(self, text: str) -> list:
+        """
+        Return the hashed features of a string, one entry per occurrence.
+        """
+        tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+        terms = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        cache = self._feature_cache
+        features = []
+        for term in terms:
+            feature = cache.get(term)
+            if feature is None:
+                feature = cache[term] = zlib.crc32(term.encode()) % self.dimensions
+            features.append(feature)
+        return features
+
+    def vectorize(self, texts: list, counts: np.ndarray = None, update: bool = True) -> SparseRows:
+        """
+        Turn strings into L2-normalized TF-IDF vectors with sublinear term frequencies.
+        Strings without features (only stop words) become empty rows.
+
+        Args:
+            texts (list): The strings.
+            counts (np.ndarray, optional): Number of occurrences of each string, when repeated strings
+                are vectorized once. Defaults to 1.
+            update (bool): Add the strings to the document frequencies first.
+
+        Returns:
+            SparseRows: One row per string.
+        """
+        row_features = [self.features(text) for text in texts]
+        lengths = np.fromiter((len(features) for features in row_features), dtype=np.int64, count=len(texts))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        columns = np.fromiter(itertools.chain.from_iterable(row_features), dtype=np.int64, count=int(lengths.sum()))
+
+        # Sorted unique (row, feature) pairs with their term counts
+        keys, term_counts = np.unique(rows * self.dimensions + columns, return_counts=True)
+        rows, columns = keys // self.dimensions, keys % self.dimensions
+        if update:
+            if counts is None:
+                self.document_frequencies += np.bincount(columns, minlength=self.dimensions)
+                self.documents += len(texts)
+            else:
+                self.document_frequencies += np.bincount(columns, weights=counts[rows], minlength=self.dimensions).astype(np.int64)
+                self.documents += int(counts.sum())
+
+        idf = np.log((1.0 + self.documents) / (1.0 + self.document_frequencies[columns])) + 1.0
+        data = (1.0 + np.log(term_counts)) * idf
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(texts)))
+        data = (data / norms[rows]).astype(np.float32)
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(texts)))))
+        return SparseRows(indptr, columns.astype(np.int32), data)
+
+
+class MisconceptionClusterer:
+    """
+    Incremental (single-pass, leader-style) clustering of normalized sparse vectors by cosine similarity.
+
+    Each vector joins the most similar cluster if the similarity reaches the threshold, and founds a new
+    cluster otherwise. Vectors are assigned in batches: similarities to the existing centroids are computed
+    for the whole batch at once, and only the vectors left unassigned are handled one by one, against the
+    clusters founded meanwhile too. Centroids are the normalized (weighted) sums of their vectors and are
+    updated after every batch.
+
+    The sums are kept feature-major (one row per feature, one column per cluster, plus a zero row used as
+    padding), so a vector's similarities only read the rows of its few features.
+    """
+
+    def __init__(self, dimensions: int = HASH_DIMENSIONS, threshold: float = SIMILARITY_THRESHOLD,
+                 max_clusters: int = MAX_CLUSTERS, sums: list = None):
+        """
+        Initialize the clusterer, optionally with the centroid sums of existing clusters.
+
+        Args:
+            dimensions (int): Size of the feature space.
+            threshold (float): Minimum cosine similarity to join a cluster.
+            max_clusters (int): Maximum number of clusters.
+            sums (list, optional): (indices, values) arrays of each existing cluster's vector sum.
+        """
+        sums = sums or []
+        self.threshold = threshold
+        self.max_clusters = max(max_clusters, len(sums))
+        self.dimensions = dimensions
+        self.sums = np.zeros((dimensions + 1, self.max_clusters), dtype=np.float32)
+        self.norms = np.zeros(self.max_clusters, dtype=np.float32)
+        for cluster, (indices, values) in enumerate(sums):
+            self.sums[indices, cluster] = values
+        self.count = len(sums)
+        self._update_norms(np.arange(self.count))
+
+    def _update_norms(self, clusters: np.ndarray):
+        """
+        Recompute the norms of the given clusters' sums.
+        """
+        self.norms[clusters] = np.maximum(np.linalg.norm(self.sums[:, clusters], axis=0), 1e-12)
+
+    def _similarities(self, vectors: SparseRows, rows: np.ndarray) -> np.ndarray:
+        """
+        Compute the cosine similarity of the non-empty rows (`rows`, in ascending order) to every current centroid.
+
+        Returns:
+            np.ndarray: A (rows, clusters) matrix.
+        """
+        similarities = np.zeros((len(rows), self.count), dtype=np.float32)
+        if self.count == 0 or len(rows) == 0:
+            return similarities
+        sums = self.sums[:, :self.count]
+        lengths = np.diff(vectors.indptr)[rows]
+        rows_per_chunk = max(int(SIMILARITY_CHUNK_ENTRIES / (self.count * lengths.max())), 1)
+        for start in range(0, len(rows), rows_per_chunk):
+            chunk, chunk_lengths = rows[start:start + rows_per_chunk], lengths[start:start + rows_per_chunk]
+            # Empty rows hold no features, so the chunk's features are contiguous
+            first, last = vectors.indptr[chunk[0]], vectors.indptr[chunk[-1] + 1]
+            # Pad the rows to the same length with the zero feature row, then multiply them as a batch
+            row_positions = np.repeat(np.arange(len(chunk)), chunk_lengths)
+            feature_positions = np.arange(last - first) - (vectors.indptr[chunk] - first)[row_positions]
+            indices = np.full((len(chunk), chunk_lengths.max()), self.dimensions, dtype=np.int32)
+            data = np.zeros(indices.shape, dtype=np.float32)
+            indices[row_positions, feature_positions] = vectors.indices[first:last]
+            data[row_positions, feature_positions] = vectors.data[first:last]
+            similarities[start:start + len(chunk)] = np.matmul(data[:, None, :], sums[indices])[:, 0, :]
+        return similarities / self.norms[:self.count]
+
+    def assign(self, vectors: SparseRows, weights: np.ndarray = None) -> tuple:
+        """
+        Assign a batch of vectors to clusters, founding new clusters as needed, and update the centroids.
+
+        Args:
+            vectors (SparseRows): The normalized vectors.
+            weights (np.ndarray, optional): Weight of each vector in the centroids, e.g. the number of
+                occurrences of a string that is vectorized once. Defaults to 1.
+
+        Returns:
+            tuple: The cluster of each row (-1 for empty rows, and for rows similar to no cluster once
+            MAX_CLUSTERS is reached) and the indexes of the clusters founded by this batch.
+        """
+        weights = np.ones(len(vectors), dtype=np.float32) if weights is None else weights.astype(np.float32)
+        labels = np.full(len(vectors), -1, dtype=np.int64)
+        rows = np.flatnonzero(np.diff(vectors.indptr) > 0)
+        first_new = self.count
+
+        pending = rows
+        if self.count:
+            similarities = self._similarities(vectors, rows)
+            best = similarities.argmax(axis=1)
+            best_similarity = similarities[np.arange(len(rows)), best]
+            joined = best_similarity >= self.threshold
+            if self.count >= self.max_clusters:
+                joined = best_similarity > 0
+            labels[rows[joined]] = best[joined]
+            pending = rows[~joined]
+
+        # The rest one by one, so that similar new misconceptions found one cluster rather than one each
+        for row in pending.tolist():
+            start, end = vectors.indptr[row], vectors.indptr[row + 1]
+            indices, values = vectors.indices[start:end], vectors.data[start:end] * weights[row]
+            cluster = -1
+            if self.count:
+                similarities = (values @ self.sums[indices, :self.count]) / self.norms[:self.count]
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold * weights[row] or (self.count >= self.max_clusters and similarities[best] > 0):
+                    cluster = best
+            if cluster < 0 and self.count < self.max_clusters:
+                cluster = self.count
+                self.count += 1
+            if cluster >= 0:
+                labels[row] = cluster
+                # Only the row's features change: |s + v|^2 = |s|^2 + 2 s.v + |v|^2
+                previous = self.sums[indices, cluster]
+                self.norms[cluster] = np.sqrt(max(self.norms[cluster] ** 2 + 2 * (previous @ values) + values @ values, 1e-24))
+                self.sums[indices, cluster] = previous + values
+
+        # Fold the batch-assigned rows into their centroids
+        batch_assigned = np.setdiff1d(rows, pending, assume_unique=True)
+        if len(batch_assigned):
+            row_ids = vectors.row_ids()
+            in_batch = np.isin(row_ids, batch_assigned)
+            np.add.at(
+                self.sums,
+                (vectors.indices[in_batch], labels[row_ids[in_batch]]),
+                vectors.data[in_batch] * weights[row_ids[in_batch]]
+            )
+            self._update_norms(np.unique(labels[batch_assigned]))
+        return labels, np.arange(first_new, self.count)
+
+    def centroid_sum(self, cluster: int, features: int = CENTROID_FEATURES) -> tuple:
+        """
+        Return the heaviest features of a cluster's vector sum, for storage.
+
+        Returns:
+            tuple: (indices (int32), values (float32)) arrays in ascending feature order.
+        """
+        column = self.sums[:, cluster]
+        indices = np.flatnonzero(column)
+        if len(indices) > features:
+            indices = np.sort(indices[np.argpartition(column[indices], -features)[-features:]])
+        return indices.astype(np.int32), column[indices].astype(np.float32)
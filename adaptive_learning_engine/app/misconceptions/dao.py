@@ -0,0 +1,223 @@
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from app.misconceptions.models import MisconceptionCluster, MisconceptionClusterSession, MisconceptionClusteringState
+from app.analysis.models import ChatAnalysis, SessionDetails
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Session IDs per IN clause when looking up existing cluster memberships
+SESSION_LOOKUP_CHUNK = 500
+
+class MisconceptionDAO:
+    """
+    Data Access Object (DAO) class for the misconception clusters of each learning goal and the clustering progress.
+    """
+
+    @staticmethod
+    def get_state(db: Session, learning_goal_id: int):
+        """
+        Get the clustering progress of a learning goal.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+
+        Returns:
+            MisconceptionClusteringState: The progress, or None if the learning goal was never clustered.
+
+        Raises:
+            Exception: If the progress cannot be read.
+        """
+        try:
+            return db.get(MisconceptionClusteringState, learning_goal_id)
+        except Exception as e:
+            logger.error(f"Error reading the clustering state of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_state_error')
+            raise Exception(f"Error reading clustering state: {str(e)}")
+
+    @staticmethod
+    def get_clusters(db: Session, learning_goal_id: int):
+        """
+        Get every misconception cluster of a learning goal, in creation order.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+
+        Returns:
+            list: The MisconceptionCluster objects.
+
+        Raises:
+            Exception: If the clusters cannot be read.
+        """
+        try:
+            return db.execute(
+                select(MisconceptionCluster)
+                .where(MisconceptionCluster.learning_goal_id == learning_goal_id)
+                .order_by(MisconceptionCluster.id)
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error reading the clusters of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_clusters_error')
+            raise Exception(f"Error reading misconception clusters: {str(e)}")
+
+    @staticmethod
+    def get_ranked_clusters(db: Session, learning_goal_id: int, limit: int):
+        """
+        Get the misconception clusters of a learning goal with the most sessions.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+            limit (int): Maximum number of clusters.
+
+        Returns:
+            list: The MisconceptionCluster objects, most sessions first.
+
+        Raises:
+            Exception: If the clusters cannot be read.
+        """
+        try:
+            return db.execute(
+                select(MisconceptionCluster)
+                .where(MisconceptionCluster.learning_goal_id == learning_goal_id)
+                .order_by(MisconceptionCluster.sessions.desc(), MisconceptionCluster.mentions.desc(), MisconceptionCluster.id)
+                .limit(limit)
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error reading the clusters of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_clusters_error')
+            raise Exception(f"Error reading misconception clusters: {str(e)}")
+
+    @staticmethod
+    def get_example_sessions(db: Session, cluster_ids: list, per_cluster: int) -> dict:
+        """
+        Get the most recent sessions of each cluster.
+
+        Args:
+            db (Session): Database session for executing queries.
+            cluster_ids (list): The IDs of the clusters.
+            per_cluster (int): Maximum number of sessions per cluster.
+
+        Returns:
+            dict: Session IDs, newest first, by cluster ID.
+
+        Raises:
+            Exception: If the sessions cannot be read.
+        """
+        try:
+            ranked = select(
+                MisconceptionClusterSession.cluster_id,
+                MisconceptionClusterSession.session_id,
+                func.row_number().over(
+                    partition_by=MisconceptionClusterSession.cluster_id,
+                    order_by=MisconceptionClusterSession.session_id.desc()
+                ).label('position')
+            ).where(MisconceptionClusterSession.cluster_id.in_(cluster_ids)).subquery()
+            rows = db.execute(
+                select(ranked.c.cluster_id, ranked.c.session_id)
+                .where(ranked.c.position <= per_cluster)
+                .order_by(ranked.c.cluster_id, ranked.c.position)
+            ).all()
+            examples = {cluster_id: [] for cluster_id in cluster_ids}
+            for cluster_id, session_id in rows:
+                examples[cluster_id].append(session_id)
+            return examples
+        except Exception as e:
+            logger.error(f"Error reading example sessions: {str(e)}", event_type='misconception_examples_error')
+            raise Exception(f"Error reading example sessions: {str(e)}")
+
+    @staticmethod
+    def fetch_misconceptions(db: Session, learning_goal_id: int, after_analysis_id: int, limit: int):
+        """
+        Get the next stored analyses of a learning goal's sessions, in ID order, for keyset batching.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+            after_analysis_id (int): Only analyses with a higher ID are returned.
+            limit (int): Maximum number of analyses.
+
+        Returns:
+            list: (analysis_id, session_id, misconceptions) rows.
+
+        Raises:
+            Exception: If the analyses cannot be read.
+        """
+        try:
+            return db.execute(
+                select(ChatAnalysis.id, ChatAnalysis.session_id, ChatAnalysis.misconceptions)
+                .join(SessionDetails, SessionDetails.id == ChatAnalysis.session_id)
+                .where(ChatAnalysis.id > after_analysis_id, SessionDetails.learning_goal_id == learning_goal_id)
+                .order_by(ChatAnalysis.id)
+                .limit(limit)
+            ).all()
+        except Exception as e:
+            logger.error(f"Error reading the analyses of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_analyses_error')
+            raise Exception(f"Error reading analyses: {str(e)}")
+
+    @staticmethod
+    def store_progress(db: Session, state: MisconceptionClusteringState, clusters: list, cluster_sessions: dict):
+        """
+        Store the clusters changed by a batch, their new session memberships and the clustering progress
+        in one transaction. Each cluster's session count only grows by the sessions it did not have yet.
+
+        Args:
+            db (Session): Database session for executing queries.
+            state (MisconceptionClusteringState): The learning goal's progress after the batch.
+            clusters (list): The new and changed MisconceptionCluster objects.
+            cluster_sessions (dict): The sessions of the batch by MisconceptionCluster object.
+
+        Raises:
+            Exception: If the batch cannot be stored; the transaction is rolled back.
+        """
+        try:
+            db.add(state)
+            db.add_all(clusters)
+            # Assigns the IDs of new clusters
+            db.flush()
+
+            session_ids = sorted({session_id for sessions in cluster_sessions.values() for session_id in sessions})
+            cluster_ids = [cluster.id for cluster in cluster_sessions]
+            existing = set()
+            for start in range(0, len(session_ids), SESSION_LOOKUP_CHUNK):
+                existing.update(db.execute(
+                    select(MisconceptionClusterSession.cluster_id, MisconceptionClusterSession.session_id).where(
+                        MisconceptionClusterSession.session_id.in_(session_ids[start:start + SESSION_LOOKUP_CHUNK]),
+                        MisconceptionClusterSession.cluster_id.in_(cluster_ids)
+                    )
+                ).all())
+
+            memberships = []
+            for cluster, sessions in cluster_sessions.items():
+                new_sessions = [session_id for session_id in sessions if (cluster.id, session_id) not in existing]
+                cluster.sessions += len(new_sessions)
+                memberships.extend({"cluster_id": cluster.id, "session_id": session_id} for session_id in new_sessions)
+            if memberships:
+                db.execute(MisconceptionClusterSession.__table__.insert(), memberships)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing misconception clusters of learning goal ID {state.learning_goal_id}: {str(e)}", event_type='misconception_store_error')
+            raise Exception(f"Error storing misconception clusters: {str(e)}")
+
+    @staticmethod
+    def delete_clusters(db: Session, learning_goal_id: int):
+        """
+        Delete the clusters, memberships and clustering progress of a learning goal, so it is clustered from scratch.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+
+        Raises:
+            Exception: If the clusters cannot be deleted; the transaction is rolled back.
+        """
+        try:
+            cluster_ids = select(MisconceptionCluster.id).where(MisconceptionCluster.learning_goal_id == learning_goal_id)
+            db.execute(delete(MisconceptionClusterSession).where(MisconceptionClusterSession.cluster_id.in_(cluster_ids)))
+            db.execute(delete(MisconceptionCluster).where(MisconceptionCluster.learning_goal_id == learning_goal_id))
+            db.execute(delete(MisconceptionClusteringState).where(MisconceptionClusteringState.learning_goal_id == learning_goal_id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error deleting the clusters of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_delete_error')
+            raise Exception(f"Error deleting misconception clusters: {str(e)}")
@@ -0,0 +1,71 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, JSON, Index
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class MisconceptionCluster(Base):
+    """
+    Represents a cluster of similar misconception strings from the stored analyses of one learning goal.
+
+    Attributes:
+        id (int): The primary key, auto-incremented.
+        learning_goal_id (int): The learning goal whose analyses the cluster was built from.
+        label (str): The most frequent phrasing in the cluster.
+        mentions (int): Number of misconception strings assigned to the cluster.
+        sessions (int): Number of distinct sessions with a misconception in the cluster.
+        phrasings (dict): The most frequent phrasings and their (approximate) counts.
+        centroid_indices (bytes): Hashed feature indices of the cluster's vector sum (int32).
+        centroid_values (bytes): Weights of those features (float32).
+        updated_at (datetime): When misconceptions were last assigned to the cluster.
+    """
+    __tablename__ = 'misconception_clusters'
+    __table_args__ = (
+        Index('ix_misconception_clusters_goal_sessions', 'learning_goal_id', 'sessions'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    learning_goal_id = Column(Integer, nullable=False)
+    label = Column(String, nullable=False)
+    mentions = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+    phrasings = Column(JSON, nullable=False, default=dict)
+    centroid_indices = Column(LargeBinary, nullable=False)
+    centroid_values = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MisconceptionClusterSession(Base):
+    """
+    Records that a session had a misconception assigned to a cluster.
+
+    Attributes:
+        cluster_id (int): The ID of the cluster in misconception_clusters.
+        session_id (int): The ID of the session in session_details.
+    """
+    __tablename__ = 'misconception_cluster_sessions'
+
+    cluster_id = Column(Integer, primary_key=True, autoincrement=False)
+    session_id = Column(Integer, primary_key=True, autoincrement=False, index=True)
+
+
+class MisconceptionClusteringState(Base):
+    """
+    Represents how far the analyses of a learning goal have been clustered, and the vectorizer's statistics.
+
+    Attributes:
+        learning_goal_id (int): The primary key; the clustered learning goal.
+        last_analysis_id (int): The latest analysis ID whose misconceptions were clustered.
+        dimensions (int): Size of the hashed feature space the statistics and centroids use.
+        documents (int): Number of misconception strings vectorized.
+        document_frequencies (bytes): Number of strings containing each hashed feature (int64).
+        updated_at (datetime): When the clustering last progressed.
+    """
+    __tablename__ = 'misconception_clustering_state'
+
+    learning_goal_id = Column(Integer, primary_key=True, autoincrement=False)
+    last_analysis_id = Column(Integer, nullable=False, default=0)
+    dimensions = Column(Integer, nullable=False)
+    documents = Column(Integer, nullable=False, default=0)
+    document_frequencies = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
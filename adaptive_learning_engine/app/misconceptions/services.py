@@ -0,0 +1,214 @@
+import zlib
+import numpy as np
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.misconceptions.dao import MisconceptionDAO
+from app.misconceptions.models import MisconceptionCluster, MisconceptionClusteringState
+from app.misconceptions.clustering import (
+    MisconceptionVectorizer, MisconceptionClusterer, HASH_DIMENSIONS, SIMILARITY_THRESHOLD, MAX_CLUSTERS
+)
+from app.analysis.dao import AnalysisDAO
+from app.analysis.schemas import MisconceptionClusterSummary, MisconceptionReport
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Most frequent phrasings kept per cluster
+PHRASINGS_KEPT = 20
+
+# Phrasings and example sessions returned per cluster
+PHRASINGS_SHOWN = 3
+EXAMPLE_SESSIONS_SHOWN = 5
+
+
+def _normalize(text) -> str:
+    """
+    Collapse whitespace and trailing punctuation of a misconception string.
+    """
+    return " ".join(str(text).split()).rstrip(" .;")
+
+def _pack_frequencies(frequencies: np.ndarray) -> bytes:
+    """
+    Compress the document frequencies, which are mostly zeros, for storage.
+    """
+    return zlib.compress(frequencies.astype(np.int64).tobytes())
+
+def _unpack_frequencies(payload: bytes) -> np.ndarray:
+    """
+    Restore document frequencies stored with `_pack_frequencies`.
+    """
+    return np.frombuffer(zlib.decompress(payload), dtype=np.int64).copy()
+
+
+class MisconceptionService:
+    """
+    Service layer that clusters the misconception strings of stored analyses per learning goal, locally and
+    incrementally, and serves the clusters ranked by the number of sessions.
+    """
+
+    @staticmethod
+    def cluster_learning_goal(db: Session, learning_goal_id: int, batch_size: int = 20000,
+                              threshold: float = SIMILARITY_THRESHOLD, max_clusters: int = MAX_CLUSTERS) -> dict:
+        """
+        Cluster the misconceptions of the analyses stored for a learning goal since the last run.
+
+        Analyses are read in ID order in batches of `batch_size`. The misconception strings of a batch are
+        deduplicated, vectorized (hashing TF-IDF) and assigned to the existing clusters or to new ones;
+        the changed clusters and the progress are committed per batch, so an interrupted run resumes
+        where it stopped. No LLM is called.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal_id (int): The ID of the learning goal.
+            batch_size (int): Analyses per batch.
+            threshold (float): Minimum cosine similarity for a misconception to join a cluster.
+            max_clusters (int): Maximum number of clusters of the learning goal.
+
+        Returns:
+            dict: The number of analyses and misconception strings processed, of clusters created,
+            and the total number of clusters.
+
+        Raises:
+            Exception: If the stored clusters use another feature space, or clustering fails.
+        """
+        try:
+            state = MisconceptionDAO.get_state(db, learning_goal_id)
+            if state is None:
+                state = MisconceptionClusteringState(
+                    learning_goal_id=learning_goal_id,
+                    last_analysis_id=0,
+                    dimensions=HASH_DIMENSIONS,
+                    documents=0,
+                    document_frequencies=_pack_frequencies(np.zeros(HASH_DIMENSIONS, dtype=np.int64))
+                )
+            elif state.dimensions != HASH_DIMENSIONS:
+                raise Exception(f"Clusters use {state.dimensions} hashed features instead of {HASH_DIMENSIONS}; rebuild them.")
+
+            clusters = list(MisconceptionDAO.get_clusters(db, learning_goal_id))
+            vectorizer = MisconceptionVectorizer(HASH_DIMENSIONS, _unpack_frequencies(state.document_frequencies), state.documents)
+            clusterer = MisconceptionClusterer(HASH_DIMENSIONS, threshold, max_clusters, [
+                (np.frombuffer(cluster.centroid_indices, dtype=np.int32), np.frombuffer(cluster.centroid_values, dtype=np.float32))
+                for cluster in clusters
+            ])
+
+            result = {"analyses": 0, "misconceptions": 0, "new_clusters": 0}
+            while True:
+                rows = MisconceptionDAO.fetch_misconceptions(db, learning_goal_id, state.last_analysis_id, batch_size)
+                if not rows:
+                    break
+
+                # One entry per (session, distinct misconception); identical phrasings are vectorized once
+                phrasings, sessions, keys = [], [], []
+                for _, session_id, misconceptions in rows:
+                    seen = set()
+                    for text in misconceptions or []:
+                        phrasing = _normalize(text)
+                        key = phrasing.lower()
+                        if phrasing and key not in seen:
+                            seen.add(key)
+                            phrasings.append(phrasing)
+                            sessions.append(session_id)
+                            keys.append(key)
+
+                touched = {}
+                if keys:
+                    unique_keys, inverse, counts = np.unique(
+                        np.array(keys, dtype=object), return_inverse=True, return_counts=True
+                    )
+                    vectors = vectorizer.vectorize(unique_keys.tolist(), counts)
+                    labels, new_clusters = clusterer.assign(vectors, counts)
+                    for _ in new_clusters:
+                        clusters.append(MisconceptionCluster(
+                            learning_goal_id=learning_goal_id, label="", mentions=0, sessions=0, phrasings={}
+                        ))
+
+                    for position, label in enumerate(labels[inverse].tolist()):
+                        if label < 0:
+                            continue
+                        cluster_phrasings, cluster_sessions = touched.setdefault(label, ({}, set()))
+                        cluster_phrasings[phrasings[position]] = cluster_phrasings.get(phrasings[position], 0) + 1
+                        cluster_sessions.add(sessions[position])
+
+                    now = datetime.utcnow()
+                    for label, (batch_phrasings, _) in touched.items():
+                        cluster = clusters[label]
+                        merged = dict(cluster.phrasings or {})
+                        for phrasing, count in batch_phrasings.items():
+                            merged[phrasing] = merged.get(phrasing, 0) + count
+                        # Keep the heavy hitters only; rarer phrasings still count in `mentions`
+                        top = sorted(merged.items(), key=lambda item: -item[1])[:PHRASINGS_KEPT]
+                        cluster.phrasings = dict(top)
+                        cluster.label = top[0][0]
+                        cluster.mentions += sum(batch_phrasings.values())
+                        indices, values = clusterer.centroid_sum(label)
+                        cluster.centroid_indices, cluster.centroid_values = indices.tobytes(), values.tobytes()
+                        cluster.updated_at = now
+                    result["misconceptions"] += len(keys)
+                    result["new_clusters"] += len(new_clusters)
+
+                state.last_analysis_id = rows[-1][0]
+                state.documents = vectorizer.documents
+                state.document_frequencies = _pack_frequencies(vectorizer.document_frequencies)
+                state.updated_at = datetime.utcnow()
+                MisconceptionDAO.store_progress(
+                    db, state, [clusters[label] for label in touched],
+                    {clusters[label]: sessions_of_cluster for label, (_, sessions_of_cluster) in touched.items()}
+                )
+                result["analyses"] += len(rows)
+
+            result["clusters"] = len(clusters)
+            logger.info(f"Clustered {result['misconceptions']} misconceptions of learning goal ID {learning_goal_id}: {result}", event_type='misconceptions_clustered')
+            return result
+        except Exception as e:
+            logger.error(f"Error clustering misconceptions of learning goal ID {learning_goal_id}: {str(e)}", event_type='misconception_clustering_error')
+            raise Exception(str(e))
+
+    @staticmethod
+    def get_report(db: Session, learning_goal: str, limit: int = 20):
+        """
+        Get the misconception clusters of a learning goal with the most sessions, as stored by the last
+        clustering run. No LLM call is made.
+
+        Args:
+            db (Session): Database session for executing queries.
+            learning_goal (str): The learning goal name.
+            limit (int): Maximum number of clusters.
+
+        Returns:
+            MisconceptionReport: The ranked clusters, or None if the learning goal does not exist.
+
+        Raises:
+            Exception: If the clusters cannot be read.
+        """
+        try:
+            learning_goal_id = next(
+                (goal_id for goal_id, name in AnalysisDAO.fetch_learning_goals(db) if name == learning_goal), None
+            )
+            if learning_goal_id is None:
+                logger.warning(f"Learning goal '{learning_goal}' not found.", event_type='misconception_goal_not_found')
+                return None
+
+            state = MisconceptionDAO.get_state(db, learning_goal_id)
+            clusters = MisconceptionDAO.get_ranked_clusters(db, learning_goal_id, limit)
+            examples = MisconceptionDAO.get_example_sessions(db, [cluster.id for cluster in clusters], EXAMPLE_SESSIONS_SHOWN)
+            return MisconceptionReport(
+                learning_goal_id=learning_goal_id,
+                learning_goal=learning_goal,
+                misconceptions=state.documents if state else 0,
+                clustered_through_analysis_id=state.last_analysis_id if state else None,
+                updated_at=state.updated_at if state else None,
+                clusters=[
+                    MisconceptionClusterSummary(
+                        cluster_id=cluster.id,
+                        label=cluster.label,
+                        sessions=cluster.sessions,
+                        mentions=cluster.mentions,
+                        phrasings=list(cluster.phrasings)[:PHRASINGS_SHOWN],
+                        example_session_ids=examples.get(cluster.id, [])
+                    )
+                    for cluster in clusters
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error reading misconception clusters for learning goal '{learning_goal}': {str(e)}", event_type='misconception_report_error')
+            raise Exception(str(e))
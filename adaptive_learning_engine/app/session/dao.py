@@ -1,5 +1,8 @@
+from sqlalchemy import select, insert, func
 from sqlalchemy.orm import Session
 from app.session.models import SessionDetails, LearningGoals, ChatHistory
+from app.archive.dao import ArchiveDAO
+from app.archive.models import ChatArchive
 from app.core.custom_logger import CustomLogger
 
 logger = CustomLogger()
@@ -34,6 +37,59 @@ class SessionDAO:
             logger.error(f"Error occurred while fetching learning goal by name: {str(e)}", )
             raise Exception("An error occurred while fetching the learning goal.")
     
+    @staticmethod
+    def get_learning_goal_ids(db: Session):
+        """
+        Retrieves the whole learning goal catalog in a single query.
+        
+        Args:
+        - db (Session): The database session.
+        
+        Returns:
+        - dict: Learning goal name to learning goal ID.
+        
+        Raises:
+        - Exception: If there are database issues while querying.
+        """
+        try:
+            logger.info("Fetching the learning goal catalog.", event_type='get_learning_goal_ids')
+            rows = db.execute(
+                select(LearningGoals.learning_goal_names, LearningGoals.id).order_by(LearningGoals.id.desc())
+            ).all()
+            # Iterating newest first leaves the lowest ID per name, as get_learning_goal_by_name's first() would
+            return {name: goal_id for name, goal_id in rows}
+        except Exception as e:
+            logger.error(f"Error occurred while fetching the learning goal catalog: {str(e)}", event_type='get_learning_goal_ids')
+            raise Exception("An error occurred while fetching the learning goals.")
+
+    @staticmethod
+    def create_sessions(db: Session, sessions: list):
+        """
+        Inserts several sessions with one batched INSERT ... RETURNING statement and a single commit.
+        
+        Args:
+        - db (Session): The database session.
+        - sessions (list): Dicts of SessionDetails column values.
+        
+        Returns:
+        - list: The IDs of the created sessions, in the order of `sessions`.
+        
+        Raises:
+        - Exception: If the sessions cannot be inserted; none of them are created.
+        """
+        try:
+            logger.info(f"Adding {len(sessions)} sessions to the database.", event_type='create_sessions')
+            session_ids = db.scalars(insert(SessionDetails).returning(SessionDetails.id), sessions).all()
+            db.commit()
+            # RETURNING order is unspecified, but rowids assigned by one batched insert increase in parameter order
+            session_ids = sorted(session_ids)
+            logger.info(f"{len(session_ids)} sessions successfully added.", event_type='create_sessions')
+            return session_ids
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error occurred while creating sessions: {str(e)}", event_type='create_sessions')
+            raise Exception("An error occurred while creating the sessions.")
+
     @staticmethod
     def create_session(db: Session, session: SessionDetails):
         """
@@ -63,34 +119,34 @@ class SessionDAO:
     @staticmethod
     def get_complete_chat_history(db: Session, session_id: int):
         """
-        Get the last 'limit' number of chat interactions for a session.
+        Get the complete transcript of a session, newest first, including its archived turns.
+        The one transcript loader of the recommendation, analysis and report paths.
         
         Args:
             db (Session): Database session for executing queries.
             session_id (int): The ID of the session for which chat history is fetched.
-            limit (int): The number of recent chat messages to retrieve.
         
         Returns:
-            list: A list of ChatHistory objects.
+            list: (id, learner_response, llm_response) rows and ArchivedChat entries, newest first.
         
         Raises:
             Exception: If the chat history fetch fails.
         """
         try:
-            chat_history = (
-                db.query(ChatHistory)
-                .filter_by(session_id=session_id)
+            chat_history = db.execute(
+                select(ChatHistory.id, ChatHistory.learner_response, ChatHistory.llm_response)
+                .where(ChatHistory.session_id == session_id)
                 .order_by(ChatHistory.id.desc())
-                .all()
-            )
+            ).all()
+            chat_history += ArchiveDAO.fetch_archived_chat_history(db, session_id)[::-1]
             if not chat_history:
                 logger.warning(f"No chat history found for session ID {session_id}.", event_type='no_chat_history')
-            logger.info(f"Recent chat history fetched successfully for session ID {session_id}.", event_type='chat_history_fetched')
+            logger.info(f"Chat history fetched successfully for session ID {session_id}.", event_type='chat_history_fetched')
             return chat_history
         except Exception as e:
             logger.error(f"Error fetching chat history for session ID {session_id}: {str(e)}", event_type='chat_history_fetch_error')
             raise Exception(f"Error fetching chat history: {str(e)}")
-        
+
     @staticmethod
     def get_learning_goal_and_session_details(db: Session, session_id: int):
         """
@@ -122,4 +178,38 @@ class SessionDAO:
             return details
         except Exception as e:
             logger.error(f"Error fetching learning goal for session ID {session_id}: {str(e)}", event_type='learning_goal_fetch_error')
-            raise Exception(f"Error fetching learning goal: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error fetching learning goal: {str(e)}")
+
+    @staticmethod
+    def get_session_version(db: Session, session_id: int):
+        """
+        Get what identifies the current state of a session's derived results, in one indexed lookup:
+        its latest ChatHistory ID (hot or archived) and its current level.
+        
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+        
+        Returns:
+            Row: (latest_chat_id, student_current_level), or None if the session does not exist.
+            latest_chat_id is 0 for a session without chat history.
+        
+        Raises:
+            Exception: If the lookup fails.
+        """
+        try:
+            latest_chat_id = (
+                select(func.max(ChatHistory.id)).where(ChatHistory.session_id == SessionDetails.id).scalar_subquery()
+            )
+            archived_chat_id = (
+                select(ChatArchive.last_chat_id).where(ChatArchive.session_id == SessionDetails.id).scalar_subquery()
+            )
+            return db.execute(
+                select(
+                    func.coalesce(latest_chat_id, archived_chat_id, 0).label('latest_chat_id'),
+                    SessionDetails.student_current_level
+                ).where(SessionDetails.id == session_id)
+            ).first()
+        except Exception as e:
+            logger.error(f"Error reading the version of session ID {session_id}: {str(e)}", event_type='session_version_error')
+            raise Exception(f"Error reading session version: {str(e)}")
@@ -1,9 +1,14 @@
-from fastapi import HTTPException, Depends
-from app.session.schemas import SessionCreate
+from typing import Optional
+from fastapi import HTTPException, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from app.session.schemas import SessionCreate, BulkSessionCreate, BulkSessionResponse
 from app.session.services import SessionService
 from app.core.custom_logger import CustomLogger
 from app.session.router import session_router
 from app.core.database import get_db
+from app.core.etag import etag_matches, cache_headers, not_modified
+from app.core.circuit_breaker import LLMUnavailable
+from app.core.responses import FastJSONResponse
 from sqlalchemy.orm import Session
 
 logger = CustomLogger()
@@ -39,6 +44,30 @@ def create_session(session_data: SessionCreate, db: Session = Depends(get_db)):
     except Exception as e:
         logger.error(f"An error occurred while creating the session: {str(e)}", event_type='create_session')
         raise HTTPException(status_code=500, detail="Internal server error")
+
+@session_router.post("/create-sessions", response_model=BulkSessionResponse)
+def create_sessions(bulk_data: BulkSessionCreate, db: Session = Depends(get_db)):
+    """
+    Endpoint to create many sessions in one request, e.g. when onboarding a class.
+    
+    All learning goals are resolved with one query and all sessions are inserted with one commit.
+    
+    Args:
+    - bulk_data (BulkSessionCreate): The sessions to create (learner level and learning goal each).
+    - db (Session): The database session, provided by dependency injection.
+    
+    Returns:
+    - BulkSessionResponse: Per-item results in request order; items with an invalid learning goal carry an error.
+    
+    Raises:
+    - HTTPException: If the sessions cannot be created.
+    """
+    try:
+        logger.info(f"Creating {len(bulk_data.sessions)} sessions in bulk", event_type='create_sessions')
+        return session_service.create_sessions(db, bulk_data.sessions)
+    except Exception as e:
+        logger.error(f"An error occurred while creating sessions: {str(e)}", event_type='create_sessions')
+        raise HTTPException(status_code=500, detail="Internal server error")
     
 @session_router.post("/session/{id}/recommendation")
 def get_recommendation(id: int, db: Session = Depends(get_db)):
@@ -65,6 +94,89 @@ def get_recommendation(id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Session not found")
         logger.info(f"Recommendation fetched successfully for session ID: {id}", event_type='get_recommendation')
         return {"ai_response": recommendation}
+    except LLMUnavailable as unavailable:
+        if unavailable.fallback is None:
+            raise
+        return {"ai_response": unavailable.fallback, "degraded": True}
+    except Exception as e:
+        logger.error(f"An error occurred while fetching recommendation for session ID {id}: {str(e)}", event_type='get_recommendation')
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@session_router.get("/session/{id}/recommendation")
+def get_cached_recommendation(id: int, response: Response, if_none_match: Optional[str] = Header(None),
+                              db: Session = Depends(get_db)):
+    """
+    Cacheable, idempotent variant of the recommendation endpoint. The ETag changes only with the session's
+    transcript or level; a request whose If-None-Match matches is answered with 304 after one indexed lookup.
+    
+    Args:
+    - id (int): The session id for which recommendation is required.
+    - if_none_match (str, optional): ETag(s) of the client's cached copy.
+    - db (Session): The database session, provided by dependency injection.
+    
+    Returns:
+    - dict: The recommendation, as returned by the POST endpoint, or an empty 304 response.
+    
+    Raises:
+    - HTTPException: If the session is not found or the recommendation fails.
+    """
+    try:
+        etag = session_service.get_recommendation_etag(db, id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if etag_matches(if_none_match, etag):
+            logger.info(f"Recommendation for session ID {id} not modified.", event_type='get_recommendation')
+            return not_modified(etag)
+        recommendation = session_service.get_recommendation(db, id)
+        response.headers.update(cache_headers(etag))
+        return {"ai_response": recommendation}
+    except HTTPException:
+        raise
+    except LLMUnavailable as unavailable:
+        if unavailable.fallback is None:
+            raise
+        # A previous recommendation must not be cached under the current ETag
+        return {"ai_response": unavailable.fallback, "degraded": True}
     except Exception as e:
         logger.error(f"An error occurred while fetching recommendation for session ID {id}: {str(e)}", event_type='get_recommendation')
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@session_router.post("/session/{id}/report")
+def get_report(id: int, stream: bool = Query(False), db: Session = Depends(get_db)):
+    """
+    Endpoint to get a session's recommendation and analysis in one request.
+    
+    The transcript and session details are loaded once and both LLM calls run concurrently, so the report
+    takes as long as the slower call instead of the two endpoints' combined time. Each part is what its own
+    endpoint returns (degraded fallbacks included); a part that failed holds its 'error' instead.
+    
+    Args:
+    - id (int): The session id for which the report is required.
+    - stream (bool): Stream the parts as NDJSON (application/x-ndjson), one line per part as soon as it is ready.
+    - db (Session): The database session, provided by dependency injection.
+    
+    Returns:
+    - FastJSONResponse: The session id with its 'recommendation' and 'analysis', or
+    - StreamingResponse: One line per part with the session id, the 'part' name and its content, in completion order.
+    
+    Raises:
+    - HTTPException: If the session is not found or both parts fail.
+    """
+    try:
+        logger.info(f"Fetching report for session ID: {id}", event_type='get_report')
+        if stream:
+            parts = session_service.start_report(db, id)
+            if parts is None:
+                raise HTTPException(status_code=404, detail="Session not found")
+            return StreamingResponse(session_service.stream_report(id, parts), media_type="application/x-ndjson")
+        report = session_service.get_report(db, id)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        logger.info(f"Report fetched successfully for session ID: {id}", event_type='get_report')
+        # Returned directly so the pre-encoded analysis skips FastAPI's encoder
+        return FastJSONResponse(report)
+    except (HTTPException, LLMUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"An error occurred while fetching the report for session ID {id}: {str(e)}", event_type='get_report')
+        raise HTTPException(status_code=500, detail="Internal server error")
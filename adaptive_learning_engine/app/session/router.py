@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from app.core.constants import error_responses
+from app.core.profiling import ProfiledRoute
 
 session_router = APIRouter(tags=["session_router"],
-                 responses=error_responses
+                 responses=error_responses,
+                 route_class=ProfiledRoute
                  )
\ No newline at end of file
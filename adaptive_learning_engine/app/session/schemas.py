@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+# Maximum number of sessions created by one bulk request
+MAX_BULK_SESSIONS = 1000
 
 class SessionCreate(BaseModel):
     learner_level: str
@@ -8,4 +12,17 @@ class SessionResponse(BaseModel):
     id: int
     learning_goal: str
     student_initial_level: str
-    student_current_level: str
\ No newline at end of file
+    student_current_level: str
+
+class BulkSessionCreate(BaseModel):
+    sessions: List[SessionCreate] = Field(..., min_length=1, max_length=MAX_BULK_SESSIONS)
+
+class BulkSessionResult(BaseModel):
+    index: int
+    session: Optional[SessionResponse] = None
+    error: Optional[str] = None
+
+class BulkSessionResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkSessionResult]
@@ -1,13 +1,57 @@
-from app.session.schemas import SessionCreate, SessionResponse
-from app.core.database import get_db
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.session.schemas import SessionCreate, SessionResponse, BulkSessionResponse, BulkSessionResult
+from app.core.database import get_db, open_session
 from app.core.custom_logger import CustomLogger
 from app.session.dao import SessionDAO
 from app.session.models import SessionDetails
 from app.core.open_ai_service import OpenAIService
+from app.core.circuit_breaker import LLMUnavailable
+from app.core.model_router import TASK_RECOMMENDATION
+from app.core.etag import session_etag
+from app.core.cache import get_cache, cache_key
+from app.core.deadline import check_deadline
+from app.core.responses import dumps
+from app.analysis.dao import AnalysisDAO
+from app.analysis.services import AnalysisService
 from sqlalchemy.orm import Session
 
 logger = CustomLogger()
 
+# Cache namespace of the learning goal catalog; invalidate it when goals are added
+LEARNING_GOALS_CACHE_NAMESPACE = 'learning_goals'
+
+# How long the learning goal catalog is cached, in seconds
+LEARNING_GOALS_CACHE_TTL_SECONDS = float(os.getenv('LEARNING_GOALS_CACHE_TTL_SECONDS', '300'))
+
+# How long a recommendation is cached; it is keyed by the session's version, so it never goes stale
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv('RECOMMENDATION_CACHE_TTL_SECONDS', '86400'))
+
+# Threads running the parts of session reports; a report holds one per part until its LLM call returns
+REPORT_MAX_WORKERS = int(os.getenv('REPORT_MAX_WORKERS', '32'))
+
+# Seconds between deadline checks while waiting for the parts of a report
+REPORT_WAIT_CHECK_SECONDS = 0.1
+
+report_executor = None
+report_executor_lock = threading.Lock()
+
+def get_report_executor() -> ThreadPoolExecutor:
+    """
+    Get or create the process-wide thread pool that runs the parts of session reports concurrently.
+
+    Returns:
+        ThreadPoolExecutor: The thread pool.
+    """
+    global report_executor
+    if report_executor is None:
+        with report_executor_lock:
+            if report_executor is None:
+                report_executor = ThreadPoolExecutor(max_workers=REPORT_MAX_WORKERS, thread_name_prefix='session-report')
+    return report_executor
+
 class SessionService:
     """
     Service layer responsible for handling the business logic related to sessions.
@@ -29,6 +73,28 @@ class SessionService:
             for entry in chat_history
         ]
     
+    @staticmethod
+    def get_learning_goal_ids(db: Session) -> dict:
+        """
+        Returns the learning goal catalog, cached for LEARNING_GOALS_CACHE_TTL_SECONDS since it rarely changes.
+        
+        Args:
+        - db (Session): The database session, used on a cache miss.
+        
+        Returns:
+        - dict: Learning goal name to learning goal ID.
+        
+        Raises:
+        - Exception: If the catalog cannot be read.
+        """
+        cache = get_cache()
+        key = cache_key(LEARNING_GOALS_CACHE_NAMESPACE)
+        goal_ids = cache.get(key)
+        if goal_ids is None:
+            goal_ids = SessionDAO.get_learning_goal_ids(db)
+            cache.set(key, goal_ids, LEARNING_GOALS_CACHE_TTL_SECONDS)
+        return goal_ids
+
     @staticmethod
     def create_session(db: Session, session_data: SessionCreate) -> SessionResponse:
         """
@@ -46,13 +112,13 @@ class SessionService:
         """
         try:
             logger.info(f"Looking up learning goal: {session_data.learning_goal}", event_type='create_session')
-            learning_goal = SessionDAO.get_learning_goal_by_name(db, session_data.learning_goal)
-            if not learning_goal:
+            learning_goal_id = SessionService.get_learning_goal_ids(db).get(session_data.learning_goal)
+            if not learning_goal_id:
                 logger.error(f"Learning goal '%s' not found in the database: {session_data.learning_goal}", event_type='create_session')
                 return None  # Goal not found, will be handled in the endpoint
             
             new_session = SessionDetails(
-                learning_goal_id=learning_goal.id,
+                learning_goal_id=learning_goal_id,
                 student_initial_level=session_data.learner_level,
                 student_current_level=session_data.learner_level  # Initially same as initial level
             )
@@ -63,7 +129,7 @@ class SessionService:
             logger.info(f"Session created with ID: {created_session.id}", event_type='create_session')
             return SessionResponse(
                 id=created_session.id,
-                learning_goal=learning_goal.learning_goal_names,
+                learning_goal=session_data.learning_goal,
                 student_initial_level=created_session.student_initial_level,
                 student_current_level=created_session.student_current_level
             )
@@ -72,6 +138,86 @@ class SessionService:
             logger.error(f"Error occurred while creating the session: {str(e)}", event_type='create_session')
             raise Exception("An error occurred while creating the session.")
         
+    @staticmethod
+    def create_sessions(db: Session, sessions_data: list) -> BulkSessionResponse:
+        """
+        Creates many sessions at once: learning goals are resolved from the cached catalog and all valid sessions are
+        inserted with one batched statement and one commit. Items with an unknown learning goal are reported
+        individually and do not prevent the others from being created.
+        
+        Args:
+        - db (Session): The database session used for querying and committing to the database.
+        - sessions_data (List[SessionCreate]): The sessions to create.
+        
+        Returns:
+        - BulkSessionResponse: One result per item, in request order, with the created session or an error.
+        
+        Raises:
+        - Exception: If the database lookup or insert fails.
+        """
+        try:
+            goal_ids = SessionService.get_learning_goal_ids(db)
+            results = [BulkSessionResult(index=index) for index in range(len(sessions_data))]
+            valid_indexes = []
+            for index, item in enumerate(sessions_data):
+                if item.learning_goal in goal_ids:
+                    valid_indexes.append(index)
+                else:
+                    results[index].error = "Invalid learning goal"
+
+            if valid_indexes:
+                session_ids = SessionDAO.create_sessions(db, [
+                    {
+                        "learning_goal_id": goal_ids[sessions_data[index].learning_goal],
+                        "student_initial_level": sessions_data[index].learner_level,
+                        "student_current_level": sessions_data[index].learner_level  # Initially same as initial level
+                    }
+                    for index in valid_indexes
+                ])
+                for index, session_id in zip(valid_indexes, session_ids):
+                    item = sessions_data[index]
+                    results[index].session = SessionResponse(
+                        id=session_id,
+                        learning_goal=item.learning_goal,
+                        student_initial_level=item.learner_level,
+                        student_current_level=item.learner_level
+                    )
+
+            logger.info(f"Bulk session creation: {len(valid_indexes)} created, {len(sessions_data) - len(valid_indexes)} failed.", event_type='create_sessions')
+            return BulkSessionResponse(
+                created=len(valid_indexes),
+                failed=len(sessions_data) - len(valid_indexes),
+                results=results
+            )
+        except Exception as e:
+            logger.error(f"Error occurred while creating sessions: {str(e)}", event_type='create_sessions')
+            raise Exception("An error occurred while creating the sessions.")
+
+    @staticmethod
+    def get_recommendation_etag(db: Session, id):
+        """
+        Get the ETag of a session's recommendation, which changes only with the transcript or the level.
+        Costs one indexed lookup; neither the transcript nor the LLM is touched.
+        
+        Args:
+        - db (Session): The database session.
+        - id (int): The session id.
+        
+        Returns:
+        - str: The ETag, or None if the session is not found.
+        
+        Raises:
+        - Exception: If the lookup fails.
+        """
+        try:
+            version = SessionDAO.get_session_version(db, id)
+            if version is None:
+                return None
+            return session_etag('recommendation', id, version.latest_chat_id, version.student_current_level)
+        except Exception as e:
+            logger.error(f"Error occurred while reading the recommendation version: {str(e)}", event_type='get_recommendation')
+            raise Exception("An error occurred while reading the recommendation version.")
+
     @staticmethod
     def get_recommendation(db: Session, id):
         """
@@ -85,16 +231,51 @@ class SessionService:
         - str: The recommendation for the session.
         
         Raises:
+        - LLMUnavailable: If the AI service is unavailable; carries the previous recommendation as fallback, if cached.
         - HTTPException: If the session is not found.
         """
         try:
+            # Recommendations only change with the transcript or the level, which the key includes
+            version = SessionDAO.get_session_version(db, id)
+            key = cache_key('recommendation', id, *version) if version is not None else None
+            cached_response = get_cache().get(key) if key else None
+            if cached_response is not None:
+                logger.info(f"Serving cached recommendation for session ID {id}.", event_type='get_recommendation')
+                return cached_response
+
             chat_history = SessionDAO.get_complete_chat_history(db, id)
             formatted_chat_history = SessionService().get_formatted_chat_history(chat_history)
 
             logger.info(f'formatted_chat_history: {formatted_chat_history}', event_type='get_recommendation')
 
             details = SessionDAO.get_learning_goal_and_session_details(db, id)
+            return SessionService.recommend(id, key, formatted_chat_history, details)
+        except LLMUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Error occurred while fetching the session: {str(e)}", event_type='get_recommendation')
+            raise Exception("An error occurred while fetching the session.")
 
+    @staticmethod
+    def recommend(id, key, formatted_chat_history, details):
+        """
+        Generate a recommendation from an already loaded transcript and session details, and cache it.
+        Makes no database access, so it can run on any thread.
+        
+        Args:
+        - id (int): The session id.
+        - key (str): The cache key of the session's current version, or None to skip caching.
+        - formatted_chat_history (List[str]): The transcript, as formatted by get_formatted_chat_history.
+        - details (Row): The session's learning goal name and initial level.
+        
+        Returns:
+        - str: The recommendation for the session.
+        
+        Raises:
+        - LLMUnavailable: If the AI service is unavailable; carries the previous recommendation as fallback, if cached.
+        - Exception: If the recommendation cannot be generated.
+        """
+        try:
             system_prompt = "You are an educational AI tutor."
             openai_service = OpenAIService()
 
@@ -112,9 +293,179 @@ class SessionService:
             3. Chat History: {formatted_chat_history}
             '''
 
-            ai_response = openai_service.generate_response(system_prompt, user_prompt)
+            # The latest recommendation, whatever its version, is what an LLM outage falls back to
+            latest_key = cache_key('latest_recommendation', id)
+            try:
+                ai_response = openai_service.generate_response(system_prompt, user_prompt, TASK_RECOMMENDATION)
+            except LLMUnavailable as unavailable:
+                unavailable.fallback = get_cache().get(latest_key)
+                if unavailable.fallback is not None:
+                    logger.warning(f"AI service unavailable, offering the previous recommendation for session ID {id}.", event_type='get_recommendation')
+                raise
+            if key:
+                get_cache().set(key, ai_response, RECOMMENDATION_CACHE_TTL_SECONDS)
+                get_cache().set(latest_key, ai_response, RECOMMENDATION_CACHE_TTL_SECONDS)
 
             return ai_response
+        except LLMUnavailable:
+            raise
         except Exception as e:
-            logger.error(f"Error occurred while fetching the session: {str(e)}", event_type='get_recommendation')
-            raise Exception("An error occurred while fetching the session.")
\ No newline at end of file
+            logger.error(f"Error occurred while generating the recommendation for session ID {id}: {str(e)}", event_type='get_recommendation')
+            raise Exception("An error occurred while generating the recommendation.")
+
+    @staticmethod
+    def _recommendation_part(id, key, formatted_chat_history, details) -> dict:
+        """
+        Report part with the session's recommendation, as returned by the recommendation endpoint.
+        """
+        cached_response = get_cache().get(key)
+        if cached_response is not None:
+            return {"ai_response": cached_response}
+        try:
+            return {"ai_response": SessionService.recommend(id, key, formatted_chat_history, details)}
+        except LLMUnavailable as unavailable:
+            if unavailable.fallback is None:
+                raise
+            return {"ai_response": unavailable.fallback, "degraded": True}
+
+    @staticmethod
+    def _analysis_part(id, formatted_chat_history, latest_chat_id, latest_analysis) -> dict:
+        """
+        Report part with the session's analysis, as returned by the analysis endpoint.
+        Runs on a report thread, so the analysis is stored with a database session of its own.
+        """
+        db = open_session()
+        try:
+            return AnalysisService.analyze_transcript(db, id, formatted_chat_history, latest_chat_id, latest_analysis)
+        except LLMUnavailable as unavailable:
+            if unavailable.fallback is None:
+                raise
+            return {**unavailable.fallback, "degraded": True}
+        finally:
+            db.close()
+
+    @staticmethod
+    def start_report(db: Session, id):
+        """
+        Start a session's combined report: the transcript and session details are loaded once, then the
+        recommendation and the analysis are generated concurrently on the report thread pool, each part
+        with a copy of the request's context (tenant and deadline).
+        
+        Args:
+        - db (Session): The database session.
+        - id (int): The session id.
+        
+        Returns:
+        - dict: A future per report part ('recommendation', 'analysis'), each resolving to the part's content,
+          or None if the session does not exist.
+        
+        Raises:
+        - Exception: If the session cannot be loaded.
+        """
+        try:
+            version = SessionDAO.get_session_version(db, id)
+            if version is None:
+                logger.warning(f"Session with ID {id} not found.", event_type='get_report')
+                return None
+
+            chat_history = SessionDAO.get_complete_chat_history(db, id)
+            formatted_chat_history = SessionService.get_formatted_chat_history(chat_history)
+            latest_chat_id = chat_history[0].id if chat_history else None
+            details = SessionDAO.get_learning_goal_and_session_details(db, id)
+            latest_analysis = AnalysisDAO.get_latest_analysis(db, id)
+
+            executor = get_report_executor()
+            return {
+                'recommendation': executor.submit(
+                    contextvars.copy_context().run, SessionService._recommendation_part,
+                    id, cache_key('recommendation', id, *version), formatted_chat_history, details
+                ),
+                'analysis': executor.submit(
+                    contextvars.copy_context().run, SessionService._analysis_part,
+                    id, formatted_chat_history, latest_chat_id, latest_analysis
+                ),
+            }
+        except Exception as e:
+            logger.error(f"Error occurred while starting the report for session ID {id}: {str(e)}", event_type='get_report')
+            raise Exception("An error occurred while starting the report.")
+
+    @staticmethod
+    def completed_report_parts(parts: dict):
+        """
+        Yield the parts of a started report as they complete, checking the request's deadline while waiting.
+        Parts not started yet are cancelled if the caller stops early.
+        
+        Args:
+        - parts (dict): The futures returned by start_report.
+        
+        Yields:
+        - tuple: The part name and its content, or the part name and the exception it failed with.
+        
+        Raises:
+        - DeadlineExceeded, RequestCancelled: If the request ends while waiting.
+        """
+        pending = {future: part for part, future in parts.items()}
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=REPORT_WAIT_CHECK_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    part = pending.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        logger.error(f"Report part '{part}' failed: {str(error)}", event_type='get_report')
+                    yield part, error if error is not None else future.result()
+                if pending:
+                    check_deadline()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def get_report(db: Session, id):
+        """
+        Get a session's recommendation and analysis as one document. Both are generated concurrently from one
+        transcript load, so the report takes as long as the slower of the two rather than their sum.
+        
+        Args:
+        - db (Session): The database session.
+        - id (int): The session id.
+        
+        Returns:
+        - dict: The session id and one entry per part, as returned by the part's own endpoint; a part that
+          failed holds its error instead. None if the session does not exist.
+        
+        Raises:
+        - LLMUnavailable: If every part failed because the AI service is unavailable.
+        - Exception: If every part failed.
+        """
+        parts = SessionService.start_report(db, id)
+        if parts is None:
+            return None
+        contents, errors = {}, []
+        for part, content in SessionService.completed_report_parts(parts):
+            if isinstance(content, Exception):
+                errors.append(content)
+                content = {"error": str(content)}
+            contents[part] = content
+        if len(errors) == len(parts):
+            raise errors[0]
+        # Parts in a fixed order, whichever finished first
+        return {"session_id": id, **{part: contents[part] for part in parts}}
+
+    @staticmethod
+    def stream_report(id, parts: dict):
+        """
+        Stream a started report as NDJSON, one line per part in the order the parts complete, so clients
+        can show whichever part finishes first.
+        
+        Args:
+        - id (int): The session id.
+        - parts (dict): The futures returned by start_report.
+        
+        Yields:
+        - bytes: One JSON-encoded part ('session_id', 'part' and the part's content or 'error') followed by a newline.
+        """
+        for part, content in SessionService.completed_report_parts(parts):
+            if isinstance(content, Exception):
+                content = {"error": str(content)}
+            yield dumps({"session_id": id, "part": part, **content}) + b"\n"
@@ -0,0 +1,135 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.summary.models import SessionSummary
+from app.analysis.models import ChatHistory
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+class SummaryDAO:
+    """
+    Data Access Object (DAO) class for the rolling per-session conversation summaries.
+    """
+
+    @staticmethod
+    def get_summary(db: Session, session_id: int):
+        """
+        Get the rolling summary of a session.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+
+        Returns:
+            SessionSummary: The summary, or None if the session has not been summarized yet.
+
+        Raises:
+            Exception: If the summary cannot be read.
+        """
+        try:
+            return db.query(SessionSummary).filter(SessionSummary.session_id == session_id).first()
+        except Exception as e:
+            logger.error(f"Error reading summary for session ID {session_id}: {str(e)}", event_type='session_summary_error')
+            raise Exception(f"Error reading session summary: {str(e)}")
+
+    @staticmethod
+    def get_unsummarized_turns(db: Session, session_id: int, after_id: int, keep_recent: int, limit: int):
+        """
+        Get the oldest chat turns not covered by the summary yet, leaving out the session's `keep_recent`
+        newest turns, which the tutor prompt includes verbatim anyway. The cutoff is found in SQL, so only
+        `keep_recent` index entries and at most `limit` rows are read however long the session is.
+
+        Only turns in chat_history are summarized: turns archived before being summarized are left out,
+        since sessions are only archived once idle.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            after_id (int): The latest ChatHistory ID already covered by the summary.
+            keep_recent (int): Number of newest turns to leave out.
+            limit (int): Maximum number of turns returned.
+
+        Returns:
+            list: (id, learner_response, llm_response) rows, oldest first.
+
+        Raises:
+            Exception: If the chat history cannot be read.
+        """
+        try:
+            query = (
+                select(ChatHistory.id, ChatHistory.learner_response, ChatHistory.llm_response)
+                .where(ChatHistory.session_id == session_id, ChatHistory.id > after_id)
+                .order_by(ChatHistory.id)
+                .limit(limit)
+            )
+            if keep_recent > 0:
+                # The oldest of the newest `keep_recent` turns; NULL, so nothing is returned, if there are fewer
+                oldest_recent_id = (
+                    select(ChatHistory.id)
+                    .where(ChatHistory.session_id == session_id, ChatHistory.id > after_id)
+                    .order_by(ChatHistory.id.desc())
+                    .offset(keep_recent - 1)
+                    .limit(1)
+                    .scalar_subquery()
+                )
+                query = query.where(ChatHistory.id < oldest_recent_id)
+            return db.execute(query).all()
+        except Exception as e:
+            logger.error(f"Error reading unsummarized turns for session ID {session_id}: {str(e)}", event_type='session_summary_error')
+            raise Exception(f"Error reading unsummarized turns: {str(e)}")
+
+    @staticmethod
+    def store_summary(db: Session, session_id: int, summary: str, summarized_through_id: int, summarized_turns: int,
+                      previous_through_id: int = None) -> bool:
+        """
+        Store an extended summary, unless another worker extended it first.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+            summary (str): The new summary.
+            summarized_through_id (int): The latest ChatHistory ID covered by the new summary.
+            summarized_turns (int): Number of chat turns covered by the new summary.
+            previous_through_id (int, optional): `summarized_through_id` of the summary that was extended,
+                or None if the session had no summary.
+
+        Returns:
+            bool: False if the summary changed in the meantime and the new one was discarded.
+
+        Raises:
+            Exception: If the summary cannot be stored.
+        """
+        try:
+            if previous_through_id is None:
+                db.add(SessionSummary(
+                    session_id=session_id,
+                    summary=summary,
+                    summarized_through_id=summarized_through_id,
+                    summarized_turns=summarized_turns
+                ))
+                stored = True
+            else:
+                stored = db.execute(
+                    update(SessionSummary)
+                    .where(SessionSummary.session_id == session_id)
+                    .where(SessionSummary.summarized_through_id == previous_through_id)
+                    .values(
+                        summary=summary,
+                        summarized_through_id=summarized_through_id,
+                        summarized_turns=summarized_turns,
+                        updated_at=datetime.utcnow()
+                    )
+                ).rowcount == 1
+            db.commit()
+            logger.info(f"Summary stored for session ID {session_id} through chat ID {summarized_through_id}.", event_type='session_summary_stored')
+            return stored
+        except IntegrityError:
+            # Another worker created the session's first summary
+            db.rollback()
+            return False
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing summary for session ID {session_id}: {str(e)}", event_type='session_summary_store_error')
+            raise Exception(f"Error storing session summary: {str(e)}")
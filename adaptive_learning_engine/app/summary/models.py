@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class SessionSummary(Base):
+    """
+    Represents the rolling summary of a session's earlier conversation, maintained in the background.
+
+    Attributes:
+        session_id (int): The primary key; the ID of the summarized session in session_details.
+        summary (str): The summary of the conversation up to `summarized_through_id`.
+        summarized_through_id (int): The latest ChatHistory ID covered by the summary.
+        summarized_turns (int): Number of chat turns covered by the summary.
+        updated_at (datetime): When the summary was last extended.
+    """
+    __tablename__ = 'session_summaries'
+
+    session_id = Column(Integer, primary_key=True, autoincrement=False)
+    summary = Column(String, nullable=False)
+    summarized_through_id = Column(Integer, nullable=False)
+    summarized_turns = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
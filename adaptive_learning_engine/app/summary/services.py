@@ -0,0 +1,177 @@
+import os
+import queue
+import threading
+from app.summary.dao import SummaryDAO
+from app.core.contextvar import tenant_context
+from app.core.database import SessionLocal, get_engine
+from app.core.open_ai_service import OpenAIService
+from app.core.model_router import TASK_SUMMARY
+from app.core.custom_logger import CustomLogger
+
+logger = CustomLogger()
+
+# Newest turns the tutor prompt includes verbatim; older turns are covered by the summary
+RECENT_TURNS = int(os.getenv('SUMMARY_RECENT_TURNS', '3'))
+
+# Unsummarized turns (beyond the recent ones) needed before a summarization call is made
+SUMMARY_BATCH_TURNS = int(os.getenv('SUMMARY_BATCH_TURNS', '4'))
+
+# Most turns folded into the summary by a single call, which bounds the summarization prompt
+SUMMARY_MAX_TURNS_PER_CALL = int(os.getenv('SUMMARY_MAX_TURNS_PER_CALL', '20'))
+
+# Set to 'false' to disable the background summarization
+SUMMARY_ENABLED = os.getenv('SUMMARY_ENABLED', 'true').lower() != 'false'
+
+SUMMARY_SYSTEM_PROMPT = "You maintain concise running notes on a tutoring session between an AI tutor and a learner."
+
+
+class SummaryService:
+    """
+    Service layer that folds a session's older chat turns into its rolling summary.
+    """
+
+    @staticmethod
+    def _build_prompt(summary: str, turns: list) -> str:
+        """
+        Build the prompt that extends a summary with new turns.
+        """
+        formatted_turns = "\n".join(
+            f"Learner: {turn.learner_response}\nAI: {turn.llm_response}" for turn in turns
+        )
+        return f'''
+Update the notes on this tutoring session with the new conversation turns.
+
+### Current Notes:
+{summary or "(none yet)"}
+
+### New Turns (oldest first):
+{formatted_turns}
+
+### Instructions:
+- Keep the topics covered, the questions asked and whether the learner answered them correctly.
+- Keep every misconception or recurring mistake the learner showed, and whether it was resolved.
+- Keep changes in the learner's difficulty level.
+- Drop greetings, repetition and worked explanations the learner did not struggle with.
+- Return only the updated notes, at most 200 words.
+'''
+
+    @staticmethod
+    def summarize_session(db, session_id: int) -> int:
+        """
+        Fold the session's unsummarized turns (except the newest RECENT_TURNS) into its summary,
+        once at least SUMMARY_BATCH_TURNS of them have accumulated. Archived turns are not summarized.
+
+        Args:
+            db (Session): Database session for executing queries.
+            session_id (int): The ID of the session.
+
+        Returns:
+            int: The number of turns added to the summary.
+
+        Raises:
+            Exception: If the summary cannot be read, generated or stored.
+        """
+        try:
+            summarized = 0
+            while True:
+                current = SummaryDAO.get_summary(db, session_id)
+                # Read before the rollback, which expires the row; the read through ID is also the compare-and-set guard
+                previous_summary, previous_through_id, previous_turns = (
+                    (current.summary, current.summarized_through_id, current.summarized_turns) if current else (None, None, 0)
+                )
+                turns = SummaryDAO.get_unsummarized_turns(
+                    db, session_id, previous_through_id or 0, RECENT_TURNS, max(SUMMARY_MAX_TURNS_PER_CALL, SUMMARY_BATCH_TURNS)
+                )
+                db.rollback()  # Do not hold a read transaction during the LLM call
+                if len(turns) < SUMMARY_BATCH_TURNS:
+                    return summarized
+
+                summary = OpenAIService().generate_response(
+                    SUMMARY_SYSTEM_PROMPT,
+                    SummaryService._build_prompt(previous_summary, turns),
+                    TASK_SUMMARY
+                ).strip()
+                stored = SummaryDAO.store_summary(
+                    db, session_id, summary, turns[-1].id, previous_turns + len(turns), previous_through_id
+                )
+                if not stored:
+                    logger.warning(f"Summary of session ID {session_id} changed concurrently, discarding.", event_type='session_summary_conflict')
+                    return summarized
+                summarized += len(turns)
+        except Exception as e:
+            logger.error(f"Error summarizing session ID {session_id}: {str(e)}", event_type='session_summary_error')
+            raise Exception(str(e))
+
+
+class SummaryWorker:
+    """
+    Background thread that keeps session summaries up to date off the request path.
+    Sessions are queued after each stored chat turn; a session queued several times before the worker
+    reaches it is summarized once.
+    """
+
+    def __init__(self):
+        """
+        Initialize the worker; the thread starts with the first queued session.
+        """
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, session_id: int):
+        """
+        Queue a session of the current tenant for summarization.
+
+        Args:
+            session_id (int): The ID of the session that received a new turn.
+        """
+        if not SUMMARY_ENABLED:
+            return
+        key = (tenant_context.get().get('tenant_id'), session_id)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='summary-worker', daemon=True)
+                self._thread.start()
+        self._queue.put(key)
+
+    def _run(self):
+        """
+        Summarize queued sessions until the process exits.
+        """
+        while True:
+            tenant_id, session_id = key = self._queue.get()
+            with self._lock:
+                self._pending.discard(key)
+            # Route the database session and log lines to the session's tenant
+            token = tenant_context.set({'tenant_id': tenant_id} if tenant_id else {})
+            db = None
+            try:
+                db = SessionLocal(bind=get_engine(tenant_id))
+                SummaryService.summarize_session(db, session_id)
+            except Exception as e:
+                logger.error(f"Background summarization failed for session ID {session_id}: {str(e)}", event_type='summary_worker_error')
+            finally:
+                if db is not None:
+                    db.close()
+                tenant_context.reset(token)
+
+
+summary_worker = None
+summary_worker_lock = threading.Lock()
+
+def get_summary_worker() -> SummaryWorker:
+    """
+    Get or create the process-wide summary worker.
+
+    Returns:
+        SummaryWorker: The summary worker instance.
+    """
+    global summary_worker
+    with summary_worker_lock:
+        if summary_worker is None:
+            summary_worker = SummaryWorker()
+    return summary_worker
@@ -0,0 +1,85 @@
+"""
+Cold-storage archival job for the Adaptive Learning Engine database.
+
+Moves the chat history of idle sessions out of the hot chat_history table into one compressed
+transcript per session in chat_archive. The API reads archived transcripts transparently.
+Sessions are archived in short chunked transactions, so the job can run next to the live service.
+
+Examples:
+    # Archive sessions with no turn among the last 10000 recorded turns
+    python3 archive_sessions.py --idle-turns 10000
+
+    # Archive sessions without activity in the last 30 days
+    python3 archive_sessions.py --idle-days 30
+
+    # Archive with zstd (requires the zstandard package) and rewrite the file afterwards
+    python3 archive_sessions.py --idle-turns 10000 --codec zstd --vacuum
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.database import DATABASE_URL, create_tables, tenant_database_url
+from app.analysis.models import Base as AnalysisBase
+from app.archive.models import Base as ArchiveBase
+from app.archive.dao import CODEC_ZLIB, CODEC_ZSTD
+from app.archive.services import ArchiveService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive the chat history of idle sessions into compressed transcripts.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Target database URL (default: %(default)s)")
+    parser.add_argument("--tenant", help="Archive the database of this tenant instead of --database-url")
+    idle = parser.add_mutually_exclusive_group(required=True)
+    idle.add_argument("--idle-turns", type=int, help="Archive sessions with no turn among this many most recent chat turns")
+    idle.add_argument("--idle-days", type=float,
+                      help="Archive sessions without activity in this many days (sessions without a recorded last activity included)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Sessions archived per transaction (default: %(default)s)")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to pause between chunks (default: %(default)s)")
+    parser.add_argument("--codec", choices=[CODEC_ZLIB, CODEC_ZSTD], default=CODEC_ZLIB,
+                        help="Transcript compression codec (default: %(default)s)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="Run a full VACUUM afterwards when the database is not in incremental auto_vacuum mode, "
+                             "and switch it to that mode so later runs shrink it without one. Without it, "
+                             "archiving does not shrink the database file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.codec == CODEC_ZSTD:
+        import zstandard  # noqa: F401 - fail before archiving anything if the optional codec is missing
+
+    database_url = tenant_database_url(args.tenant) if args.tenant else args.database_url
+    engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself, see below
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(connection):
+        # Take the write lock up front, so a chunk never fails to upgrade its read lock while live requests write
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    # Adds the activity columns to databases the server has not upgraded yet
+    create_tables(AnalysisBase.metadata, bind=engine)
+    create_tables(ArchiveBase.metadata, bind=engine)
+    started = time.perf_counter()
+    idle_since = datetime.utcnow() - timedelta(days=args.idle_days) if args.idle_days is not None else None
+    result = ArchiveService.archive_idle_sessions(
+        sessionmaker(bind=engine), args.idle_turns, args.chunk_size, args.pause, args.codec, idle_since
+    )
+    print(f"Archived {result['turns']} chat turns of {result['sessions']} idle sessions")
+    method = ArchiveService.reclaim_space(engine, args.vacuum)
+    if method == 'none':
+        print("Freed pages will be reused by new rows; run with --vacuum to shrink the file")
+    else:
+        print(f"Space reclaimed with {method}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
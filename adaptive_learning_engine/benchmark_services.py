@@ -0,0 +1,158 @@
+"""
+Deterministic benchmark of the Adaptive Learning Engine service layer.
+
+Runs ChatService.process_chat, SessionService.get_recommendation and AnalysisService.analyze_chat
+for the first sessions of a database, with the LLM calls replayed from a cassette, so the timings
+measure our own code (DAO, prompt building, validation, serialization) without network noise.
+Every run works on a fresh copy of the database, so the prompts, and thus the replayed calls, are
+the same in every run.
+
+Examples:
+    # Record the LLM calls of one run (needs the Azure OpenAI settings)
+    python3 benchmark_services.py --record --cassette cassettes/benchmark.jsonl
+
+    # Replay offline and keep the timings as the baseline
+    python3 benchmark_services.py --cassette cassettes/benchmark.jsonl --output baseline.json
+
+    # Fail if a service's median got more than 5% slower than the baseline
+    python3 benchmark_services.py --cassette cassettes/benchmark.jsonl --baseline baseline.json --tolerance 5
+"""
+import os
+
+# Background summarization and caching would make the runs differ; set before the app reads them
+os.environ['SUMMARY_ENABLED'] = 'false'
+os.environ['CACHE_BACKEND'] = 'none'
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from sqlalchemy import select
+from app.core.database import SessionLocal, _create_engine, create_tables
+from app.core.cassette import install_cassette, MODE_RECORD, MODE_REPLAY
+from app.analysis.models import Base as AnalysisBase, SessionDetails
+from app.archive.models import Base as ArchiveBase
+from app.summary.models import Base as SummaryBase
+from app.ability.models import Base as AbilityBase
+from app.chatWithLearner.models import Base as ChatBase
+from app.chatWithLearner.schemas import ChatRequest
+from app.chatWithLearner.services import ChatService
+from app.session.services import SessionService
+from app.analysis.services import AnalysisService
+
+LEARNER_RESPONSE = "I think the answer is 42, because the pattern doubles every step."
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the service layer with recorded LLM calls.")
+    parser.add_argument("--database", default="./AdaptiveLearning.db", help="SQLite database to copy for each run (default: %(default)s)")
+    parser.add_argument("--cassette", default="./cassettes/benchmark.jsonl", help="Cassette file (default: %(default)s)")
+    parser.add_argument("--record", action="store_true", help="Call the LLM and record a new cassette instead of replaying")
+    parser.add_argument("--replay-latency", choices=["none", "recorded"], default="none",
+                        help="Answer replayed calls immediately or after their recorded latency (default: %(default)s)")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions exercised per run (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs before the measured ones (default: %(default)s)")
+    parser.add_argument("--output", help="Write the timings to this JSON file")
+    parser.add_argument("--baseline", help="Compare the medians with this JSON file written by --output")
+    parser.add_argument("--tolerance", type=float, default=5.0,
+                        help="Slowdown against the baseline, in percent, that fails the benchmark (default: %(default)s)")
+    return parser.parse_args()
+
+
+def run_once(database: str, session_count: int) -> dict:
+    """
+    Exercise the services on a fresh copy of the database and return their call durations in seconds.
+    """
+    timings = {"process_chat": [], "get_recommendation": [], "analyze_chat": []}
+    with tempfile.TemporaryDirectory() as directory:
+        copy = os.path.join(directory, "benchmark.db")
+        shutil.copyfile(database, copy)
+        engine = _create_engine(f"sqlite:///{copy}")
+        for metadata in (AnalysisBase.metadata, ArchiveBase.metadata, SummaryBase.metadata, ChatBase.metadata, AbilityBase.metadata):
+            create_tables(metadata, bind=engine)
+        db = SessionLocal(bind=engine)
+        try:
+            session_ids = db.execute(select(SessionDetails.id).order_by(SessionDetails.id).limit(session_count)).scalars().all()
+            for session_id in session_ids:
+                calls = (
+                    ("process_chat", lambda: ChatService.process_chat(db, ChatRequest(session_id=session_id, learner_response=LEARNER_RESPONSE))),
+                    ("get_recommendation", lambda: SessionService.get_recommendation(db, session_id)),
+                    ("analyze_chat", lambda: AnalysisService.analyze_chat(db, session_id)),
+                )
+                for name, call in calls:
+                    started = time.perf_counter()
+                    call()
+                    timings[name].append(time.perf_counter() - started)
+        finally:
+            db.close()
+            engine.dispose()
+    return timings
+
+
+def summarize(timings: dict) -> dict:
+    """
+    Reduce the call durations to per-service statistics in milliseconds.
+    """
+    summary = {}
+    for name, durations in timings.items():
+        milliseconds = np.array(durations) * 1000
+        summary[name] = {
+            "calls": len(durations),
+            "median_ms": round(float(np.median(milliseconds)), 3),
+            "p95_ms": round(float(np.percentile(milliseconds, 95)), 3),
+            "mean_ms": round(float(milliseconds.mean()), 3),
+        }
+    return summary
+
+
+def main():
+    args = parse_args()
+    if args.record:
+        # Each request is recorded once; replayed runs repeat it
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        install_cassette(args.cassette, MODE_RECORD)
+        runs, warmup = 1, 0
+    else:
+        cassette = install_cassette(args.cassette, MODE_REPLAY, args.replay_latency)
+        runs, warmup = args.runs, args.warmup
+
+    timings = {}
+    for run in range(warmup + runs):
+        if not args.record:
+            cassette.rewind()
+        run_timings = run_once(args.database, args.sessions)
+        if run >= warmup:
+            for name, durations in run_timings.items():
+                timings.setdefault(name, []).extend(durations)
+
+    summary = summarize(timings)
+    print(f"{'service':<20}{'calls':>8}{'median ms':>12}{'p95 ms':>12}{'mean ms':>12}")
+    for name, stats in summary.items():
+        print(f"{name:<20}{stats['calls']:>8}{stats['median_ms']:>12.3f}{stats['p95_ms']:>12.3f}{stats['mean_ms']:>12.3f}")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressed = False
+        for name, stats in summary.items():
+            if name not in baseline:
+                continue
+            change = (stats["median_ms"] / baseline[name]["median_ms"] - 1) * 100
+            status = "REGRESSION" if change > args.tolerance else "ok"
+            regressed = regressed or change > args.tolerance
+            print(f"{name:<20}{change:>+8.1f}% vs baseline  {status}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Offline misconception clustering job for the Adaptive Learning Engine database.
+
+Groups the misconception strings of the stored analyses into clusters of similar misconceptions per
+learning goal, which GET /analytics/cohort/misconceptions serves ranked by number of sessions.
+Runs locally with NumPy (hashing TF-IDF vectors, incremental leader clustering): no LLM calls and
+no network. Each run only processes the analyses stored since the previous one.
+
+Examples:
+    # Cluster the new analyses of every learning goal
+    python3 cluster_misconceptions.py
+
+    # Re-cluster one learning goal from scratch with a stricter similarity threshold
+    python3 cluster_misconceptions.py --learning-goal Algebra --rebuild --threshold 0.6
+"""
+import argparse
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import DATABASE_URL, create_tables, tenant_database_url
+from app.analysis.models import Base as AnalysisBase
+from app.analysis.dao import AnalysisDAO
+from app.misconceptions.models import Base as MisconceptionBase
+from app.misconceptions.dao import MisconceptionDAO
+from app.misconceptions.services import MisconceptionService
+from app.misconceptions.clustering import SIMILARITY_THRESHOLD, MAX_CLUSTERS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cluster the misconceptions of stored analyses per learning goal.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Target database URL (default: %(default)s)")
+    parser.add_argument("--tenant", help="Cluster the database of this tenant instead of --database-url")
+    parser.add_argument("--learning-goal", help="Only cluster this learning goal (name)")
+    parser.add_argument("--batch-size", type=int, default=20000, help="Analyses per transaction (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="Minimum cosine similarity for a misconception to join a cluster (default: %(default)s)")
+    parser.add_argument("--max-clusters", type=int, default=MAX_CLUSTERS,
+                        help="Maximum number of clusters per learning goal (default: %(default)s)")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the existing clusters and cluster every analysis again")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    database_url = tenant_database_url(args.tenant) if args.tenant else args.database_url
+    engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+    create_tables(AnalysisBase.metadata, bind=engine)
+    create_tables(MisconceptionBase.metadata, bind=engine)
+
+    # The job is the only writer of the clusters; reloading them after every batch commit would only cost time
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        goals = AnalysisDAO.fetch_learning_goals(db)
+        if args.learning_goal:
+            goals = [(goal_id, name) for goal_id, name in goals if name == args.learning_goal]
+            if not goals:
+                raise SystemExit(f"Unknown learning goal '{args.learning_goal}'")
+
+        started = time.perf_counter()
+        for goal_id, name in goals:
+            if args.rebuild:
+                MisconceptionDAO.delete_clusters(db, goal_id)
+            goal_started = time.perf_counter()
+            result = MisconceptionService.cluster_learning_goal(db, goal_id, args.batch_size, args.threshold, args.max_clusters)
+            if result["analyses"]:
+                print(f"{name}: {result['misconceptions']} misconceptions from {result['analyses']} analyses, "
+                      f"{result['new_clusters']} new clusters ({result['clusters']} in total) "
+                      f"in {time.perf_counter() - goal_started:.1f}s")
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
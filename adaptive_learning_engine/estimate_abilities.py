@@ -0,0 +1,59 @@
+"""
+Bulk ability re-estimation job for the Adaptive Learning Engine database.
+
+Recomputes every session's ability estimate from the tutor's verdicts stored with its chat turns,
+e.g. after changing the estimator's parameters or to backfill sessions that predate the live estimates.
+Runs locally with vectorized NumPy updates: no LLM calls and no network. Sessions archived before
+the archive carried turn verdicts keep their estimates.
+
+Examples:
+    # Recompute the estimates
+    python3 estimate_abilities.py
+
+    # Recompute the estimates and move every session to the level its estimate maps to
+    python3 estimate_abilities.py --update-levels
+"""
+import argparse
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import DATABASE_URL, create_tables, tenant_database_url
+from app.analysis.models import Base as AnalysisBase
+from app.archive.models import Base as ArchiveBase
+from app.ability.models import Base as AbilityBase
+from app.ability.services import AbilityService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute the learners' ability estimates from the judged chat turns.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Target database URL (default: %(default)s)")
+    parser.add_argument("--tenant", help="Re-estimate the database of this tenant instead of --database-url")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Sessions per transaction (default: %(default)s)")
+    parser.add_argument("--update-levels", action="store_true",
+                        help="Also set each session's current level to the level its estimate maps to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    database_url = tenant_database_url(args.tenant) if args.tenant else args.database_url
+    engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+    # Adds the verdict column to databases the server has not upgraded yet
+    create_tables(AnalysisBase.metadata, bind=engine)
+    create_tables(ArchiveBase.metadata, bind=engine)
+    create_tables(AbilityBase.metadata, bind=engine)
+
+    db = sessionmaker(bind=engine)()
+    try:
+        started = time.perf_counter()
+        result = AbilityService.replay(db, args.batch_size, args.update_levels)
+        print(f"Replayed {result['turns']} judged turns of {result['sessions']} sessions")
+        if args.update_levels:
+            print(f"Changed the level of {result['level_changes']} sessions")
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Synthetic data generator for the Adaptive Learning Engine database.
+
+Creates the tables and bulk-loads learning goals, sessions and chat history with realistic
+text-length distributions, timestamps, LLM latencies and answer verdicts. Output is reproducible for a given --seed
+(timestamps are relative to the time of the run).
+
+Examples:
+    # Small sample dataset (replaces the old temp.py seeding)
+    python3 generate_data.py
+
+    # Benchmark-scale dataset
+    python3 generate_data.py --sessions 200000 --chat-rows 3000000 --database-url sqlite:///./bench.db
+
+    # Provision a tenant database with the learning goal catalog only
+    python3 generate_data.py --tenant school-42 --sessions 0 --chat-rows 0
+"""
+import os
+import argparse
+import time
+import numpy as np
+from datetime import datetime
+from sqlalchemy import create_engine, event, insert, update, select, func, make_url
+from app.core.database import DATABASE_URL, create_tables, tenant_database_url
+from app.core.contextvar import tenant_context
+from app.core.cache import get_cache, cache_key, CACHE_BACKEND
+from app.session.services import LEARNING_GOALS_CACHE_NAMESPACE
+from app.analysis.models import Base, LearningGoals, SessionDetails, ChatHistory
+from app.core.constants import STUDENT_LEVELS
+
+LEARNING_GOAL_NAMES = [
+    "Arithmetic", "Algebra", "Geometry", "Trigonometry", "Calculus",
+    "Probability", "Statistics", "Number Theory", "Linear Algebra",
+    "Discrete Mathematics", "Set Theory", "Differential Equations",
+    "Complex Numbers", "Mathematical Logic", "Combinatorics", "Topology",
+    "Graph Theory", "Mathematical Modelling", "Real Analysis", "Functional Analysis",
+    "Vector Calculus", "Numerical Methods", "Optimization Techniques",
+    "Game Theory", "Boolean Algebra", "Financial Mathematics",
+    "Cryptography", "Fractals and Chaos Theory", "Applied Mathematics",
+    "Differential Geometry"
+]
+
+VOCABULARY = (
+    "the a an of to and in is that for it as with was on be by this are or from at which can we "
+    "let's great job correct answer question try again next step equation variable value solve "
+    "angle triangle function derivative integral probability number prime matrix vector set proof "
+    "because therefore so now consider example think about how what why explain remember rule "
+    "formula result check your work close almost right wrong mistake careful multiply divide add "
+    "subtract square root power graph slope area volume sum product ratio percent fraction decimal"
+).split()
+
+# Median length in characters and log-normal spread of each text column
+LLM_RESPONSE_LENGTH = (450, 0.6)
+LEARNER_RESPONSE_LENGTH = (30, 0.9)
+MAX_TEXT_LENGTH = 4000
+
+# Mean pause between two turns of a session, in seconds
+TURN_INTERVAL_SECONDS = 90
+
+# Median LLM latency in milliseconds and its log-normal spread
+LLM_LATENCY_MS = (2500, 0.5)
+
+# Mean and spread of the learners' log-odds of answering correctly, and the share of answers judged partially correct
+ANSWER_SKILL = (0.4, 1.0)
+PARTIALLY_CORRECT_SHARE = 0.2
+
+
+class TextSampler:
+    """
+    Produces pseudo-natural text of requested lengths by slicing a pre-generated word corpus.
+    """
+
+    def __init__(self, rng: np.random.Generator, corpus_words: int = 400000):
+        """
+        Build the corpus.
+
+        Args:
+            rng (np.random.Generator): Random generator used for the corpus and offsets.
+            corpus_words (int): Number of words in the corpus.
+        """
+        self.rng = rng
+        self.corpus = " ".join(np.array(VOCABULARY)[rng.integers(0, len(VOCABULARY), corpus_words)])
+
+    def lengths(self, count: int, median: float, sigma: float) -> np.ndarray:
+        """
+        Draw log-normally distributed text lengths.
+        """
+        lengths = self.rng.lognormal(np.log(median), sigma, count).astype(np.int64)
+        return np.clip(lengths, 1, MAX_TEXT_LENGTH)
+
+    def texts(self, lengths: np.ndarray) -> list:
+        """
+        Return one text per requested length.
+        """
+        offsets = self.rng.integers(0, len(self.corpus) - MAX_TEXT_LENGTH, len(lengths))
+        corpus = self.corpus
+        return [corpus[start:start + length].strip() or "ok" for start, length in zip(offsets.tolist(), lengths.tolist())]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic learning goals, sessions and chat history.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Target database URL (default: %(default)s)")
+    parser.add_argument("--tenant", help="Target the database of this tenant instead of --database-url")
+    parser.add_argument("--sessions", type=int, default=25, help="Number of sessions to create (default: %(default)s)")
+    parser.add_argument("--chat-rows", type=int, default=250, help="Number of chat_history rows to create (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible output (default: %(default)s)")
+    parser.add_argument("--days", type=float, default=30, help="Sessions start within this many past days (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per insert transaction (default: %(default)s)")
+    return parser.parse_args()
+
+
+def bulk_insert(connection, table, rows: list):
+    """
+    Insert rows with a single executemany call.
+    """
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+def seed_learning_goals(engine) -> list:
+    """
+    Insert the learning goal catalog if the table is empty and return all goal IDs.
+    """
+    with engine.begin() as connection:
+        if not connection.execute(select(func.count()).select_from(LearningGoals)).scalar():
+            bulk_insert(connection, LearningGoals.__table__, [{"learning_goal_names": name} for name in LEARNING_GOAL_NAMES])
+        return connection.execute(select(LearningGoals.id).order_by(LearningGoals.id)).scalars().all()
+
+
+def seed_sessions(engine, rng: np.random.Generator, goal_ids: list, count: int, batch_size: int,
+                  now: np.datetime64, days: float) -> tuple:
+    """
+    Insert sessions with explicit IDs following the current maximum and return the new IDs, their start times
+    and initial level indexes.
+    Goal popularity is skewed, the current level drifts at most one step from the initial level and
+    sessions start uniformly over the past `days` days.
+    """
+    with engine.connect() as connection:
+        first_id = (connection.execute(select(func.max(SessionDetails.id))).scalar() or 0) + 1
+    session_ids = np.arange(first_id, first_id + count)
+
+    goal_weights = rng.zipf(1.5, len(goal_ids)).astype(float)
+    goals = np.array(goal_ids)[rng.choice(len(goal_ids), count, p=goal_weights / goal_weights.sum())]
+    initial = rng.choice(len(STUDENT_LEVELS), count, p=[0.5, 0.35, 0.15])
+    current = np.clip(initial + rng.choice([-1, 0, 1], count, p=[0.15, 0.55, 0.3]), 0, len(STUDENT_LEVELS) - 1)
+    started_at = now - (rng.uniform(0, days * 86400, count) * 1e6).astype('timedelta64[us]')
+    started_at_values = started_at.tolist()
+
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        rows = [
+            {
+                "id": session_id,
+                "learning_goal_id": goal_id,
+                "student_initial_level": STUDENT_LEVELS[initial_level],
+                "student_current_level": STUDENT_LEVELS[current_level],
+                "created_at": session_started_at,
+                "last_activity_at": session_started_at
+            }
+            for session_id, goal_id, initial_level, current_level, session_started_at in zip(
+                session_ids[start:end].tolist(), goals[start:end].tolist(),
+                initial[start:end].tolist(), current[start:end].tolist(), started_at_values[start:end]
+            )
+        ]
+        with engine.begin() as connection:
+            bulk_insert(connection, SessionDetails.__table__, rows)
+    return session_ids, started_at, initial
+
+
+def seed_chat_history(engine, rng: np.random.Generator, session_ids: np.ndarray, started_at: np.ndarray,
+                      initial_levels: np.ndarray, count: int, batch_size: int, now: np.datetime64):
+    """
+    Insert chat turns spread over the sessions with a heavy-tailed turns-per-session distribution.
+    Turns of a session are contiguous, and each session's first turn has an empty learner response,
+    as produced by the chat endpoint's opening overview. A session's turns follow its start time at
+    random intervals (none in the future), and its last activity is set to its latest turn.
+    Answers after the first turn are judged correct more often for learners with a higher initial level.
+    """
+    if count == 0 or len(session_ids) == 0:
+        return
+    sampler = TextSampler(rng)
+    activity = rng.lognormal(0.0, 1.0, len(session_ids))
+    turn_sessions = np.sort(session_ids[rng.choice(len(session_ids), count, p=activity / activity.sum())])
+    is_first_turn = np.ones(count, dtype=bool)
+    is_first_turn[1:] = turn_sessions[1:] != turn_sessions[:-1]
+
+    # Elapsed time within each session: cumulative intervals, restarted at each session's first turn
+    elapsed = np.cumsum(rng.exponential(TURN_INTERVAL_SECONDS, count))
+    elapsed -= np.maximum.accumulate(np.where(is_first_turn, elapsed, 0.0))
+    turn_times = started_at[turn_sessions - session_ids[0]] + (elapsed * 1e6).astype('timedelta64[us]')
+    turn_times = np.minimum(turn_times, now)
+    latencies = np.clip(rng.lognormal(np.log(LLM_LATENCY_MS[0]), LLM_LATENCY_MS[1], count), 200, 60000).astype(np.int64)
+
+    # A separate stream, so the other columns stay as generated for the same seed before verdicts existed
+    verdict_rng, = rng.spawn(1)
+    skill = verdict_rng.normal(ANSWER_SKILL[0], ANSWER_SKILL[1], len(session_ids)) + initial_levels - 1
+    success = 1.0 / (1.0 + np.exp(-skill[turn_sessions - session_ids[0]]))
+    verdicts = np.where(verdict_rng.uniform(size=count) < success, "correct", "incorrect").astype(object)
+    verdicts[verdict_rng.uniform(size=count) < PARTIALLY_CORRECT_SHARE] = "partially_correct"
+    verdicts[is_first_turn] = "not_applicable"
+
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        size = end - start
+        llm_responses = sampler.texts(sampler.lengths(size, *LLM_RESPONSE_LENGTH))
+        learner_responses = sampler.texts(sampler.lengths(size, *LEARNER_RESPONSE_LENGTH))
+        rows = [
+            {
+                "session_id": session_id, "llm_response": llm_response, "learner_response": "" if first else learner_response,
+                "created_at": created_at, "llm_latency_ms": latency, "answer_verdict": verdict
+            }
+            for session_id, llm_response, learner_response, first, created_at, latency, verdict in zip(
+                turn_sessions[start:end].tolist(), llm_responses, learner_responses, is_first_turn[start:end].tolist(),
+                turn_times[start:end].tolist(), latencies[start:end].tolist(), verdicts[start:end].tolist()
+            )
+        ]
+        with engine.begin() as connection:
+            bulk_insert(connection, ChatHistory.__table__, rows)
+        print(f"  chat_history: {end}/{count} rows")
+
+    latest_turn = (
+        select(func.max(ChatHistory.created_at)).where(ChatHistory.session_id == SessionDetails.id).scalar_subquery()
+    )
+    with engine.begin() as connection:
+        connection.execute(
+            update(SessionDetails)
+            .where(SessionDetails.id.between(int(session_ids[0]), int(session_ids[-1])))
+            .values(last_activity_at=func.coalesce(latest_turn, SessionDetails.last_activity_at))
+        )
+
+
+def main():
+    args = parse_args()
+    database_url = make_url(tenant_database_url(args.tenant) if args.tenant else args.database_url)
+    if database_url.get_backend_name() == 'sqlite' and database_url.database:
+        os.makedirs(os.path.dirname(os.path.abspath(database_url.database)), exist_ok=True)
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def use_fast_bulk_load_settings(dbapi_connection, connection_record):
+        # Durability is not needed while generating throwaway data
+        dbapi_connection.execute("PRAGMA synchronous = OFF")
+
+    create_tables(Base.metadata, bind=engine)
+    rng = np.random.default_rng(args.seed)
+
+    started = time.perf_counter()
+    goal_ids = seed_learning_goals(engine)
+    print(f"Learning goals available: {len(goal_ids)}")
+    # Servers sharing the cache (CACHE_BACKEND=sqlite) stop serving a catalog cached before seeding
+    tenant_context.set({'tenant_id': args.tenant} if args.tenant else {})
+    get_cache().delete(cache_key(LEARNING_GOALS_CACHE_NAMESPACE))
+    if CACHE_BACKEND != 'sqlite':
+        print(f"Warning: CACHE_BACKEND={CACHE_BACKEND} is not shared, so running servers were not invalidated and may "
+              "serve the previous learning goal catalog for up to LEARNING_GOALS_CACHE_TTL_SECONDS. "
+              "Use CACHE_BACKEND=sqlite on the servers and here, or restart them.")
+    now = np.datetime64(datetime.utcnow(), 'us')
+    session_ids, started_at, initial_levels = seed_sessions(engine, rng, goal_ids, args.sessions, args.batch_size, now, args.days)
+    print(f"Sessions inserted: {len(session_ids)}")
+    seed_chat_history(engine, rng, session_ids, started_at, initial_levels, args.chat_rows, args.batch_size, now)
+    print(f"Chat history rows inserted: {args.chat_rows}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
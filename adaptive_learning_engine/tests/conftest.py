@@ -0,0 +1,139 @@
+"""
+Shared fixtures of the test suite.
+
+The application reads its settings when its modules are imported and creates its default database in the
+working directory, so both are set up here, before any application module is imported. Each test gets
+a fresh copy of a small seeded database, and LLM calls are either answered with canned responses while
+recording a cassette, or replayed from that cassette.
+"""
+import os
+import tempfile
+
+WORK_DIRECTORY = tempfile.mkdtemp(prefix="adaptive-learning-tests-")
+os.chdir(WORK_DIRECTORY)
+os.environ.update({
+    "LOG_LEVEL": "ERROR",
+    # Background work and caching would make recorded and replayed runs differ
+    "WARMUP_ENABLED": "false",
+    "SUMMARY_ENABLED": "false",
+    "CACHE_BACKEND": "none",
+    # Only used to build the (never called) Azure OpenAI clients while recording
+    "AZURE_OPENAI_ENDPOINT": "https://example.invalid",
+    "AZURE_OPENAI_API_KEY": "test",
+    "AZURE_OPENAI_MODEL_NAME": "test-model",
+})
+os.environ.pop("LLM_CASSETTE_MODE", None)
+
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app, APPLICATION_SCHEMAS
+from app.core import database
+from app.core import cassette as cassette_module
+from app.core.cassette import install_cassette, MODE_RECORD, MODE_REPLAY
+from app.core.open_ai_service import OpenAIService
+from app.analysis.models import LearningGoals, SessionDetails, ChatHistory
+from tests.llm_responses import canned_llm_response
+
+TEMPLATE_DATABASE = os.path.join(WORK_DIRECTORY, "template.db")
+
+
+def seed_database(url: str) -> dict:
+    """
+    Create the schema and one learning goal with a session that already has a few judged turns.
+
+    Returns:
+        dict: The IDs of the seeded rows.
+    """
+    engine = database._create_engine(url)
+    for metadata in APPLICATION_SCHEMAS:
+        database.create_tables(metadata, bind=engine)
+    db = database.SessionLocal(bind=engine)
+    try:
+        goal = LearningGoals(learning_goal_names="Probability")
+        db.add(goal)
+        db.flush()
+        session = SessionDetails(learning_goal_id=goal.id, student_initial_level="beginner", student_current_level="beginner")
+        empty_session = SessionDetails(learning_goal_id=goal.id, student_initial_level="intermediate", student_current_level="intermediate")
+        db.add_all([session, empty_session])
+        db.flush()
+        db.add_all([
+            ChatHistory(session_id=session.id, llm_response="What is the probability of heads with a fair coin?",
+                        learner_response="", answer_verdict="not_applicable"),
+            ChatHistory(session_id=session.id, llm_response="Correct! What about rolling a six with a fair die?",
+                        learner_response="1/2", answer_verdict="correct"),
+            ChatHistory(session_id=session.id, llm_response="Not quite. What is the probability of two heads in a row?",
+                        learner_response="1/3", answer_verdict="incorrect"),
+        ])
+        db.commit()
+        return {"learning_goal_id": goal.id, "session_id": session.id, "empty_session_id": empty_session.id}
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def seeded_ids() -> dict:
+    """
+    Seed the template database copied by every test, once per run.
+    """
+    return seed_database(f"sqlite:///{TEMPLATE_DATABASE}")
+
+
+@pytest.fixture
+def fresh_database(seeded_ids, tmp_path, monkeypatch):
+    """
+    Return a function that points the application at a fresh copy of the seeded database.
+    """
+    engines = []
+
+    def use_fresh_database():
+        copy = tmp_path / f"database-{len(engines)}.db"
+        shutil.copyfile(TEMPLATE_DATABASE, copy)
+        engine = database._create_engine(f"sqlite:///{copy}")
+        engines.append(engine)
+        monkeypatch.setattr(database, "engine", engine)
+        return engine
+
+    yield use_fresh_database
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def client(fresh_database):
+    """
+    A test client of the application on a fresh copy of the seeded database, with the LLM calls
+    answered by `canned_llm_response`.
+    """
+    fresh_database()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(OpenAIService, "_call_tiers", lambda self, *call: canned_llm_response(*call))
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture
+def record_and_replay(fresh_database, tmp_path, monkeypatch):
+    """
+    Return a function that runs an exercise of the API twice, each time on a fresh copy of the seeded
+    database: first recording the LLM calls, answered with canned responses, to a cassette, then replaying
+    them from the cassette with the LLM unreachable. It returns the results of both runs.
+    """
+    monkeypatch.setattr(cassette_module, "cassette", None)
+    cassette_path = str(tmp_path / "llm-calls.jsonl")
+
+    def unreachable_llm(self, *call):
+        raise AssertionError("A replayed call reached the LLM; its request differs from the recorded one.")
+
+    def run(exercise):
+        results = []
+        for mode, call_tiers in ((MODE_RECORD, lambda self, *call: canned_llm_response(*call)), (MODE_REPLAY, unreachable_llm)):
+            fresh_database()
+            install_cassette(cassette_path, mode, "none")
+            monkeypatch.setattr(OpenAIService, "_call_tiers", call_tiers)
+            with TestClient(app) as test_client:
+                results.append(exercise(test_client))
+        return results
+
+    return run
@@ -0,0 +1,26 @@
+"""
+Canned LLM responses the tests record to their cassettes instead of calling Azure OpenAI.
+"""
+import json
+
+TUTOR_MESSAGE = "Not quite: a fair coin lands heads with probability 1/2. What is the probability of two heads in a row?"
+
+ANALYSIS = {
+    "total_questions_asked": 2,
+    "total_questions_answered_wrong": 1,
+    "misconceptions": ["Adds the probabilities of independent events instead of multiplying them"],
+    "feedback": "Review the multiplication rule for independent events."
+}
+
+RECOMMENDATION = "Practice computing the probability of sequences of independent events."
+
+
+def canned_llm_response(system_prompt: str, user_prompt: str, task_type: str, options: dict) -> str:
+    """
+    Answer an LLM call like the model would, based on the response format the prompt asks for.
+    """
+    if "tutor_message" in system_prompt or "tutor_message" in user_prompt:
+        return json.dumps({"tutor_message": TUTOR_MESSAGE, "answer_verdict": "incorrect", "difficulty_level": "beginner"})
+    if "response_format" in options:
+        return json.dumps(ANALYSIS)
+    return RECOMMENDATION
@@ -0,0 +1,82 @@
+import numpy as np
+from app.ability.estimator import (
+    update_abilities, replay_abilities, levels_for, expected_scores, step_sizes,
+    LEVEL_THRESHOLDS, LEVEL_MARGIN, VERDICT_SCORES, INITIAL_STEP, MIN_STEP, ABILITY_BOUND
+)
+
+BEGINNER, INTERMEDIATE, ADVANCED = 0, 1, 2
+
+
+def test_expected_score_is_one_half_at_the_level_difficulty():
+    assert expected_scores(0.0, INTERMEDIATE) == 0.5
+    assert expected_scores(0.0, BEGINNER) > 0.5 > expected_scores(0.0, ADVANCED)
+
+
+def test_step_size_decays_to_the_floor():
+    assert step_sizes(0) == INITIAL_STEP
+    assert step_sizes(1) < step_sizes(0)
+    assert step_sizes(10_000) == MIN_STEP
+
+
+def test_update_moves_the_ability_by_the_surprise():
+    correct, wrong = VERDICT_SCORES["correct"], VERDICT_SCORES["incorrect"]
+
+    ability, level = update_abilities(0.0, 0, INTERMEDIATE, correct)
+    assert ability == INITIAL_STEP * 0.5
+    assert level == INTERMEDIATE
+
+    ability, _ = update_abilities(0.0, 0, INTERMEDIATE, wrong)
+    assert ability == -INITIAL_STEP * 0.5
+
+    # A correct answer to an easy question is less surprising than one to a hard question
+    easy, _ = update_abilities(0.0, 0, BEGINNER, correct)
+    hard, _ = update_abilities(0.0, 0, ADVANCED, correct)
+    assert 0 < easy < hard
+
+    # A partially correct answer to a question at the learner's level says nothing new
+    unchanged, _ = update_abilities(0.0, 3, INTERMEDIATE, VERDICT_SCORES["partially_correct"])
+    assert unchanged == 0.0
+
+
+def test_update_keeps_the_ability_within_bounds():
+    ability, level = update_abilities(ABILITY_BOUND, 0, BEGINNER, VERDICT_SCORES["correct"])
+    assert ability == ABILITY_BOUND
+    assert level == ADVANCED
+    ability, level = update_abilities(-ABILITY_BOUND, 0, ADVANCED, VERDICT_SCORES["incorrect"])
+    assert ability == -ABILITY_BOUND
+    assert level == BEGINNER
+
+
+def test_levels_change_only_past_the_margin():
+    upper = LEVEL_THRESHOLDS[1]
+    assert levels_for(upper + LEVEL_MARGIN / 2, INTERMEDIATE) == INTERMEDIATE
+    assert levels_for(upper - LEVEL_MARGIN / 2, ADVANCED) == ADVANCED
+    assert levels_for(upper + LEVEL_MARGIN, INTERMEDIATE) == ADVANCED
+    assert levels_for(upper - LEVEL_MARGIN * 2, ADVANCED) == INTERMEDIATE
+    # Far past a threshold the level can move by more than one
+    assert levels_for(ABILITY_BOUND, BEGINNER) == ADVANCED
+
+
+def test_replay_matches_turn_by_turn_updates():
+    turn_learners = np.array([0, 0, 0, 0, 1, 2, 2])
+    verdicts = ["correct", "correct", "incorrect", "correct", "incorrect", "partially_correct", "correct"]
+    scores = np.array([VERDICT_SCORES[verdict] for verdict in verdicts])
+    initial_abilities = np.array([-1.0, 0.0, 1.0])
+    initial_levels = np.array([BEGINNER, INTERMEDIATE, ADVANCED])
+
+    abilities, levels, judged_turns = replay_abilities(turn_learners, scores, initial_abilities.copy(), initial_levels.copy())
+
+    for learner in range(3):
+        ability, level = initial_abilities[learner], initial_levels[learner]
+        for position, score in enumerate(scores[turn_learners == learner]):
+            ability, level = update_abilities(ability, position, level, score)
+        assert np.isclose(abilities[learner], ability)
+        assert levels[learner] == level
+    assert judged_turns.tolist() == [4, 1, 2]
+
+
+def test_replay_without_turns_keeps_the_initial_estimates():
+    abilities, levels, judged_turns = replay_abilities(np.array([], dtype=np.int64), np.array([]), np.array([0.5]), np.array([INTERMEDIATE]))
+    assert abilities.tolist() == [0.5]
+    assert levels.tolist() == [INTERMEDIATE]
+    assert judged_turns.tolist() == [0]
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from app.analysis.models import ChatHistory, SessionDetails
+from app.archive.dao import ArchiveDAO
+from app.core.database import open_session
+
+
+def cohorts_by_level(client, **params) -> dict:
+    response = client.get("/analytics/cohort", params=params)
+    assert response.status_code == 200
+    return {cohort["level"]: cohort for cohort in response.json()}
+
+
+def test_cohorts_aggregate_turns_analyses_and_level_transitions(client, seeded_ids):
+    beginners = {"learner_level": "beginner", "learning_goal": "Probability"}
+    created = client.post("/create-sessions", json={"sessions": [beginners, beginners]}).json()["results"]
+    db = open_session()
+    try:
+        db.get(SessionDetails, created[0]["session"]["id"]).student_current_level = "intermediate"
+        db.commit()
+    finally:
+        db.close()
+    assert client.post(f"/analytics/student/{seeded_ids['session_id']}").status_code == 200
+
+    cohorts = cohorts_by_level(client)
+    assert set(cohorts) == {"beginner", "intermediate"}
+    beginner = cohorts["beginner"]
+    assert (beginner["learning_goal"], beginner["sessions"], beginner["analyzed_sessions"]) == ("Probability", 3, 1)
+    # The seeded session has 3 turns, the new ones none
+    assert {key: beginner["turns_per_session"][key] for key in ("count", "mean", "min", "p50", "max")} == {
+        "count": 3, "mean": 1.0, "min": 0.0, "p50": 0.0, "max": 3.0
+    }
+    # From the stored analysis: 2 questions asked, 1 answered wrong
+    assert (beginner["questions_asked"]["mean"], beginner["error_rate"]["mean"]) == (2.0, 0.5)
+    assert beginner["level_transitions"] == {"beginner": 2, "intermediate": 1}
+
+    intermediate = cohorts["intermediate"]
+    assert (intermediate["sessions"], intermediate["analyzed_sessions"]) == (1, 0)
+    assert intermediate["error_rate"] == {"count": 0, "mean": None, "min": None, "p50": None, "p90": None, "max": None}
+
+
+def test_cohorts_can_be_restricted_to_a_learning_goal(client):
+    assert set(cohorts_by_level(client, learning_goal="Probability")) == {"beginner", "intermediate"}
+    assert client.get("/analytics/cohort", params={"learning_goal": "Astrology"}).status_code == 404
+
+
+def test_usage_is_aggregated_per_day_including_archived_turns(client, seeded_ids):
+    session_id, other_session_id = seeded_ids["session_id"], seeded_ids["empty_session_id"]
+    three_days_ago = datetime.utcnow() - timedelta(days=3)
+    db = open_session()
+    try:
+        db.add_all([
+            ChatHistory(session_id=other_session_id, learner_response="1/2", llm_response="Correct!",
+                        created_at=three_days_ago, llm_latency_ms=latency)
+            for latency in (100, 300)
+        ] + [
+            # Outside the window
+            ChatHistory(session_id=other_session_id, learner_response="1/6", llm_response="Correct!",
+                        created_at=datetime.utcnow() - timedelta(days=30), llm_latency_ms=900)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get("/analytics/usage", params={"days": 7})
+    assert response.status_code == 200
+    usage = response.json()
+    # The 3 seeded turns (without a latency) and the 2 turns three days ago
+    assert usage["turns"] == 5
+    assert usage["llm_latency_ms"]["count"] == 2
+    assert (usage["llm_latency_ms"]["mean"], usage["llm_latency_ms"]["max"]) == (200.0, 300.0)
+    assert sum(day["turns"] for day in usage["days"]) == 5
+    earliest = usage["days"][0]
+    assert (earliest["day"], earliest["turns"], earliest["active_sessions"]) == (three_days_ago.date().isoformat(), 2, 1)
+
+    # Archived turns still count; a new turn of the other session keeps the archived IDs from being reused
+    assert client.post("/chat-with-gpt", json={"session_id": session_id, "learner_response": "1/4"}).status_code == 200
+    db = open_session()
+    try:
+        assert ArchiveDAO.archive_sessions(db, [other_session_id], ArchiveDAO.get_latest_chat_id(db) - 1) == 3
+    finally:
+        db.close()
+    archived_usage = client.get("/analytics/usage", params={"days": 7}).json()
+    assert archived_usage["turns"] == 6
+    assert archived_usage["llm_latency_ms"]["count"] == 3
+    assert archived_usage["days"][0]["turns"] == 2
+
+    assert client.get("/analytics/usage", params={"days": 0}).status_code == 422
@@ -0,0 +1,87 @@
+import json
+import pytest
+from app.archive import dao as archive_dao
+from app.archive.dao import ArchiveDAO
+from app.core.database import open_session
+
+
+def archive_session(client, session_id: int, other_session_id: int) -> int:
+    """
+    Archive a session's hot turns, as the archiver does once the session is idle. Like the archiver, this keeps
+    the latest chat turn hot, so SQLite does not reuse archived IDs; a turn of another session is added to be it.
+    """
+    chat(client, other_session_id, "")
+    db = open_session()
+    try:
+        return ArchiveDAO.archive_sessions(db, [session_id], ArchiveDAO.get_latest_chat_id(db) - 1)
+    finally:
+        db.close()
+
+
+def chat(client, session_id: int, learner_response: str):
+    response = client.post("/chat-with-gpt", json={"session_id": session_id, "learner_response": learner_response})
+    assert response.status_code == 200
+
+
+def history(client, session_id: int, **params) -> list:
+    response = client.get(f"/session/{session_id}/chat-history", params=params)
+    assert response.status_code == 200
+    return response.json()["items"]
+
+
+def exported(client, session_id: int, **params) -> list:
+    response = client.get(f"/session/{session_id}/chat-history/export", params=params)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.fixture
+def decompressions(monkeypatch) -> list:
+    """
+    The archived transcripts decompressed during a test.
+    """
+    calls = []
+    decompress = archive_dao.decompress_transcript
+
+    def counted(payload, codec):
+        calls.append(codec)
+        return decompress(payload, codec)
+
+    monkeypatch.setattr(archive_dao, "decompress_transcript", counted)
+    return calls
+
+
+def test_archived_sessions_read_like_hot_ones_and_can_be_resumed(client, seeded_ids):
+    session_id, other_session_id = seeded_ids["session_id"], seeded_ids["empty_session_id"]
+    hot = history(client, session_id)
+
+    assert archive_session(client, session_id, other_session_id) == 3
+    assert history(client, session_id) == hot
+    assert exported(client, session_id) == hot
+
+    # Resuming the session adds hot turns after the archived ones
+    chat(client, session_id, "1/4")
+    resumed = history(client, session_id)
+    assert resumed[:3] == hot
+    assert [entry["learner_response"] for entry in resumed[3:]] == ["1/4"]
+
+    # Archiving the resumed session again extends its archive
+    assert archive_session(client, session_id, other_session_id) == 1
+    assert history(client, session_id) == resumed
+    assert history(client, session_id, after_id=resumed[1]["id"], limit=1) == resumed[2:3]
+
+
+def test_pages_past_the_archive_do_not_decompress_it(client, seeded_ids, decompressions):
+    session_id = seeded_ids["session_id"]
+    archive_session(client, session_id, seeded_ids["empty_session_id"])
+    chat(client, session_id, "1/4")
+    decompressions.clear()
+
+    first_page = client.get(f"/session/{session_id}/chat-history", params={"limit": 3}).json()
+    assert first_page["has_more"] is True
+    assert len(decompressions) == 1
+
+    cursor = first_page["next_cursor"]
+    assert [entry["learner_response"] for entry in history(client, session_id, after_id=cursor)] == ["1/4"]
+    assert [entry["learner_response"] for entry in exported(client, session_id, after_id=cursor)] == ["1/4"]
+    assert len(decompressions) == 1
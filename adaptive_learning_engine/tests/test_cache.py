@@ -0,0 +1,84 @@
+import time
+from app.core.cache import MemoryCache, SQLiteCache, cache_key
+from app.core.contextvar import tenant_context
+
+POLL_INTERVAL = 0.05
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_entries=10)
+    cache.set("short", "value", ttl=0.01)
+    cache.set("long", "value", ttl=60)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_memory_cache_invalidation():
+    cache = MemoryCache(max_entries=10)
+    for key in ("t:goals:1", "t:goals:2", "t:recommendation:1"):
+        cache.set(key, key)
+    cache.delete("t:recommendation:1")
+    cache.delete_prefix("t:goals:")
+    assert [cache.get(key) for key in ("t:goals:1", "t:goals:2", "t:recommendation:1")] == [None, None, None]
+
+
+def test_memory_cache_does_not_store_none():
+    cache = MemoryCache(max_entries=10)
+    cache.set("missing", None)
+    assert cache._entries == {}
+
+
+def test_sqlite_cache_is_shared_by_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = SQLiteCache(path, max_entries=100, near_entries=10, poll_interval=POLL_INTERVAL)
+    reader = SQLiteCache(path, max_entries=100, near_entries=10, poll_interval=POLL_INTERVAL)
+    writer.set("t:goals:1", {"name": "Probability"})
+    assert reader.get("t:goals:1") == {"name": "Probability"}
+
+
+def test_sqlite_cache_invalidation_reaches_other_near_caches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = SQLiteCache(path, max_entries=100, near_entries=10, poll_interval=POLL_INTERVAL)
+    reader = SQLiteCache(path, max_entries=100, near_entries=10, poll_interval=POLL_INTERVAL)
+    for key in ("t:goals:1", "t:goals:2", "t:recommendation:1"):
+        writer.set(key, key)
+        # Loads the entry into the reader's near cache
+        assert reader.get(key) == key
+
+    writer.delete("t:recommendation:1")
+    writer.delete_prefix("t:goals:")
+    # Stale values may be served from the near cache until the next poll of the invalidation log
+    time.sleep(POLL_INTERVAL * 2)
+
+    assert [reader.get(key) for key in ("t:goals:1", "t:goals:2", "t:recommendation:1")] == [None, None, None]
+
+
+def test_sqlite_cache_without_near_cache_reads_through(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = SQLiteCache(path, max_entries=100, near_entries=0, poll_interval=POLL_INTERVAL)
+    reader = SQLiteCache(path, max_entries=100, near_entries=0, poll_interval=POLL_INTERVAL)
+    writer.set("t:goals:1", "value")
+    assert reader.get("t:goals:1") == "value"
+    writer.delete("t:goals:1")
+    assert reader.get("t:goals:1") is None
+
+
+def test_cache_keys_are_scoped_to_the_tenant():
+    token = tenant_context.set({"tenant_id": "school-a"})
+    try:
+        tenant_key = cache_key("recommendation", 1, 2)
+    finally:
+        tenant_context.reset(token)
+    assert tenant_key == "school-a:recommendation:1:2"
+    assert tenant_key != cache_key("recommendation", 1, 2)
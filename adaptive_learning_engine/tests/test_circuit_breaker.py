@@ -0,0 +1,86 @@
+import time
+import pytest
+from app.core.circuit_breaker import CircuitBreaker, LLMUnavailable, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+OPEN_SECONDS = 0.05
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=10, open_seconds=30, half_open_probes=1)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allows_calls()
+    assert 0 < breaker.retry_after() <= 30
+    with pytest.raises(LLMUnavailable) as unavailable:
+        breaker.before_call()
+    assert unavailable.value.retry_after > 0
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=10, open_seconds=30, half_open_probes=1)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+
+
+def test_slow_success_counts_as_failure():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1, open_seconds=30, half_open_probes=1)
+    breaker.record_success(1.5)
+    breaker.record_success(2.0)
+    assert breaker.state == STATE_OPEN
+
+
+def test_half_open_probe_success_closes_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=10, open_seconds=OPEN_SECONDS, half_open_probes=1)
+    open_breaker(breaker)
+    time.sleep(OPEN_SECONDS)
+
+    assert breaker.allows_calls()
+    breaker.before_call()
+    assert breaker.state == STATE_HALF_OPEN
+    # Only one probe at a time; other calls keep failing fast
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == STATE_CLOSED
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_opens_the_breaker_again():
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=10, open_seconds=OPEN_SECONDS, half_open_probes=1)
+    open_breaker(breaker)
+    time.sleep(OPEN_SECONDS)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+
+
+def test_released_probe_frees_its_slot():
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=10, open_seconds=OPEN_SECONDS, half_open_probes=1)
+    open_breaker(breaker)
+    time.sleep(OPEN_SECONDS)
+
+    breaker.before_call()
+    breaker.release()
+
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.before_call()
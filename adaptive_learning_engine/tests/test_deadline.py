@@ -0,0 +1,158 @@
+import time
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.deadline import (
+    DeadlineMiddleware, DeadlineExceeded, RequestCancelled, RequestAborted, aborted_error, check_deadline, remaining_time
+)
+from app.core.open_ai_service import OpenAIService
+from app.session.services import SessionService
+
+
+def wrapped(error: Exception) -> Exception:
+    """
+    Return the exception a service raises for `error`, as the services and endpoints do.
+    """
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise Exception(f"Service failed: {str(e)}")
+    except Exception as e:
+        return e
+
+
+def test_aborts_are_found_in_the_exception_chain():
+    cancelled = RequestCancelled("Client disconnected.")
+    assert aborted_error(wrapped(cancelled)) is cancelled
+    assert aborted_error(cancelled) is cancelled
+    assert aborted_error(wrapped(ValueError("bad value"))) is None
+    assert aborted_error(None) is None
+
+
+@pytest.mark.parametrize("method", ["generate_response", "generate_response_json"])
+def test_llm_calls_let_aborts_through(monkeypatch, method):
+    def aborted_completion(self, *args, **options):
+        raise DeadlineExceeded("Request deadline exceeded.")
+
+    monkeypatch.setattr(OpenAIService, "_create_completion", aborted_completion)
+    with pytest.raises(DeadlineExceeded):
+        getattr(OpenAIService(), method)("system", "user", "analysis")
+
+
+@pytest.mark.parametrize("abort, status", [(RequestCancelled("Client disconnected."), 499), (DeadlineExceeded("Request deadline exceeded."), 504)])
+def test_aborts_wrapped_by_services_and_endpoints_are_not_reported_as_errors(client, seeded_ids, monkeypatch, abort, status):
+    def aborted_report(db, id):
+        raise wrapped(abort)
+
+    monkeypatch.setattr(SessionService, "get_report", staticmethod(aborted_report))
+    response = client.post(f"/session/{seeded_ids['session_id']}/report")
+    assert response.status_code == status
+
+
+def test_ordinary_failures_are_still_internal_errors(client, seeded_ids, monkeypatch):
+    def failed_report(db, id):
+        raise wrapped(ValueError("bad value"))
+
+    monkeypatch.setattr(SessionService, "get_report", staticmethod(failed_report))
+    assert client.post(f"/session/{seeded_ids['session_id']}/report").status_code == 500
+
+
+@pytest.fixture
+def deadline_app():
+    """
+    A minimal application behind DeadlineMiddleware, with a default budget of 5 seconds, whose endpoints
+    record how their work ended in `app.state.outcomes`.
+    """
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, timeout=5.0)
+    app.state.outcomes = []
+
+    @app.get("/wait")
+    def wait():
+        started = time.monotonic()
+        try:
+            while time.monotonic() - started < 5.0:
+                check_deadline()
+                time.sleep(0.01)
+            app.state.outcomes.append("finished")
+        except RequestAborted as e:
+            app.state.outcomes.append(type(e).__name__)
+        return {"waited": time.monotonic() - started}
+
+    @app.get("/budget")
+    def budget():
+        return {"remaining": remaining_time()}
+
+    @app.get("/stream")
+    def stream():
+        def parts():
+            for part in range(3):
+                time.sleep(0.1)
+                app.state.outcomes.append(remaining_time())
+                yield f"{part}\n"
+        return StreamingResponse(parts(), media_type="text/plain")
+
+    return app
+
+
+def wait_for(condition, timeout: float = 2.0):
+    started = time.monotonic()
+    while not condition() and time.monotonic() - started < timeout:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_requests_past_their_deadline_get_a_504_and_their_work_stops(deadline_app):
+    with TestClient(deadline_app) as client:
+        started = time.monotonic()
+        response = client.get("/wait", headers={"X-Request-Timeout": "0.2"})
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded"}
+    assert time.monotonic() - started < 2.0
+    assert wait_for(lambda: deadline_app.state.outcomes == ["DeadlineExceeded"])
+
+
+def test_request_timeout_header_can_only_shorten_the_budget(deadline_app):
+    with TestClient(deadline_app) as client:
+        assert 0 < client.get("/budget", headers={"X-Request-Timeout": "1"}).json()["remaining"] <= 1.0
+        assert 1.0 < client.get("/budget", headers={"X-Request-Timeout": "600"}).json()["remaining"] <= 5.0
+        assert 1.0 < client.get("/budget", headers={"X-Request-Timeout": "soon"}).json()["remaining"] <= 5.0
+
+
+def test_streamed_responses_are_not_bounded_by_the_deadline(deadline_app):
+    with TestClient(deadline_app) as client:
+        response = client.get("/stream", headers={"X-Request-Timeout": "0.15"})
+    assert response.status_code == 200
+    assert response.text == "0\n1\n2\n"
+    assert deadline_app.state.outcomes == [None, None, None]
+
+
+def test_work_stops_when_the_client_disconnects(deadline_app):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/wait", "raw_path": b"/wait", "root_path": "", "query_string": b"", "headers": [],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+
+    async def run():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.2)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            # The client is gone; whatever the application still sends is dropped
+            pass
+
+        await deadline_app(scope, receive, send)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 2.0
+    assert deadline_app.state.outcomes == ["RequestCancelled"]
@@ -0,0 +1,178 @@
+import time
+import threading
+import httpx
+import pytest
+from types import SimpleNamespace
+from openai import APITimeoutError, RateLimitError, BadRequestError
+from app.core.contextvar import request_deadline_context
+from app.core.deadline import DeadlineExceeded, RequestCancelled
+from app.core.endpoint_pool import PoolEndpoint, EndpointPool
+
+REQUEST = httpx.Request("POST", "https://example.invalid/chat/completions")
+
+
+class FakeClient:
+    """
+    Stands in for an endpoint's AzureOpenAI client. Calls raise `error` if set; otherwise they wait until
+    `answer` is set and then return `content`, or time out like the SDK after the timeout given with `with_options`.
+    """
+
+    def __init__(self, content: str, answer: threading.Event = None, timeout: float = None, timeouts: list = None,
+                 error: Exception = None):
+        self.content = content
+        self.answer = answer or threading.Event()
+        self.timeout = timeout
+        self.timeouts = [] if timeouts is None else timeouts
+        self.error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    def with_options(self, timeout: float = None, max_retries: int = None):
+        return FakeClient(self.content, self.answer, timeout, self.timeouts, self.error)
+
+    def create(self, model: str, messages: list, **options):
+        self.timeouts.append(self.timeout)
+        if self.error is not None:
+            raise self.error
+        if not self.answer.wait(self.timeout if self.timeout is not None else 5.0):
+            raise APITimeoutError(request=REQUEST)
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(parse=lambda: SimpleNamespace(choices=[SimpleNamespace(message=message)]), headers={})
+
+
+def make_endpoint(name: str, latency: float, answer: threading.Event = None, error: Exception = None) -> PoolEndpoint:
+    endpoint = PoolEndpoint(name, "https://example.invalid", "test")
+    endpoint.client = FakeClient(f"answer from {name}", answer, error=error)
+    endpoint.latencies.extend([latency] * 5)
+    return endpoint
+
+
+def answered() -> threading.Event:
+    answer = threading.Event()
+    answer.set()
+    return answer
+
+
+def throttled() -> RateLimitError:
+    response = httpx.Response(429, request=REQUEST, headers={"retry-after": "60"})
+    return RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+@pytest.fixture
+def failures(monkeypatch) -> list:
+    """
+    The endpoint failures recorded during a test.
+    """
+    recorded = []
+    monkeypatch.setattr(PoolEndpoint, "record_failure", lambda endpoint, error, cooldown: recorded.append(endpoint.name))
+    return recorded
+
+
+@pytest.fixture
+def request_context():
+    """
+    Return a function that starts a request with the given budget, like DeadlineMiddleware does.
+    """
+    tokens = []
+
+    def start_request(timeout: float) -> dict:
+        context = {'deadline': time.monotonic() + timeout, 'cancelled': threading.Event(), 'expired': False}
+        tokens.append(request_deadline_context.set(context))
+        return context
+
+    yield start_request
+    for token in reversed(tokens):
+        request_deadline_context.reset(token)
+
+
+def test_hedged_calls_are_bounded_by_the_request_deadline(request_context, failures):
+    primary, secondary = make_endpoint("primary", 0.05), make_endpoint("secondary", 0.1)
+    pool = EndpointPool([primary, secondary], hedge_percentile=0.5, hedge_min_samples=5)
+    request_context(0.3)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        pool.complete("fast", "deployment", [])
+    assert time.monotonic() - started < 1.0
+
+    # Both calls ran with the time left before the deadline as their timeout
+    pool._executor.shutdown(wait=True)
+    assert len(primary.client.timeouts) == 1 and len(secondary.client.timeouts) == 1
+    assert all(timeout is not None and timeout <= 0.3 for timeout in primary.client.timeouts + secondary.client.timeouts)
+    # Timeouts caused by the request's own deadline say nothing about the endpoints' health
+    assert failures == []
+
+
+def test_hedged_call_stops_waiting_when_the_client_disconnects(request_context, failures):
+    answer = threading.Event()
+    primary, secondary = make_endpoint("primary", 0.05, answer), make_endpoint("secondary", 0.1, answer)
+    pool = EndpointPool([primary, secondary], hedge_percentile=0.5, hedge_min_samples=5)
+    context = request_context(30)
+    threading.Timer(0.2, context['cancelled'].set).start()
+
+    started = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        pool.complete("fast", "deployment", [])
+    assert time.monotonic() - started < 1.0
+
+    answer.set()
+    pool._executor.shutdown(wait=True)
+    assert failures == []
+
+
+def test_hedged_call_returns_the_first_answer(request_context, failures):
+    slow_answer, fast_answer = threading.Event(), threading.Event()
+    fast_answer.set()
+    primary, secondary = make_endpoint("primary", 0.05, slow_answer), make_endpoint("secondary", 0.1, fast_answer)
+    pool = EndpointPool([primary, secondary], hedge_percentile=0.5, hedge_min_samples=5)
+    request_context(30)
+
+    assert pool.complete("fast", "deployment", []) == "answer from secondary"
+
+    slow_answer.set()
+    pool._executor.shutdown(wait=True)
+    assert failures == []
+
+
+def test_throttled_endpoint_fails_over_and_is_avoided_afterwards():
+    primary = make_endpoint("primary", 0.05, error=throttled())
+    secondary = make_endpoint("secondary", 0.1, answered())
+    pool = EndpointPool([primary, secondary])
+
+    assert pool.complete("fast", "deployment", []) == "answer from secondary"
+    # The primary is avoided for its Retry-After period despite its lower latency
+    assert pool.ranked_endpoints() == [secondary, primary]
+    assert pool.complete("fast", "deployment", []) == "answer from secondary"
+    assert len(primary.client.timeouts) == 1
+
+
+def test_hedged_call_fails_over_past_both_hedged_endpoints(request_context, failures):
+    first = make_endpoint("first", 0.05, error=APITimeoutError(request=REQUEST))
+    second = make_endpoint("second", 0.1, error=APITimeoutError(request=REQUEST))
+    third = make_endpoint("third", 0.2, answered())
+    pool = EndpointPool([first, second, third], hedge_percentile=0.5, hedge_min_samples=5)
+    request_context(30)
+
+    assert pool.complete("fast", "deployment", []) == "answer from third"
+    pool._executor.shutdown(wait=True)
+    assert sorted(failures) == ["first", "second"]
+
+
+def test_non_retriable_errors_are_not_failed_over(failures):
+    invalid = BadRequestError("Invalid request", response=httpx.Response(400, request=REQUEST), body=None)
+    primary = make_endpoint("primary", 0.05, error=invalid)
+    secondary = make_endpoint("secondary", 0.1, answered())
+    pool = EndpointPool([primary, secondary])
+
+    with pytest.raises(BadRequestError):
+        pool.complete("fast", "deployment", [])
+    assert secondary.client.timeouts == []
+
+
+def test_last_error_is_raised_when_every_endpoint_fails(failures):
+    primary = make_endpoint("primary", 0.05, error=APITimeoutError(request=REQUEST))
+    secondary = make_endpoint("secondary", 0.1, error=throttled())
+    pool = EndpointPool([primary, secondary])
+
+    with pytest.raises(RateLimitError):
+        pool.complete("fast", "deployment", [])
+    assert failures == ["primary", "secondary"]
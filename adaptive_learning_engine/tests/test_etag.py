@@ -0,0 +1,64 @@
+import pytest
+from app.core.etag import etag_matches
+from app.core.open_ai_service import OpenAIService
+from tests.llm_responses import canned_llm_response, RECOMMENDATION
+
+
+@pytest.fixture
+def llm_calls(client, monkeypatch) -> list:
+    """
+    The task types of the LLM calls made during a test.
+    """
+    calls = []
+
+    def call_tiers(self, system_prompt, user_prompt, task_type, options):
+        calls.append(task_type)
+        return canned_llm_response(system_prompt, user_prompt, task_type, options)
+
+    monkeypatch.setattr(OpenAIService, "_call_tiers", call_tiers)
+    return calls
+
+
+def test_if_none_match_uses_weak_comparison():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"other", W/"abc"', 'W/"abc"')
+    assert etag_matches('*', 'W/"abc"')
+    assert not etag_matches('W/"other"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+
+
+def test_unchanged_recommendations_are_not_modified(client, seeded_ids, llm_calls):
+    url = f"/session/{seeded_ids['session_id']}/recommendation"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json() == {"ai_response": RECOMMENDATION}
+    etag = response.headers["ETag"]
+    assert "Cache-Control" in response.headers
+    calls = len(llm_calls)
+    assert calls > 0
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert len(llm_calls) == calls
+
+
+def test_a_new_turn_changes_the_recommendation_etag(client, seeded_ids, llm_calls):
+    session_id = seeded_ids["session_id"]
+    url = f"/session/{session_id}/recommendation"
+    etag = client.get(url).headers["ETag"]
+
+    assert client.post("/chat-with-gpt", json={"session_id": session_id, "learner_response": "1/4"}).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    # Other sessions keep their own ETags
+    other = client.get(f"/session/{seeded_ids['empty_session_id']}/recommendation").headers["ETag"]
+    assert other not in (etag, response.headers["ETag"])
+
+
+def test_recommendations_of_unknown_sessions_are_not_found(client, llm_calls):
+    assert client.get("/session/999/recommendation").status_code == 404
+    assert llm_calls == []
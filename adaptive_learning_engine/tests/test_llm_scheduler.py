@@ -0,0 +1,157 @@
+import time
+import threading
+import pytest
+from app.core.llm_scheduler import LLMScheduler, LLMBusy, PRIORITY_INTERACTIVE, PRIORITY_REPORT, PRIORITY_BATCH
+
+# Upper bound on how long a test waits for a slot that should be granted
+GRANT_TIMEOUT_SECONDS = 2.0
+
+
+def acquire_in_background(scheduler: LLMScheduler, priority: str, granted: list) -> threading.Thread:
+    """
+    Wait for a slot in a thread, appending the priority to `granted` once it is granted.
+    """
+    def wait_for_slot():
+        scheduler.acquire(priority)
+        granted.append(priority)
+
+    thread = threading.Thread(target=wait_for_slot, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for_waiters(scheduler: LLMScheduler, count: int):
+    deadline = time.monotonic() + GRANT_TIMEOUT_SECONDS
+    while sum(state["waiting"] for state in scheduler.snapshot().values()) < count:
+        assert time.monotonic() < deadline, "the calls did not start waiting"
+        time.sleep(0.01)
+
+
+def wait_for_grants(granted: list, count: int):
+    deadline = time.monotonic() + GRANT_TIMEOUT_SECONDS
+    while len(granted) < count:
+        assert time.monotonic() < deadline, "the waiting calls were not granted a slot"
+        time.sleep(0.01)
+
+
+def test_reserved_slots_are_kept_for_more_urgent_classes():
+    scheduler = LLMScheduler(max_concurrency=4, reserved={PRIORITY_INTERACTIVE: 1, PRIORITY_REPORT: 1}, aging_seconds=0)
+
+    # Batch calls may only use the unreserved slots
+    assert scheduler.acquire(PRIORITY_BATCH) == 0.0
+    assert scheduler.acquire(PRIORITY_BATCH) == 0.0
+    granted = []
+    acquire_in_background(scheduler, PRIORITY_BATCH, granted)
+    wait_for_waiters(scheduler, 1)
+
+    # Reports may use the report reservation, but not the interactive one
+    assert scheduler.acquire(PRIORITY_REPORT) == 0.0
+    acquire_in_background(scheduler, PRIORITY_REPORT, granted)
+    wait_for_waiters(scheduler, 2)
+
+    # The interactive reservation is still free
+    assert scheduler.acquire(PRIORITY_INTERACTIVE) == 0.0
+    assert scheduler.snapshot() == {
+        PRIORITY_INTERACTIVE: {"running": 1, "waiting": 0},
+        PRIORITY_REPORT: {"running": 1, "waiting": 1},
+        PRIORITY_BATCH: {"running": 2, "waiting": 1},
+    }
+    assert granted == []
+
+    # A freed batch slot goes to the waiting report first
+    scheduler.release(PRIORITY_BATCH)
+    wait_for_grants(granted, 1)
+    assert granted == [PRIORITY_REPORT]
+
+
+def test_freed_slot_goes_to_the_most_urgent_waiter():
+    scheduler = LLMScheduler(max_concurrency=1, reserved={}, aging_seconds=0)
+    scheduler.acquire(PRIORITY_BATCH)
+    granted = []
+    for priority in (PRIORITY_BATCH, PRIORITY_REPORT, PRIORITY_INTERACTIVE):
+        acquire_in_background(scheduler, priority, granted)
+    wait_for_waiters(scheduler, 3)
+
+    for expected in range(1, 4):
+        scheduler.release(PRIORITY_BATCH if expected == 1 else granted[-1])
+        wait_for_grants(granted, expected)
+
+    assert granted == [PRIORITY_INTERACTIVE, PRIORITY_REPORT, PRIORITY_BATCH]
+
+
+def test_aging_lets_a_long_waiting_batch_call_go_before_reports():
+    aging_seconds = 0.1
+    scheduler = LLMScheduler(max_concurrency=1, reserved={}, aging_seconds=aging_seconds)
+    scheduler.acquire(PRIORITY_INTERACTIVE)
+    granted = []
+    acquire_in_background(scheduler, PRIORITY_BATCH, granted)
+    wait_for_waiters(scheduler, 1)
+    # Long enough for the batch call to count as a report, and to be first in line among reports
+    time.sleep(aging_seconds * 1.5)
+    acquire_in_background(scheduler, PRIORITY_REPORT, granted)
+    wait_for_waiters(scheduler, 2)
+
+    scheduler.release(PRIORITY_INTERACTIVE)
+    wait_for_grants(granted, 1)
+
+    assert granted == [PRIORITY_BATCH]
+
+
+def test_aged_reports_never_go_before_interactive_calls():
+    aging_seconds = 0.05
+    scheduler = LLMScheduler(max_concurrency=1, reserved={}, aging_seconds=aging_seconds)
+    scheduler.acquire(PRIORITY_INTERACTIVE)
+    granted = []
+    acquire_in_background(scheduler, PRIORITY_REPORT, granted)
+    wait_for_waiters(scheduler, 1)
+    time.sleep(aging_seconds * 4)
+    acquire_in_background(scheduler, PRIORITY_INTERACTIVE, granted)
+    wait_for_waiters(scheduler, 2)
+
+    scheduler.release(PRIORITY_INTERACTIVE)
+    wait_for_grants(granted, 1)
+
+    assert granted == [PRIORITY_INTERACTIVE]
+
+
+def test_interactive_calls_keep_their_reserved_slots_under_an_aged_report_queue():
+    aging_seconds = 0.05
+    scheduler = LLMScheduler(max_concurrency=4, reserved={PRIORITY_INTERACTIVE: 2, PRIORITY_REPORT: 0}, aging_seconds=aging_seconds)
+    granted = []
+    for _ in range(6):
+        acquire_in_background(scheduler, PRIORITY_REPORT, granted)
+    # Reports take the two unreserved slots; the others wait
+    wait_for_grants(granted, 2)
+    wait_for_waiters(scheduler, 4)
+    time.sleep(aging_seconds * 4)
+
+    # However long they waited, the queued reports do not take the interactive reservation
+    assert scheduler.snapshot()[PRIORITY_REPORT] == {"running": 2, "waiting": 4}
+    acquire_in_background(scheduler, PRIORITY_INTERACTIVE, granted)
+    acquire_in_background(scheduler, PRIORITY_INTERACTIVE, granted)
+    wait_for_grants(granted, 4)
+    assert granted[2:] == [PRIORITY_INTERACTIVE, PRIORITY_INTERACTIVE]
+    assert scheduler.snapshot()[PRIORITY_REPORT] == {"running": 2, "waiting": 4}
+
+
+def test_full_queue_fails_fast():
+    scheduler = LLMScheduler(max_concurrency=1, reserved={}, aging_seconds=0, max_queued={PRIORITY_REPORT: 1})
+    scheduler.acquire(PRIORITY_REPORT)
+    granted = []
+    acquire_in_background(scheduler, PRIORITY_REPORT, granted)
+    wait_for_waiters(scheduler, 1)
+
+    with pytest.raises(LLMBusy) as busy:
+        scheduler.acquire(PRIORITY_REPORT)
+    assert busy.value.retry_after > 0
+
+    scheduler.release(PRIORITY_REPORT)
+    wait_for_grants(granted, 1)
+
+
+def test_slot_is_released_when_the_call_fails():
+    scheduler = LLMScheduler(max_concurrency=1, reserved={}, aging_seconds=0)
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("analysis"):
+            raise RuntimeError("LLM call failed")
+    assert all(state["running"] == 0 for state in scheduler.snapshot().values())
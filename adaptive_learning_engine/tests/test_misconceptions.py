@@ -0,0 +1,75 @@
+import pytest
+from app.analysis.models import ChatAnalysis
+from app.core.database import open_session
+from app.misconceptions.clustering import MisconceptionVectorizer, MisconceptionClusterer
+from app.misconceptions.services import MisconceptionService
+
+ADDS = "Adds the probabilities of independent events instead of multiplying them"
+ADDS_REPHRASED = "adds probabilities of independent events"
+MEDIAN = "Confuses the mean with the median"
+
+
+@pytest.fixture
+def db(fresh_database):
+    fresh_database()
+    db = open_session()
+    yield db
+    db.close()
+
+
+def store_analyses(db, session_misconceptions: list):
+    db.add_all([
+        ChatAnalysis(session_id=session_id, total_questions_asked=2, total_questions_answered_wrong=1,
+                     misconceptions=misconceptions, feedback="Keep practising.")
+        for session_id, misconceptions in session_misconceptions
+    ])
+    db.commit()
+
+
+def test_similar_misconceptions_share_a_cluster():
+    vectorizer = MisconceptionVectorizer()
+    clusterer = MisconceptionClusterer()
+    labels, new_clusters = clusterer.assign(vectorizer.vectorize([ADDS, MEDIAN, ADDS_REPHRASED, "the of"]))
+    assert labels.tolist() == [0, 1, 0, -1]
+    assert new_clusters.tolist() == [0, 1]
+
+    # Later batches join the existing clusters
+    labels, new_clusters = clusterer.assign(vectorizer.vectorize(["Often confuses the mean and the median"]))
+    assert labels.tolist() == [1]
+    assert new_clusters.tolist() == []
+
+
+def test_clusters_are_ranked_by_sessions_and_updated_incrementally(client, db, seeded_ids):
+    session_id, other_session_id = seeded_ids["session_id"], seeded_ids["empty_session_id"]
+    store_analyses(db, [
+        (session_id, [ADDS, MEDIAN]),
+        (other_session_id, [ADDS_REPHRASED]),
+        # The same misconception twice in one analysis counts once for the session
+        (other_session_id, [ADDS, ADDS.lower()]),
+    ])
+    goal_id = seeded_ids["learning_goal_id"]
+
+    result = MisconceptionService.cluster_learning_goal(db, goal_id, batch_size=2)
+    assert {key: result[key] for key in ("analyses", "misconceptions", "new_clusters", "clusters")} == {
+        "analyses": 3, "misconceptions": 4, "new_clusters": 2, "clusters": 2
+    }
+
+    report = client.get("/analytics/cohort/misconceptions", params={"learning_goal": "Probability"}).json()
+    adds, median = report["clusters"]
+    assert (adds["label"], adds["sessions"], adds["mentions"]) == (ADDS, 2, 3)
+    assert sorted(adds["example_session_ids"]) == [session_id, other_session_id]
+    assert (median["label"], median["sessions"], median["example_session_ids"]) == (MEDIAN, 1, [session_id])
+
+    # Only the analyses stored since the previous run are clustered
+    store_analyses(db, [(other_session_id, [MEDIAN])])
+    result = MisconceptionService.cluster_learning_goal(db, goal_id)
+    assert (result["analyses"], result["new_clusters"], result["clusters"]) == (1, 0, 2)
+    report = client.get("/analytics/cohort/misconceptions", params={"learning_goal": "Probability"}).json()
+    assert [cluster["sessions"] for cluster in report["clusters"]] == [2, 2]
+    assert report["clustered_through_analysis_id"] == 4
+
+
+def test_misconceptions_of_unknown_learning_goals_are_not_found(client):
+    assert client.get("/analytics/cohort/misconceptions", params={"learning_goal": "Astrology"}).status_code == 404
+    empty = client.get("/analytics/cohort/misconceptions", params={"learning_goal": "Probability"}).json()
+    assert (empty["clusters"], empty["clustered_through_analysis_id"]) == ([], None)
@@ -0,0 +1,73 @@
+"""
+Endpoint tests with the LLM calls recorded to a cassette and replayed from it.
+
+Each exercise runs once while recording and once replaying on an identical database, so a replayed
+run must send exactly the recorded requests and produce the same responses.
+"""
+import json
+from tests.llm_responses import TUTOR_MESSAGE, ANALYSIS, RECOMMENDATION
+
+
+def test_chat_turn_is_replayed(record_and_replay, seeded_ids):
+    session_id = seeded_ids["session_id"]
+
+    def exercise(client):
+        response = client.post("/chat-with-gpt", json={"session_id": session_id, "learner_response": "1/4"})
+        assert response.status_code == 200
+        history = client.get(f"/session/{session_id}/chat-history").json()
+        return response.json(), [entry["learner_response"] for entry in history["items"]]
+
+    recorded, replayed = record_and_replay(exercise)
+
+    assert replayed == recorded
+    turn, learner_responses = recorded
+    assert turn["ai_response"] == TUTOR_MESSAGE
+    assert turn["answer_verdict"] == "incorrect"
+    assert turn["degraded"] is False
+    assert learner_responses[-1] == "1/4"
+
+
+def test_analysis_is_replayed(record_and_replay, seeded_ids):
+    session_id = seeded_ids["session_id"]
+
+    def exercise(client):
+        assert client.get(f"/analytics/student/{session_id}").status_code == 404
+        computed = client.post(f"/analytics/student/{session_id}")
+        assert computed.status_code == 200
+        stored = client.get(f"/analytics/student/{session_id}")
+        assert stored.status_code == 200
+        assert client.get(f"/analytics/student/{session_id}", headers={"If-None-Match": stored.headers["ETag"]}).status_code == 304
+        return computed.json()["ai_response"], stored.json()["ai_response"]
+
+    recorded, replayed = record_and_replay(exercise)
+
+    assert replayed == recorded
+    computed, stored = recorded
+    assert computed == stored
+    assert computed["misconceptions"] == ANALYSIS["misconceptions"]
+
+
+def test_report_is_replayed(record_and_replay, seeded_ids):
+    session_id = seeded_ids["session_id"]
+
+    def exercise(client):
+        response = client.post(f"/session/{session_id}/report")
+        assert response.status_code == 200
+        streamed = client.post(f"/session/{session_id}/report", params={"stream": "true"})
+        assert streamed.status_code == 200
+        parts = {part["part"]: part for part in map(json.loads, streamed.text.splitlines())}
+        return response.json(), sorted(parts)
+
+    recorded, replayed = record_and_replay(exercise)
+
+    assert replayed == recorded
+    report, streamed_parts = recorded
+    assert report["session_id"] == session_id
+    assert report["recommendation"]["ai_response"] == RECOMMENDATION
+    assert report["analysis"]["ai_response"]["feedback"] == ANALYSIS["feedback"]
+    assert streamed_parts == ["analysis", "recommendation"]
+
+
+def test_reads_of_unknown_sessions_are_not_found(client):
+    assert client.post("/session/999/report").status_code == 404
+    assert client.get("/analytics/student/999").status_code == 404
@@ -0,0 +1,119 @@
+import json
+import zlib
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core import responses
+from app.core.responses import RawJSON, FastJSONResponse, dumps
+from app.core.compression import CompressionMiddleware, negotiate_encoding, brotli, GZIP_WBITS
+
+LINES = [json.dumps({"id": index, "llm_response": "A fair coin lands heads half of the time."}) + "\n" for index in range(50)]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """
+    Run a test with orjson and with the standard library fallback.
+    """
+    if request.param == "json":
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_raw_json_is_spliced_unchanged(encoder):
+    content = {
+        "analysis": RawJSON('{"strengths": ["counting"], "score": 0.5}'),
+        "parts": [RawJSON(b"null"), "text"],
+        "unicode": "naïve",
+    }
+    assert json.loads(dumps(content)) == {
+        "analysis": {"strengths": ["counting"], "score": 0.5}, "parts": [None, "text"], "unicode": "naïve"
+    }
+    assert b'{"strengths": ["counting"], "score": 0.5}' in dumps(content)
+
+
+def test_values_that_are_not_json_are_rejected(encoder):
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_encoding_negotiation():
+    preferred = "br" if brotli is not None else "gzip"
+    assert negotiate_encoding("gzip, br") == preferred
+    assert negotiate_encoding("gzip;q=0.5, br;q=0") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("*") == preferred
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+
+    @app.get("/large")
+    def large():
+        return {"lines": LINES}
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}
+
+    @app.get("/export")
+    def export():
+        return StreamingResponse(iter(LINES), media_type="application/x-ndjson")
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_large_responses_are_compressed(compressed_client):
+    response = compressed_client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(json.dumps({"lines": LINES}))
+    assert response.json() == {"lines": LINES}
+
+
+def test_small_responses_and_clients_without_gzip_are_served_unchanged(compressed_client):
+    assert "content-encoding" not in compressed_client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    response = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"lines": LINES}
+
+
+def test_streamed_responses_are_compressed(compressed_client):
+    with compressed_client.stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.read().decode() == "".join(LINES)
+
+
+def test_streamed_chunks_are_flushed():
+    async def export(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+        for line in LINES:
+            await send({"type": "http.response.body", "body": line.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(export, minimum_size=512)(scope, receive, send))
+
+    # Every chunk is flushed, so each line can be decoded as soon as it is received
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    bodies = [message["body"] for message in sent[1:]]
+    assert [decompressor.decompress(body).decode() for body in bodies[:-1]] == LINES
+    assert decompressor.decompress(bodies[-1]) == b"" and decompressor.eof
@@ -0,0 +1,35 @@
+from app.session.schemas import MAX_BULK_SESSIONS
+
+
+def test_bulk_creation_reports_each_item_in_request_order(client, seeded_ids):
+    response = client.post("/create-sessions", json={"sessions": [
+        {"learner_level": "beginner", "learning_goal": "Probability"},
+        {"learner_level": "advanced", "learning_goal": "Astrology"},
+        {"learner_level": "advanced", "learning_goal": "Probability"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+
+    first, invalid, last = body["results"]
+    assert invalid == {"index": 1, "session": None, "error": "Invalid learning goal"}
+    assert first["error"] is None and last["error"] is None
+    assert (first["session"]["student_initial_level"], last["session"]["student_current_level"]) == ("beginner", "advanced")
+    # The new sessions follow the seeded ones and exist
+    new_ids = [first["session"]["id"], last["session"]["id"]]
+    assert len(set(new_ids)) == 2 and min(new_ids) > seeded_ids["empty_session_id"]
+    for session_id in new_ids:
+        assert client.get(f"/session/{session_id}/chat-history").json()["items"] == []
+
+
+def test_bulk_creation_with_only_invalid_goals_creates_nothing(client):
+    response = client.post("/create-sessions", json={"sessions": [{"learner_level": "beginner", "learning_goal": "Astrology"}]})
+    assert response.status_code == 200
+    assert (response.json()["created"], response.json()["failed"]) == (0, 1)
+
+
+def test_bulk_creation_is_bounded(client):
+    item = {"learner_level": "beginner", "learning_goal": "Probability"}
+    assert client.post("/create-sessions", json={"sessions": []}).status_code == 422
+    assert client.post("/create-sessions", json={"sessions": [item] * (MAX_BULK_SESSIONS + 1)}).status_code == 422
@@ -0,0 +1,85 @@
+import pytest
+from app.analysis.models import ChatHistory
+from app.core.database import open_session
+from app.core.open_ai_service import OpenAIService
+from app.summary.dao import SummaryDAO
+from app.summary.services import SummaryService, RECENT_TURNS, SUMMARY_BATCH_TURNS
+
+
+@pytest.fixture
+def db(fresh_database):
+    fresh_database()
+    db = open_session()
+    yield db
+    db.close()
+
+
+def add_turns(db, session_id: int, count: int):
+    db.add_all([
+        ChatHistory(session_id=session_id, llm_response=f"Question {i}", learner_response=f"Answer {i}", answer_verdict="correct")
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def summarize_with(monkeypatch, generate) -> list:
+    """
+    Answer the summarization calls with `generate(user_prompt)`, returning the prompts sent.
+    """
+    prompts = []
+
+    def generate_response(self, system_prompt, user_prompt, task_type, *args, **kwargs):
+        prompts.append(user_prompt)
+        return generate(user_prompt)
+
+    monkeypatch.setattr(OpenAIService, "generate_response", generate_response)
+    return prompts
+
+
+def test_summary_folds_in_older_turns_and_is_extended(db, seeded_ids, monkeypatch):
+    session_id = seeded_ids["session_id"]
+
+    def generate(prompt):
+        # The summary read before the call must not be reloaded, which would hold a transaction during the call
+        assert not db.in_transaction()
+        return f"Notes {len(prompts)}"
+
+    prompts = summarize_with(monkeypatch, generate)
+
+    # The seeded turns alone leave too few turns beyond the recent ones
+    assert SummaryService.summarize_session(db, session_id) == 0
+    add_turns(db, session_id, SUMMARY_BATCH_TURNS)
+    assert SummaryService.summarize_session(db, session_id) == 3 + SUMMARY_BATCH_TURNS - RECENT_TURNS
+    summary = SummaryDAO.get_summary(db, session_id)
+    assert (summary.summary, summary.summarized_turns) == ("Notes 1", 3 + SUMMARY_BATCH_TURNS - RECENT_TURNS)
+
+    add_turns(db, session_id, SUMMARY_BATCH_TURNS)
+    assert SummaryService.summarize_session(db, session_id) == SUMMARY_BATCH_TURNS
+    assert "Notes 1" in prompts[-1]
+    summary = SummaryDAO.get_summary(db, session_id)
+    assert (summary.summary, summary.summarized_turns) == ("Notes 2", 3 + 2 * SUMMARY_BATCH_TURNS - RECENT_TURNS)
+
+
+def test_summary_extended_concurrently_is_not_overwritten(db, seeded_ids, monkeypatch):
+    session_id = seeded_ids["session_id"]
+    summarize_with(monkeypatch, lambda prompt: "Notes")
+    add_turns(db, session_id, SUMMARY_BATCH_TURNS)
+    SummaryService.summarize_session(db, session_id)
+    add_turns(db, session_id, SUMMARY_BATCH_TURNS)
+    first = SummaryDAO.get_summary(db, session_id)
+    first_through_id, first_turns = first.summarized_through_id, first.summarized_turns
+    db.rollback()
+
+    def extended_meanwhile(prompt):
+        # Another worker extends the same summary while this one waits for the LLM
+        other_db = open_session()
+        try:
+            assert SummaryDAO.store_summary(other_db, session_id, "Other notes", first_through_id + 1, first_turns + 1, first_through_id)
+        finally:
+            other_db.close()
+        return "Stale notes"
+
+    summarize_with(monkeypatch, extended_meanwhile)
+    assert SummaryService.summarize_session(db, session_id) == 0
+    summary = SummaryDAO.get_summary(db, session_id)
+    assert (summary.summary, summary.summarized_through_id) == ("Other notes", first_through_id + 1)
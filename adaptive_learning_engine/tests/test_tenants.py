@@ -0,0 +1,82 @@
+import pytest
+from collections import OrderedDict
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from app.main import app, APPLICATION_SCHEMAS
+from app.core import database
+from app.analysis.models import Base as AnalysisBase, LearningGoals, SessionDetails
+
+
+@pytest.fixture
+def provision_tenant(tmp_path, monkeypatch):
+    """
+    Return a function that provisions a tenant database the way generate_data.py does, with one session.
+    """
+    monkeypatch.setattr(database, "TENANT_DATABASE_URL", f"sqlite:///{tmp_path}/{{tenant_id}}.db")
+    monkeypatch.setattr(database, "tenant_engines", OrderedDict())
+    engines = []
+
+    def provision(tenant_id: str):
+        engine = database._create_engine(database.tenant_database_url(tenant_id))
+        engines.append(engine)
+        database.create_tables(AnalysisBase.metadata, bind=engine)
+        db = database.SessionLocal(bind=engine)
+        try:
+            goal = LearningGoals(learning_goal_names="Geometry")
+            db.add(goal)
+            db.flush()
+            db.add(SessionDetails(learning_goal_id=goal.id, student_initial_level="advanced", student_current_level="advanced"))
+            db.commit()
+        finally:
+            db.close()
+        return engine
+
+    yield provision
+    for engine in engines + list(database.tenant_engines.values()):
+        engine.dispose()
+
+
+def test_tables_are_created_at_start_up(tmp_path, monkeypatch):
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    try:
+        assert inspect(engine).get_table_names() == []
+        with TestClient(app):
+            pass
+        assert set(inspect(engine).get_table_names()) == {
+            table for metadata in APPLICATION_SCHEMAS for table in metadata.tables
+        }
+    finally:
+        engine.dispose()
+
+
+def test_requests_are_routed_to_their_tenant_database(client, provision_tenant, seeded_ids):
+    tenant_engine = provision_tenant("school-42")
+    sessions = {"sessions": [{"learner_level": "beginner", "learning_goal": "Geometry"}]}
+
+    # The tenant's catalog is not the default database's
+    assert client.post("/create-sessions", json=sessions).json()["failed"] == 1
+    response = client.post("/create-sessions", json=sessions, headers={"X-Tenant-ID": "school-42"})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["session"]["id"] == 2
+
+    # The schemas registered at start-up are created on the tenant database when it is first used
+    assert set(inspect(tenant_engine).get_table_names()) == {
+        table for metadata in APPLICATION_SCHEMAS for table in metadata.tables
+    }
+    tenant_history = client.get(f"/session/{seeded_ids['session_id']}/chat-history", headers={"X-Tenant-ID": "school-42"})
+    assert tenant_history.json()["items"] == []
+    assert len(client.get(f"/session/{seeded_ids['session_id']}/chat-history").json()["items"]) == 3
+
+
+def test_unknown_tenants_are_not_found_and_not_created(client, provision_tenant, tmp_path):
+    response = client.get("/session/1/chat-history", headers={"X-Tenant-ID": "school-43"})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Unknown tenant"}
+    assert not (tmp_path / "school-43.db").exists()
+
+
+def test_malformed_tenant_ids_are_rejected(client, provision_tenant):
+    response = client.get("/session/1/chat-history", headers={"X-Tenant-ID": "../school-42"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid tenant ID"}
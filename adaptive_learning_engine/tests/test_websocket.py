@@ -0,0 +1,74 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.core.open_ai_service import OpenAIService
+from tests.llm_responses import canned_llm_response, TUTOR_MESSAGE
+
+DELTA_SIZE = 7
+
+
+@pytest.fixture
+def streamed_llm(client, monkeypatch):
+    """
+    Stream the canned LLM responses in small deltas, like the model does.
+    """
+    def stream_response_json(self, system_prompt, user_prompt, task_type=None):
+        response = canned_llm_response(system_prompt, user_prompt, task_type, {"response_format": {"type": "json_object"}})
+        for start in range(0, len(response), DELTA_SIZE):
+            yield response[start:start + DELTA_SIZE]
+
+    monkeypatch.setattr(OpenAIService, "stream_response_json", stream_response_json)
+
+
+def receive_turn(websocket) -> tuple:
+    """
+    Receive the messages of one turn; returns the streamed text and the final message.
+    """
+    tokens = []
+    while True:
+        message = websocket.receive_json()
+        if message["type"] != "token":
+            return "".join(tokens), message
+        tokens.append(message["text"])
+
+
+def test_turns_are_streamed_and_stored(client, seeded_ids, streamed_llm):
+    session_id = seeded_ids["session_id"]
+    with client.websocket_connect(f"/ws/session/{session_id}/chat") as websocket:
+        assert websocket.receive_json() == {
+            "type": "session", "session_id": session_id, "learning_goal": "Probability", "student_current_level": "beginner"
+        }
+        for learner_response in ("1/4", "1/8"):
+            websocket.send_json({"learner_response": learner_response})
+            streamed, turn = receive_turn(websocket)
+            assert turn["type"] == "turn"
+            assert streamed == turn["ai_response"] == TUTOR_MESSAGE
+            assert turn["learner_input"] == learner_response
+
+    history = client.get(f"/session/{session_id}/chat-history").json()["items"]
+    assert [entry["learner_response"] for entry in history[-2:]] == ["1/4", "1/8"]
+
+
+def test_malformed_messages_are_answered_with_an_error(client, seeded_ids, streamed_llm):
+    with client.websocket_connect(f"/ws/session/{seeded_ids['session_id']}/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_text("1/4")
+        assert websocket.receive_json()["type"] == "error"
+        # The connection stays usable
+        websocket.send_json({"learner_response": "1/4"})
+        assert receive_turn(websocket)[1]["type"] == "turn"
+
+
+def test_binary_frames_close_the_connection(client, seeded_ids):
+    with client.websocket_connect(f"/ws/session/{seeded_ids['session_id']}/chat") as websocket:
+        websocket.receive_json()
+        websocket.send_bytes(b'{"learner_response": "1/4"}')
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1003
+
+
+def test_unknown_sessions_are_refused(client):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/ws/session/999/chat") as websocket:
+            websocket.receive_json()
+    assert refused.value.code == 1008